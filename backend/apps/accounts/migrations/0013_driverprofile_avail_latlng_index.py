@@ -0,0 +1,20 @@
+# Generated by Django 6.0.6 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0012_add_carrier_profile_is_available"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="driverprofile",
+            index=models.Index(
+                fields=["is_available", "current_lat", "current_lng"],
+                name="accounts_dp_avail_latlng_idx",
+            ),
+        ),
+    ]
@@ -205,6 +205,13 @@ class DriverProfile(BaseModel):
 
     class Meta:
         verbose_name = "Driver Profile"
+        indexes = [
+            # Bounding-box prefilter for radius / nearest-driver searches
+            models.Index(
+                fields=["is_available", "current_lat", "current_lng"],
+                name="accounts_dp_avail_latlng_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Driver: {self.user.full_name}"
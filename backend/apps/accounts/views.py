@@ -212,8 +212,43 @@ class DriverAvailabilityView(APIView):
             profile.current_lng = serializer.validated_data["current_lng"]
         profile.last_location_update = timezone.now()
         profile.save()
+        self._sync_live_location(profile)
+        self._update_presence(profile)
         return Response(DriverProfileSerializer(profile).data)
 
+    def _update_presence(self, profile):
+        """Going online counts as a heartbeat; going offline ends presence at once."""
+        from apps.tracking import presence
+        try:
+            if profile.is_available:
+                presence.touch([profile.user.id])
+            else:
+                presence.remove(profile.user.id)
+        except Exception as exc:
+            logger.warning(f"Could not update presence of driver {profile.user.id}: {exc}")
+
+    def _sync_live_location(self, profile):
+        """Mirror availability (and any reported position) into the live location store."""
+        from apps.tracking import live
+        from apps.tracking.ingest import PingRecord
+        if not live.is_enabled():
+            return
+        try:
+            live.sync_driver_state(profile.user, available=profile.is_available)
+            if profile.current_lat is not None and profile.current_lng is not None:
+                live.update_positions([PingRecord(
+                    driver_id=profile.user.id,
+                    order_id=None,
+                    lat=float(profile.current_lat),
+                    lng=float(profile.current_lng),
+                    accuracy_m=None,
+                    speed_kmh=None,
+                    bearing=None,
+                    timestamp=profile.last_location_update,
+                )])
+        except Exception as exc:
+            logger.warning(f"Could not sync driver {profile.user.id} to live store: {exc}")
+
 
 class ShipperProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ShipperProfileSerializer
@@ -342,7 +377,8 @@ class UserListView(generics.ListAPIView):
 # ── Helpers ───────────────────────────────────────────────────────
 
 def _get_tokens(user):
-    refresh = RefreshToken.for_user(user)
+    # Same claims (role, name, ...) as a login, which the driver gateway relies on
+    refresh = CustomTokenObtainPairSerializer.get_token(user)
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
@@ -76,7 +76,7 @@ def send_notification_task(user_id: str, title: str, body: str, data: dict = Non
     Create an in-app notification and optionally send push (FCM) + SMS.
     """
     from django.contrib.auth import get_user_model
-    from .models import Notification, NotificationPreference
+    from .models import Notification
 
     User = get_user_model()
     try:
@@ -94,6 +94,34 @@ def send_notification_task(user_id: str, title: str, body: str, data: dict = Non
         data=data or {},
     )
 
+    _deliver(user, notification)
+
+
+@shared_task(name="apps.notifications.tasks.send_bulk_notification_task")
+def send_bulk_notification_task(user_ids: list, title: str, body: str, data: dict = None):
+    """
+    Send the same notification to many users: all in-app notifications are
+    written with one COPY, then each is pushed (WebSocket, FCM) as usual.
+    """
+    from django.contrib.auth import get_user_model
+    from core.bulk import copy_insert
+    from .models import Notification
+
+    users = list(get_user_model().objects.filter(id__in=user_ids).select_related("notification_preferences"))
+    notification_type = (data or {}).get("type", "SYSTEM")
+    notifications = [
+        Notification(user=user, notification_type=notification_type, title=title, body=body, data=data or {})
+        for user in users
+    ]
+    copy_insert(Notification, notifications)
+    for user, notification in zip(users, notifications):
+        _deliver(user, notification)
+
+
+def _deliver(user, notification):
+    """Push a stored notification to the user's WebSocket and, if wanted, their device."""
+    from .models import NotificationPreference
+
     # Push to user's live WebSocket connection (if connected)
     try:
         from asgiref.sync import async_to_sync
@@ -101,7 +129,7 @@ def send_notification_task(user_id: str, title: str, body: str, data: dict = Non
         channel_layer = get_channel_layer()
         if channel_layer:
             async_to_sync(channel_layer.group_send)(
-                f"notifications_{user_id}",
+                f"notifications_{user.id}",
                 {
                     "type": "notification.message",
                     "id": str(notification.id),
@@ -126,9 +154,9 @@ def send_notification_task(user_id: str, title: str, body: str, data: dict = Non
         if not prefs or prefs.push_enabled:
             send_fcm_notification.delay(
                 fcm_token=user.fcm_token,
-                title=title,
-                body=body,
-                data=data,
+                title=notification.title,
+                body=notification.body,
+                data=notification.data or None,
             )
 
 
@@ -207,29 +235,24 @@ def notify_order_status_change(order_id: str, new_status: str):
 
 @shared_task(name="apps.notifications.tasks.notify_new_order_posted")
 def notify_new_order_posted(order_id: str):
-    """Notify all available nearby drivers about a new posted order."""
+    """Notify the best-matched available drivers about a new posted order."""
+    from apps.orders.matching import rank_drivers
     from apps.orders.models import FreightOrder
-    from apps.accounts.models import DriverProfile
     try:
         order = FreightOrder.objects.get(id=order_id)
     except FreightOrder.DoesNotExist:
         return
 
-    available_drivers = DriverProfile.objects.filter(
-        is_available=True,
-        user__is_active=True,
-    ).select_related("user")
-
-    for profile in available_drivers[:50]:  # Cap to avoid overwhelming
-        send_notification_task.delay(
-            str(profile.user.id),
+    driver_ids = [match.driver_id for match in rank_drivers(order)]
+    if driver_ids:
+        send_bulk_notification_task.delay(
+            driver_ids,
             "New Freight Order Available",
             f"{order.pickup_city} → {order.delivery_city} | {order.weight_kg}kg",
             {"type": "ORDER_POSTED", "order_id": order_id},
         )
 
 
-
 @shared_task(name="apps.notifications.tasks.send_admin_daily_summary")
 def send_admin_daily_summary():
     """Send daily ops summary to admin users."""
@@ -7,13 +7,23 @@ from unittest.mock import patch
 
 from apps.notifications.models import Notification
 from apps.notifications.tasks import (
-    notify_bid_accepted,
     notify_new_order_posted,
     notify_order_status_change,
+    send_bulk_notification_task,
     send_notification_task,
 )
 
 
+@pytest.fixture(autouse=True)
+def eager_tasks():
+    """Run the tasks' own .delay() calls inline."""
+    from config import celery_app
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    yield
+    celery_app.conf.task_always_eager = previous
+
+
 @pytest.mark.django_db
 class TestSendNotificationTask:
     def test_creates_in_app_notification(self, shipper):
@@ -46,6 +56,25 @@ class TestSendNotificationTask:
             mock_fcm.delay.assert_not_called()
 
 
+@pytest.mark.django_db
+class TestSendBulkNotificationTask:
+    def test_creates_one_notification_per_user(self, shipper, driver):
+        send_bulk_notification_task([str(shipper.id), str(driver.id)], "Hello", "Body", {"type": "SYSTEM"})
+        assert Notification.objects.filter(title="Hello").count() == 2
+        assert Notification.objects.get(user=driver).data == {"type": "SYSTEM"}
+
+    def test_writes_all_notifications_with_one_copy(self, shipper, driver):
+        with patch("core.bulk.copy_insert", return_value=2) as copy:
+            send_bulk_notification_task([str(shipper.id), str(driver.id)], "Hello", "Body")
+        copy.assert_called_once()
+        assert {n.user for n in copy.call_args.args[1]} == {shipper, driver}
+
+    def test_pushes_each_notification(self, shipper, driver):
+        with patch("apps.notifications.tasks._deliver") as deliver:
+            send_bulk_notification_task([str(shipper.id), str(driver.id)], "Hello", "Body")
+        assert {call.args[0] for call in deliver.call_args_list} == {shipper, driver}
+
+
 @pytest.mark.django_db
 class TestNotifyOrderStatusChange:
     def test_notifies_shipper_on_status_change(self, posted_order, shipper):
@@ -60,43 +89,35 @@ class TestNotifyOrderStatusChange:
         notify_order_status_change("00000000-0000-0000-0000-000000000000", "POSTED")
 
 
+def _all_present(driver_ids):
+    return [str(d) for d in driver_ids]
+
+
 @pytest.mark.django_db
+@patch("apps.tracking.presence.filter_online", side_effect=_all_present)
 class TestNotifyNewOrderPosted:
-    def test_notifies_available_drivers(self, posted_order, driver):
+    def test_notifies_available_drivers(self, _presence, posted_order, driver):
         driver.driver_profile.is_available = True
         driver.driver_profile.save(update_fields=["is_available"])
         notify_new_order_posted(str(posted_order.id))
         assert Notification.objects.filter(user=driver).exists()
 
-    def test_does_not_notify_unavailable_drivers(self, posted_order, driver):
+    def test_does_not_notify_unavailable_drivers(self, _presence, posted_order, driver):
         driver.driver_profile.is_available = False
         driver.driver_profile.save(update_fields=["is_available"])
         notify_new_order_posted(str(posted_order.id))
         assert not Notification.objects.filter(user=driver).exists()
 
-    def test_notification_content_contains_route(self, posted_order, driver):
+    def test_does_not_notify_drivers_who_are_gone(self, presence, posted_order, driver):
+        presence.side_effect = lambda driver_ids: []
         driver.driver_profile.is_available = True
         driver.driver_profile.save(update_fields=["is_available"])
         notify_new_order_posted(str(posted_order.id))
-        notif = Notification.objects.filter(user=driver).first()
-        assert "Dakar" in notif.body or "Thiès" in notif.body
-
+        assert not Notification.objects.filter(user=driver).exists()
 
-@pytest.mark.django_db
-class TestNotifyBidAccepted:
-    def test_notifies_carrier(self, posted_order, driver, vehicle):
-        from apps.orders.models import OrderBid
-        bid = OrderBid.objects.create(
-            order=posted_order,
-            carrier=driver,
-            vehicle=vehicle,
-            price=145_000,
-            status=OrderBid.BidStatus.ACCEPTED,
-        )
-        notify_bid_accepted(str(bid.id))
+    def test_notification_content_contains_route(self, _presence, posted_order, driver):
+        driver.driver_profile.is_available = True
+        driver.driver_profile.save(update_fields=["is_available"])
+        notify_new_order_posted(str(posted_order.id))
         notif = Notification.objects.filter(user=driver).first()
-        assert notif is not None
-        assert "accepted" in notif.title.lower() or "accepted" in notif.body.lower()
-
-    def test_nonexistent_bid_does_not_raise(self):
-        notify_bid_accepted("00000000-0000-0000-0000-000000000000")
+        assert "Dakar" in notif.body or "Thiès" in notif.body
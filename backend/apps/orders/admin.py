@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FreightOrder, OrderAssignment
+from .models import DispatchOffer, FreightOrder, OrderAssignment
 
 
 @admin.register(FreightOrder)
@@ -14,3 +14,10 @@ class FreightOrderAdmin(admin.ModelAdmin):
 class OrderAssignmentAdmin(admin.ModelAdmin):
     list_display = ["order", "driver", "vehicle", "assigned_at", "delivered_at"]
     search_fields = ["order__reference", "driver__phone_number"]
+
+
+@admin.register(DispatchOffer)
+class DispatchOfferAdmin(admin.ModelAdmin):
+    list_display = ["order", "driver", "wave", "score", "status", "expires_at", "responded_at"]
+    list_filter = ["status"]
+    search_fields = ["order__reference", "driver__phone_number"]
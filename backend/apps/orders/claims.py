@@ -0,0 +1,66 @@
+"""
+MESS Platform — Order Acceptance Claims
+Fast path in front of AcceptOrderView for orders that many drivers try to
+accept at once.
+
+The first driver to accept an order takes a short-lived Redis claim on it
+(one EVAL: set-if-absent, or already held by the same driver). Every other
+driver is turned away with a 409 before any database work. The claim is
+only a filter: the conditional UPDATE of the order (status still POSTED)
+decides the winner. If Redis is unreachable, every caller goes through to
+the database and the conditional UPDATE alone rejects the losers.
+
+A claim is released when its holder fails to accept (validation, state)
+and otherwise expires after ORDER_ACCEPT["CLAIM_TTL_SECONDS"].
+"""
+import logging
+
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+
+logger = logging.getLogger(__name__)
+
+# 1 if the claim is now (or already was) held by ARGV[1], else 0
+_ACQUIRE = """
+local holder = redis.call('GET', KEYS[1])
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+if holder == ARGV[1] then
+    return 1
+end
+return 0
+"""
+
+# Delete only our own claim
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _key(order_id) -> str:
+    return redis_key("orders", "claim", order_id)
+
+
+def acquire(order_id, driver_id) -> bool:
+    """False if another driver holds the order's claim; True otherwise (fails open)."""
+    try:
+        return bool(get_redis().eval(
+            _ACQUIRE, 1, _key(order_id), str(driver_id), settings.ORDER_ACCEPT["CLAIM_TTL_SECONDS"],
+        ))
+    except Exception as exc:
+        logger.warning(f"Order claims unavailable, deferring to the database for order {order_id}: {exc}")
+        return True
+
+
+def release(order_id, driver_id) -> None:
+    try:
+        get_redis().eval(_RELEASE, 1, _key(order_id), str(driver_id))
+    except Exception as exc:
+        # The claim expires on its own
+        logger.warning(f"Could not release the claim on order {order_id}: {exc}")
@@ -0,0 +1,212 @@
+"""
+MESS Platform — Auto-Dispatch
+With ORDER_DISPATCH["MODE"] = "auto" a posted order is offered to a few
+drivers at a time instead of being broadcast to every nearby driver:
+
+  wave 1          the WAVE_SIZE best matches (apps/orders/matching.py) each
+                  get a DispatchOffer and a notification, open for
+                  OFFER_TTL_SECONDS. Only they can accept the order meanwhile.
+  timeout         the scheduler expires the wave's open offers and offers the
+                  order to the next WAVE_SIZE matches not offered it yet
+  all declined    a wave whose offers are all declined moves on at once
+  accepted        the order's other open offers are cancelled
+  exhausted       after MAX_WAVES, or when no driver is left to offer it to,
+                  the order is broadcast (notify_new_order_posted) and any
+                  driver can accept it
+
+Wave timers live in the Redis sorted set mess:orders:dispatch:timers, member
+"<order_id>:<wave>" scored by its due time. `manage.py dispatch_scheduler`
+pops due members with ZREM — whoever removes a member handles that wave, so
+schedulers can run side by side and a decline racing a timeout advances the
+order once. Nothing polls the offers table. If Redis is unreachable when a
+wave would be offered, the order is broadcast instead.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.exceptions import BusinessLogicError
+from core.redis import get_redis, redis_key
+from .models import DispatchOffer, DispatchOfferStatus, FreightOrder, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+BROADCAST = "broadcast"
+
+TIMERS = ("orders", "dispatch", "timers")
+
+
+def is_auto() -> bool:
+    return settings.ORDER_DISPATCH["MODE"] == AUTO
+
+
+def _key() -> str:
+    return redis_key(*TIMERS)
+
+
+def _member(order_id, wave: int) -> str:
+    return f"{order_id}:{wave}"
+
+
+def _open_offers(**filters):
+    """Pending offers still inside their window; a lapsed one frees the order before its timer fires."""
+    now = timezone.now()
+    return DispatchOffer.objects.filter(status=DispatchOfferStatus.PENDING, expires_at__gt=now, **filters)
+
+
+def start(order: FreightOrder) -> int:
+    """Offer a freshly posted order to its first wave; returns the number of drivers offered it."""
+    return offer_wave(order, 1)
+
+
+def offer_wave(order: FreightOrder, wave: int) -> int:
+    """Offer `order` to the next best drivers not offered it yet, or broadcast it when done."""
+    from apps.notifications.tasks import send_bulk_notification_task
+    from .matching import rank_drivers
+
+    conf = settings.ORDER_DISPATCH
+    if order.status != OrderStatus.POSTED:
+        return 0
+    if wave > conf["MAX_WAVES"]:
+        _broadcast(order, f"{conf['MAX_WAVES']} waves without a taker")
+        return 0
+
+    offered = {str(d) for d in DispatchOffer.objects.filter(order=order).values_list("driver_id", flat=True)}
+    matches = [
+        m for m in rank_drivers(order, limit=conf["WAVE_SIZE"] + len(offered))
+        if m.driver_id not in offered
+    ][:conf["WAVE_SIZE"]]
+    if not matches:
+        _broadcast(order, "no drivers left to offer it to")
+        return 0
+
+    expires_at = timezone.now() + timedelta(seconds=conf["OFFER_TTL_SECONDS"])
+    # The timer goes first: offers without one would keep the order closed to other drivers
+    try:
+        get_redis().zadd(_key(), {_member(order.id, wave): expires_at.timestamp()})
+    except Exception as exc:
+        logger.warning(f"Dispatch timers unavailable, broadcasting order {order.id}: {exc}")
+        _broadcast(order, "timers unavailable")
+        return 0
+
+    DispatchOffer.objects.bulk_create(
+        [
+            DispatchOffer(order=order, driver_id=m.driver_id, wave=wave, score=m.score, expires_at=expires_at)
+            for m in matches
+        ],
+        ignore_conflicts=True,
+    )
+    send_bulk_notification_task.delay(
+        [m.driver_id for m in matches],
+        "Freight Order Offered to You",
+        f"{order.pickup_city} → {order.delivery_city} | {order.weight_kg}kg — "
+        f"accept within {conf['OFFER_TTL_SECONDS']}s",
+        {
+            "type": "ORDER_POSTED",
+            "order_id": str(order.id),
+            "dispatch": {"wave": wave, "expires_at": expires_at.isoformat()},
+        },
+    )
+    logger.info(f"Order {order.id} offered to {len(matches)} drivers (wave {wave}).")
+    return len(matches)
+
+
+def _broadcast(order: FreightOrder, reason: str) -> None:
+    from apps.notifications.tasks import notify_new_order_posted
+
+    logger.info(f"Auto-dispatch of order {order.id} ended ({reason}); broadcasting it.")
+    notify_new_order_posted.delay(str(order.id))
+
+
+def expire_wave(order_id, wave: int) -> None:
+    """Close a wave whose timer is due (or whose offers were all declined) and offer the next."""
+    DispatchOffer.objects.filter(order_id=order_id, wave=wave, status=DispatchOfferStatus.PENDING).update(
+        status=DispatchOfferStatus.EXPIRED,
+    )
+    order = FreightOrder.objects.filter(id=order_id, status=OrderStatus.POSTED).first()
+    if order is None:
+        return
+    if _open_offers(order_id=order_id).exists():
+        return
+    offer_wave(order, wave + 1)
+
+
+def decline(offer: DispatchOffer) -> None:
+    """Decline an open offer; when it was the wave's last, move on without waiting for the timer."""
+    declined = DispatchOffer.objects.filter(id=offer.id, status=DispatchOfferStatus.PENDING).update(
+        status=DispatchOfferStatus.DECLINED, responded_at=timezone.now(),
+    )
+    if not declined:
+        raise BusinessLogicError("This offer is no longer open.")
+    if _open_offers(order_id=offer.order_id, wave=offer.wave).exists():
+        return
+    try:
+        claimed = get_redis().zrem(_key(), _member(offer.order_id, offer.wave))
+    except Exception as exc:
+        # The timer still fires and moves the order on
+        logger.warning(f"Dispatch timers unavailable for order {offer.order_id}: {exc}")
+        return
+    if claimed:
+        expire_wave(offer.order_id, offer.wave)
+
+
+def check_can_accept(order: FreightOrder, driver) -> None:
+    """While a wave is out, only the drivers it was offered to may accept the order."""
+    open_offers = _open_offers(order=order)
+    if open_offers.exists() and not open_offers.filter(driver=driver).exists():
+        raise BusinessLogicError("This order is currently offered to other drivers.")
+
+
+def accepted(order: FreightOrder, driver) -> None:
+    """Record the winning offer (if any), cancel the rest and drop their timers."""
+    now = timezone.now()
+    DispatchOffer.objects.filter(order=order, driver=driver, status=DispatchOfferStatus.PENDING).update(
+        status=DispatchOfferStatus.ACCEPTED, responded_at=now,
+    )
+    pending = DispatchOffer.objects.filter(order=order, status=DispatchOfferStatus.PENDING)
+    waves = set(pending.values_list("wave", flat=True))
+    if not waves:
+        return
+    pending.update(status=DispatchOfferStatus.CANCELLED)
+    try:
+        get_redis().zrem(_key(), *(_member(order.id, w) for w in waves))
+    except Exception as exc:
+        # A leftover timer finds the order assigned and does nothing
+        logger.warning(f"Could not drop dispatch timers of order {order.id}: {exc}")
+
+
+def pop_due(now: Optional[float] = None, limit: Optional[int] = None) -> list[tuple[str, int]]:
+    """Claim up to `limit` due wave timers; each is returned to exactly one caller."""
+    now = time.time() if now is None else now
+    limit = limit or settings.ORDER_DISPATCH["BATCH_SIZE"]
+    r = get_redis()
+    members = r.zrangebyscore(_key(), "-inf", now, start=0, num=limit)
+    if not members:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for member in members:
+        pipe.zrem(_key(), member)
+    due = []
+    for member, removed in zip(members, pipe.execute()):
+        if not removed:
+            continue  # Claimed by another scheduler, or cancelled by a decline or an accept
+        member = member.decode() if isinstance(member, bytes) else member
+        order_id, wave = member.rsplit(":", 1)
+        due.append((order_id, int(wave)))
+    return due
+
+
+def run_due(now: Optional[float] = None) -> int:
+    """Expire every due wave and offer the next; returns how many waves were handled."""
+    due = pop_due(now)
+    for order_id, wave in due:
+        try:
+            expire_wave(order_id, wave)
+        except Exception:
+            logger.exception(f"Dispatch wave {wave} of order {order_id} failed.")
+    return len(due)
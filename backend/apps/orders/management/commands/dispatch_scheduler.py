@@ -0,0 +1,47 @@
+"""
+Management command servicing the auto-dispatch wave timers
+(ORDER_DISPATCH["MODE"] = "auto", see apps.orders.dispatch).
+Several can run side by side; each due wave is handled by one of them.
+
+Usage:
+    ./manage.py dispatch_scheduler
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.orders import dispatch
+
+MAX_BACKOFF_SECONDS = 5.0
+
+
+class Command(BaseCommand):
+    help = "Expire auto-dispatch offers when their wave times out and offer the next wave."
+
+    def handle(self, *args, **options):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        conf = settings.ORDER_DISPATCH
+        self.stdout.write("Dispatch scheduler started.")
+        backoff, handled = 0.0, 0
+        while self._running:
+            close_old_connections()
+            try:
+                count = dispatch.run_due()
+                handled += count
+                backoff = 0.0
+                if count < conf["BATCH_SIZE"]:
+                    time.sleep(conf["POLL_SECONDS"])
+            except Exception as exc:
+                backoff = min(max(backoff * 2, 0.5), MAX_BACKOFF_SECONDS)
+                self.stderr.write(f"Dispatch scheduler error, retrying in {backoff:.1f}s: {exc}")
+                time.sleep(backoff)
+        self.stdout.write(self.style.SUCCESS(f"Dispatch scheduler stopped after {handled} waves."))
+
+    def _stop(self, signum, frame):
+        self._running = False
@@ -0,0 +1,239 @@
+"""
+MESS Platform — Driver–Order Matching
+Ranks drivers for a posted order; used for new-order notifications and the
+admin/broker candidate list.
+
+Candidates are the available drivers nearest to the pickup from the live
+location store (a Redis GEOSEARCH), or, when it is off, unreachable or empty,
+the on-duty driver profiles (is_available index) that are still present.
+Three bulk queries then load their ratings, vehicles and recent offers and
+acceptances, and every candidate is scored in one NumPy pass:
+
+    score = Σ weight × component, each component in [0, 1]
+
+  distance      1 at the pickup, 0 at RADIUS_KM (0 when the position is unknown)
+  payload_fit   order weight / capacity of the smallest active vehicle that can
+                carry it, so a 2 t load prefers a 3 t truck to a 30 t one.
+                Drivers whose every known vehicle is too small are excluded;
+                no vehicle or an unknown capacity scores UNKNOWN_PAYLOAD_FIT
+  vehicle_type  1 if the driver has an active vehicle of the required type (or
+                none is required), else 0
+  rating        driver rating / 5, pulled towards RATING_PRIOR for drivers
+                with few ratings
+  acceptance    orders accepted / ORDER_POSTED offers received over
+                ACCEPTANCE_WINDOW_DAYS, pulled towards ACCEPTANCE_PRIOR
+
+Weights come from settings.ORDER_MATCHING["WEIGHTS"].
+"""
+import logging
+from datetime import timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from core.utils import haversine_many
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ("distance", "payload_fit", "vehicle_type", "rating", "acceptance")
+
+
+class Match(NamedTuple):
+    driver_id: str
+    score: float
+    distance_km: Optional[float]
+    payload_fit: float
+    has_vehicle_type: bool
+    rating: float
+    acceptance_rate: float
+
+    def as_dict(self) -> dict:
+        return {**self._asdict(), "score": round(self.score, 4)}
+
+
+def score(components: dict[str, np.ndarray], weights: Optional[dict] = None) -> np.ndarray:
+    """Weighted sum of 0–1 component arrays; weights are normalised to sum to 1."""
+    weights = weights or settings.ORDER_MATCHING["WEIGHTS"]
+    total = sum(weights.get(name, 0) for name in COMPONENTS) or 1
+    result = np.zeros(len(next(iter(components.values()))), dtype=np.float64)
+    for name in COMPONENTS:
+        if weights.get(name):
+            result += weights[name] / total * components[name]
+    return result
+
+
+def rank_drivers(order, limit: Optional[int] = None, conf: Optional[dict] = None) -> list[Match]:
+    """Top `limit` (default TOP_K) drivers for `order`, best first."""
+    conf = conf or settings.ORDER_MATCHING
+    limit = limit or conf["TOP_K"]
+    driver_ids, distances = _candidates(order, conf)
+    if not driver_ids:
+        return []
+
+    ratings, rating_counts, active = _profiles(driver_ids)
+    fit, has_type = _vehicles(order, driver_ids, conf)
+    offered, accepted = _history(driver_ids, conf)
+
+    prior_weight = conf["PRIOR_WEIGHT"]
+    rating = (ratings * rating_counts + conf["RATING_PRIOR"] * prior_weight) / (rating_counts + prior_weight)
+    acceptance = np.minimum(
+        (accepted + conf["ACCEPTANCE_PRIOR"] * prior_weight) / (offered + prior_weight), 1.0
+    )
+    scores = score({
+        "distance": np.nan_to_num(np.clip(1 - distances / conf["RADIUS_KM"], 0.0, 1.0), nan=0.0),
+        "payload_fit": np.nan_to_num(fit, nan=0.0),
+        "vehicle_type": has_type.astype(np.float64),
+        "rating": rating / 5,
+        "acceptance": acceptance,
+    }, conf["WEIGHTS"])
+
+    eligible = np.flatnonzero(active & ~np.isnan(fit))
+    if len(eligible) > limit:
+        eligible = eligible[np.argpartition(-scores[eligible], limit - 1)[:limit]]
+    best = eligible[np.argsort(-scores[eligible], kind="stable")]
+    return [
+        Match(
+            driver_id=driver_ids[i],
+            score=float(scores[i]),
+            distance_km=None if np.isnan(distances[i]) else round(float(distances[i]), 2),
+            payload_fit=round(float(fit[i]), 3),
+            has_vehicle_type=bool(has_type[i]),
+            rating=round(float(rating[i]), 2),
+            acceptance_rate=round(float(acceptance[i]), 3),
+        )
+        for i in best
+    ]
+
+
+def _candidates(order, conf: dict) -> tuple[list[str], np.ndarray]:
+    """Candidate driver ids and their distance to the pickup in km (NaN if unknown)."""
+    from apps.tracking import live
+
+    has_pickup = order.pickup_lat is not None and order.pickup_lng is not None
+    if has_pickup and live.is_enabled():
+        try:
+            positions = live.search_available(
+                float(order.pickup_lat), float(order.pickup_lng), conf["RADIUS_KM"],
+                limit=conf["CANDIDATE_LIMIT"],
+            )
+        except Exception as e:
+            logger.warning(f"Live location store unavailable for order {order.id}: {e}")
+            positions = []
+        if positions:
+            return (
+                [p.driver_id for p in positions],
+                np.array([p.distance_km for p in positions], dtype=np.float64),
+            )
+    return _profile_candidates(order, conf, has_pickup)
+
+
+def _profile_candidates(order, conf: dict, has_pickup: bool) -> tuple[list[str], np.ndarray]:
+    """On-duty, still present drivers from their profiles, for when the live store has none."""
+    from apps.accounts.models import DriverProfile
+    from apps.tracking import presence
+
+    rows = list(
+        DriverProfile.objects.filter(is_available=True, user__is_active=True)
+        .order_by("-last_location_update")
+        .values_list("user_id", "current_lat", "current_lng")[:conf["CANDIDATE_LIMIT"]]
+    )
+    online = set(presence.filter_online(user_id for user_id, _, _ in rows))
+    rows = [row for row in rows if str(row[0]) in online]
+    if not rows:
+        return [], np.empty(0)
+
+    lats = np.array([np.nan if lat is None else float(lat) for _, lat, _ in rows], dtype=np.float64)
+    lngs = np.array([np.nan if lng is None else float(lng) for _, _, lng in rows], dtype=np.float64)
+    if has_pickup:
+        distances = haversine_many(float(order.pickup_lat), float(order.pickup_lng), lats, lngs)
+    else:
+        distances = np.full(len(rows), np.nan)
+    # Drivers known to be beyond the radius are left out; unknown positions stay in
+    keep = ~(distances > conf["RADIUS_KM"])
+    return [str(rows[i][0]) for i in np.flatnonzero(keep)], distances[keep]
+
+
+def _index(driver_ids: list[str]) -> dict[str, int]:
+    return {driver_id: i for i, driver_id in enumerate(driver_ids)}
+
+
+def _profiles(driver_ids: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ratings, rating counts and whether each driver is an active user with a profile."""
+    from apps.accounts.models import DriverProfile
+
+    index = _index(driver_ids)
+    ratings = np.zeros(len(driver_ids))
+    counts = np.zeros(len(driver_ids))
+    active = np.zeros(len(driver_ids), dtype=bool)
+    for user_id, rating, total_ratings in DriverProfile.objects.filter(
+        user_id__in=driver_ids, user__is_active=True,
+    ).values_list("user_id", "rating", "total_ratings"):
+        i = index[str(user_id)]
+        ratings[i], counts[i], active[i] = float(rating), total_ratings, True
+    return ratings, counts, active
+
+
+def _vehicles(order, driver_ids: list[str], conf: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Payload fit (NaN when no vehicle can carry the load) and required-type match per driver."""
+    from apps.fleet.models import Vehicle
+
+    index = _index(driver_ids)
+    rows = list(
+        Vehicle.objects.filter(owner_id__in=driver_ids, is_active=True)
+        .values_list("owner_id", "vehicle_type_id", "payload_kg", "vehicle_type__max_payload_kg")
+    )
+    n = len(driver_ids)
+    has_type = np.full(n, order.required_vehicle_type_id is None)
+    fit = np.full(n, conf["UNKNOWN_PAYLOAD_FIT"])
+    if not rows:
+        return fit, has_type
+
+    owners = np.array([index[str(owner_id)] for owner_id, _, _, _ in rows])
+    capacity = np.array(
+        [payload or type_max or np.nan for _, _, payload, type_max in rows], dtype=np.float64
+    )
+    if order.required_vehicle_type_id is not None:
+        required = np.array([type_id == order.required_vehicle_type_id for _, type_id, _, _ in rows])
+        np.logical_or.at(has_type, owners[required], True)
+
+    weight = float(order.weight_kg or 0)
+    known = ~np.isnan(capacity)
+    fitting = known & (capacity >= weight)
+    smallest = np.full(n, np.inf)
+    np.minimum.at(smallest, owners[fitting], capacity[fitting])
+    any_unknown = np.zeros(n, dtype=bool)
+    np.logical_or.at(any_unknown, owners[~known], True)
+    any_known = np.zeros(n, dtype=bool)
+    np.logical_or.at(any_known, owners[known], True)
+
+    can_carry = np.isfinite(smallest)
+    fit[can_carry] = np.minimum(weight / smallest[can_carry], 1.0) if weight else 1.0
+    # Only known capacities, all too small for the load
+    fit[any_known & ~can_carry & ~any_unknown] = np.nan
+    return fit, has_type
+
+
+def _history(driver_ids: list[str], conf: dict) -> tuple[np.ndarray, np.ndarray]:
+    """ORDER_POSTED offers received and orders accepted per driver over the window."""
+    from apps.notifications.models import Notification, NotificationType
+    from .models import OrderAssignment
+
+    since = timezone.now() - timedelta(days=conf["ACCEPTANCE_WINDOW_DAYS"])
+    index = _index(driver_ids)
+    offered = np.zeros(len(driver_ids))
+    accepted = np.zeros(len(driver_ids))
+    for user_id, count in (
+        Notification.objects.filter(
+            user_id__in=driver_ids, notification_type=NotificationType.ORDER_POSTED, created_at__gte=since,
+        ).values("user_id").annotate(n=Count("id")).values_list("user_id", "n")
+    ):
+        offered[index[str(user_id)]] = count
+    for driver_id, count in (
+        OrderAssignment.objects.filter(driver_id__in=driver_ids, assigned_at__gte=since)
+        .values("driver_id").annotate(n=Count("id")).values_list("driver_id", "n")
+    ):
+        accepted[index[str(driver_id)]] = count
+    return offered, accepted
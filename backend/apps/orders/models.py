@@ -186,3 +186,43 @@ class OrderAssignment(BaseModel):
 
     def __str__(self):
         return f"Assignment: {self.order.reference} → Driver {self.driver}"
+
+
+class DispatchOfferStatus(models.TextChoices):
+    PENDING = "PENDING", "Pending"
+    ACCEPTED = "ACCEPTED", "Accepted"
+    DECLINED = "DECLINED", "Declined"
+    EXPIRED = "EXPIRED", "Expired"
+    CANCELLED = "CANCELLED", "Cancelled"
+
+
+class DispatchOffer(BaseModel):
+    """A posted order offered to one driver by auto-dispatch, open until expires_at."""
+
+    order = models.ForeignKey(FreightOrder, on_delete=models.CASCADE, related_name="dispatch_offers")
+    driver = models.ForeignKey(
+        "accounts.User", on_delete=models.CASCADE, related_name="dispatch_offers"
+    )
+    wave = models.PositiveSmallIntegerField()
+    score = models.FloatField(null=True, blank=True, help_text="Match score when offered")
+    status = models.CharField(
+        max_length=10, choices=DispatchOfferStatus.choices, default=DispatchOfferStatus.PENDING
+    )
+    expires_at = models.DateTimeField()
+    responded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Dispatch Offer"
+        ordering = ["order", "wave", "-score"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "driver"], name="orders_dispatchoffer_order_driver_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["order", "status"], name="orders_do_order_status_idx"),
+            models.Index(fields=["driver", "status"], name="orders_do_driver_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Offer: {self.order.reference} → {self.driver} (wave {self.wave}, {self.status})"
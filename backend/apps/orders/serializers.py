@@ -3,7 +3,7 @@ from rest_framework import serializers
 
 from apps.accounts.serializers import UserBasicSerializer
 from apps.fleet.serializers import VehicleListSerializer, VehicleTypeSerializer
-from .models import FreightOrder, OrderAssignment, OrderStatus
+from .models import DispatchOffer, FreightOrder, OrderAssignment, OrderStatus
 
 
 class OrderAssignmentSerializer(serializers.ModelSerializer):
@@ -40,6 +40,16 @@ class FreightOrderListSerializer(serializers.ModelSerializer):
         ]
 
 
+class DispatchOfferSerializer(serializers.ModelSerializer):
+    """An auto-dispatch offer as shown to its driver."""
+    order_detail = FreightOrderListSerializer(source="order", read_only=True)
+
+    class Meta:
+        model = DispatchOffer
+        fields = ["id", "order", "order_detail", "wave", "status", "expires_at", "responded_at"]
+        read_only_fields = fields
+
+
 class FreightOrderDetailSerializer(serializers.ModelSerializer):
     """Full order detail with nested relations and an offline price suggestion."""
     shipper_detail = UserBasicSerializer(source="shipper", read_only=True)
@@ -47,6 +57,7 @@ class FreightOrderDetailSerializer(serializers.ModelSerializer):
     assignment = OrderAssignmentSerializer(read_only=True)
     can_accept = serializers.SerializerMethodField()
     suggested_price = serializers.SerializerMethodField()
+    eta = serializers.SerializerMethodField()
 
     class Meta:
         model = FreightOrder
@@ -61,13 +72,13 @@ class FreightOrderDetailSerializer(serializers.ModelSerializer):
             "required_vehicle_type", "required_vehicle_type_detail",
             "proposed_price", "final_price", "currency",
             "status", "status_changed_at", "cancellation_reason",
-            "estimated_distance_km", "suggested_price",
+            "estimated_distance_km", "suggested_price", "eta",
             "assignment", "can_accept",
             "created_at", "updated_at",
         ]
         read_only_fields = [
             "id", "reference", "shipper", "status", "status_changed_at",
-            "final_price", "estimated_distance_km", "suggested_price",
+            "final_price", "estimated_distance_km", "suggested_price", "eta",
             "created_at", "updated_at",
         ]
 
@@ -98,6 +109,19 @@ class FreightOrderDetailSerializer(serializers.ModelSerializer):
         except Exception:
             return None
 
+    def get_eta(self, obj):
+        """
+        Live time-to-pickup / time-to-delivery from the tracking ETA cache.
+        Returns None when the order is not being driven or no fix has arrived yet.
+        """
+        from apps.tracking.eta import ETA_STATUSES, get_eta
+        if obj.status not in ETA_STATUSES:
+            return None
+        try:
+            return get_eta(obj.id)
+        except Exception:
+            return None
+
     def get_can_accept(self, obj):
         """True if the current driver can accept this order."""
         request = self.context.get("request")
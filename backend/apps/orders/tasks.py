@@ -23,3 +23,15 @@ def cancel_stale_orders():
     )
     logger.info(f"Auto-cancelled {count} stale orders.")
     return count
+
+
+@shared_task(name="apps.orders.tasks.start_dispatch")
+def start_dispatch(order_id: str):
+    """Offer a newly posted order to its first auto-dispatch wave."""
+    from .dispatch import start
+    from .models import FreightOrder
+    try:
+        order = FreightOrder.objects.get(id=order_id)
+    except FreightOrder.DoesNotExist:
+        return 0
+    return start(order)
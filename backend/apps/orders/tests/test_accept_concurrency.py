@@ -0,0 +1,136 @@
+"""
+Load tests for order acceptance under a stampede of concurrent accepts.
+Each driver posts from its own thread and database connection.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from apps.orders import claims
+from apps.orders.models import OrderAssignment, OrderStatus
+
+BASE = "/api/v1/orders"
+DRIVERS = 20
+
+
+class FakeClaimRedis:
+    """Runs the two claim scripts atomically, like Redis would."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}
+        self.calls = 0
+
+    def eval(self, script, numkeys, key, holder, *args):
+        with self._lock:
+            self.calls += 1
+            current = self.values.get(key)
+            if script == claims._ACQUIRE:
+                if current is None:
+                    self.values[key] = holder
+                    return 1
+                return int(current == holder)
+            if current == holder:
+                del self.values[key]
+                return 1
+            return 0
+
+
+def _drivers(n):
+    from apps.accounts.models import DriverProfile, User
+    users = []
+    for i in range(n):
+        user = User.objects.create_user(phone_number=f"+2217790000{i:02d}", password="testpass123",
+                                        first_name="Driver", last_name=str(i), role="DRIVER")
+        DriverProfile.objects.create(user=user, license_number=f"SN-{i}", is_available=True)
+        users.append(user)
+    return users
+
+
+def _stampede(order, drivers) -> list[int]:
+    barrier = threading.Barrier(len(drivers))
+
+    def accept(driver):
+        client = APIClient()
+        client.force_authenticate(user=driver)
+        barrier.wait()
+        try:
+            return client.post(f"{BASE}/{order.id}/accept/", {}, format="json").status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(drivers)) as pool:
+        return list(pool.map(accept, drivers))
+
+
+@pytest.fixture(autouse=True)
+def no_notifications():
+    with patch("apps.notifications.tasks.notify_order_status_change.delay"):
+        yield
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAcceptStampede:
+    def test_one_winner_with_claims(self, posted_order):
+        redis = FakeClaimRedis()
+        with patch("apps.orders.claims.get_redis", return_value=redis):
+            statuses = _stampede(posted_order, _drivers(DRIVERS))
+
+        assert sorted(statuses) == [200] + [409] * (DRIVERS - 1)
+        assert OrderAssignment.objects.filter(order=posted_order).count() == 1
+        posted_order.refresh_from_db()
+        assert posted_order.status == OrderStatus.ASSIGNED
+        # One claim per driver; the losers never reached the database
+        assert redis.calls == DRIVERS
+
+    def test_one_winner_when_redis_is_down(self, posted_order):
+        redis = MagicMock()
+        redis.eval.side_effect = ConnectionError
+        with patch("apps.orders.claims.get_redis", return_value=redis):
+            statuses = _stampede(posted_order, _drivers(DRIVERS))
+
+        # Accepts that read the order after the winner committed see it assigned (422)
+        assert statuses.count(200) == 1
+        assert set(statuses) <= {200, 409, 422}
+        assert OrderAssignment.objects.filter(order=posted_order).count() == 1
+
+
+@pytest.mark.django_db
+class TestAcceptClaims:
+    def test_claim_held_by_another_driver_is_a_conflict(self, driver_client, posted_order):
+        redis = MagicMock()
+        redis.eval.return_value = 0
+        with patch("apps.orders.claims.get_redis", return_value=redis):
+            resp = driver_client.post(f"{BASE}/{posted_order.id}/accept/", {})
+        assert resp.status_code == 409
+        posted_order.refresh_from_db()
+        assert posted_order.status == OrderStatus.POSTED
+
+    def test_failed_accept_releases_the_claim(self, driver_client, driver, draft_order):
+        redis = FakeClaimRedis()
+        with patch("apps.orders.claims.get_redis", return_value=redis):
+            resp = driver_client.post(f"{BASE}/{draft_order.id}/accept/", {})
+        assert resp.status_code == 422
+        assert redis.values == {}
+
+    def test_fast_path_runs_the_assignment_hooks(self, driver_client, driver, posted_order):
+        from apps.messaging.models import Conversation, Message
+        from apps.orders.signals import STATUS_MESSAGES
+
+        conversation = Conversation.objects.create(order=posted_order)
+        before = posted_order.updated_at
+        with patch("apps.orders.claims.get_redis", return_value=FakeClaimRedis()), \
+                patch("apps.tracking.signals._invalidate_zones") as invalidate_zones:
+            resp = driver_client.post(f"{BASE}/{posted_order.id}/accept/", {})
+        assert resp.status_code == 200
+
+        posted_order.refresh_from_db()
+        assert posted_order.updated_at > before
+        assert Message.objects.filter(
+            conversation=conversation, message_type="SYSTEM", content=STATUS_MESSAGES["ASSIGNED"],
+        ).exists()
+        invalidate_zones.assert_called_with(driver.id)
@@ -0,0 +1,185 @@
+"""
+Tests for sequential auto-dispatch with timed offers.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.utils import timezone
+
+from apps.orders import dispatch
+from apps.orders.models import DispatchOffer, DispatchOfferStatus, OrderStatus
+
+BASE = "/api/v1/orders"
+
+
+def _driver(phone, lat):
+    from apps.accounts.models import DriverProfile, User
+    user = User.objects.create_user(phone_number=phone, password="testpass123", first_name="Driver",
+                                    last_name=phone[-2:], role="DRIVER")
+    DriverProfile.objects.create(user=user, license_number=phone, is_available=True, current_lat=lat,
+                                 current_lng=-17.44)
+    return user
+
+
+def _client(user):
+    from rest_framework.test import APIClient
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def auto_dispatch(settings):
+    settings.ORDER_DISPATCH = {**settings.ORDER_DISPATCH, "MODE": "auto", "WAVE_SIZE": 2, "MAX_WAVES": 2}
+    settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+    with patch("apps.tracking.presence.filter_online", side_effect=lambda ids: [str(i) for i in ids]):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def offer_notifications():
+    """Offer notifications sent by dispatch; no Celery worker runs in tests."""
+    with patch("apps.notifications.tasks.send_bulk_notification_task.delay") as send, \
+            patch("apps.notifications.tasks.notify_order_status_change.delay"):
+        yield send
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    redis.zrem.return_value = 1
+    with patch("apps.orders.dispatch.get_redis", return_value=redis):
+        yield redis
+
+
+@pytest.fixture
+def drivers(db):
+    """Five drivers, nearest to the pickup first."""
+    return [_driver(f"+22177000000{i}", lat=14.70 + i * 0.05) for i in range(5)]
+
+
+def _offered(order, wave):
+    return {o.driver_id for o in DispatchOffer.objects.filter(order=order, wave=wave)}
+
+
+@pytest.mark.django_db
+class TestWaves:
+    def test_first_wave_goes_to_the_best_matches(self, redis, posted_order, drivers, offer_notifications):
+        assert dispatch.start(posted_order) == 2
+        assert _offered(posted_order, 1) == {drivers[0].id, drivers[1].id}
+        member, due = next(iter(redis.zadd.call_args.args[1].items()))
+        assert member == f"{posted_order.id}:1"
+
+        recipients, title, body, data = offer_notifications.call_args.args
+        assert set(recipients) == {str(drivers[0].id), str(drivers[1].id)}
+        assert data["type"] == "ORDER_POSTED"
+        assert data["order_id"] == str(posted_order.id)
+        assert data["dispatch"]["wave"] == 1
+        assert data["dispatch"]["expires_at"] == datetime.fromtimestamp(due, tz=dt_timezone.utc).isoformat()
+
+    def test_timeout_expires_the_wave_and_offers_the_next(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        dispatch.expire_wave(posted_order.id, 1)
+
+        statuses = DispatchOffer.objects.filter(order=posted_order, wave=1).values_list("status", flat=True)
+        assert set(statuses) == {DispatchOfferStatus.EXPIRED}
+        assert _offered(posted_order, 2) == {drivers[2].id, drivers[3].id}
+
+    def test_last_decline_moves_on_at_once(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        first, second = DispatchOffer.objects.filter(order=posted_order, wave=1)
+
+        dispatch.decline(first)
+        assert not _offered(posted_order, 2)
+        dispatch.decline(second)
+        redis.zrem.assert_called_once_with(dispatch._key(), f"{posted_order.id}:1")
+        assert len(_offered(posted_order, 2)) == 2
+
+    def test_decline_next_to_a_lapsed_offer_moves_on(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        first, second = DispatchOffer.objects.filter(order=posted_order, wave=1)
+        second.expires_at = timezone.now() - timedelta(seconds=1)
+        second.save(update_fields=["expires_at"])
+
+        dispatch.decline(first)
+        assert len(_offered(posted_order, 2)) == 2
+        second.refresh_from_db()
+        assert second.status == DispatchOfferStatus.EXPIRED
+
+    def test_decline_racing_the_timer_advances_once(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        redis.zrem.return_value = 0  # The scheduler popped the timer first
+        for offer in DispatchOffer.objects.filter(order=posted_order, wave=1):
+            dispatch.decline(offer)
+        assert not _offered(posted_order, 2)
+
+    def test_order_is_broadcast_after_max_waves(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        dispatch.expire_wave(posted_order.id, 1)
+        with patch("apps.notifications.tasks.notify_new_order_posted.delay") as broadcast:
+            dispatch.expire_wave(posted_order.id, 2)
+        broadcast.assert_called_once_with(str(posted_order.id))
+        assert not DispatchOffer.objects.filter(
+            order=posted_order, status=DispatchOfferStatus.PENDING,
+        ).exists()
+
+    def test_redis_down_falls_back_to_broadcast(self, redis, posted_order, drivers):
+        redis.zadd.side_effect = ConnectionError
+        with patch("apps.notifications.tasks.notify_new_order_posted.delay") as broadcast:
+            assert dispatch.start(posted_order) == 0
+        broadcast.assert_called_once()
+        assert not DispatchOffer.objects.filter(order=posted_order).exists()
+
+    def test_pop_due_returns_only_claimed_timers(self, redis):
+        redis.zrangebyscore.return_value = [b"a1:1", b"b2:3"]
+        redis.pipeline.return_value.execute.return_value = [1, 0]
+        assert dispatch.pop_due(now=100.0) == [("a1", 1)]
+
+
+@pytest.mark.django_db
+class TestOfferEndpoints:
+    def test_only_offered_drivers_can_accept_during_a_wave(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+
+        resp = _client(drivers[4]).post(f"{BASE}/{posted_order.id}/accept/", {})
+        assert resp.status_code in (400, 422)
+
+        resp = _client(drivers[0]).post(f"{BASE}/{posted_order.id}/accept/", {})
+        assert resp.status_code == 200
+        statuses = dict(DispatchOffer.objects.filter(order=posted_order).values_list("driver_id", "status"))
+        assert statuses == {
+            drivers[0].id: DispatchOfferStatus.ACCEPTED, drivers[1].id: DispatchOfferStatus.CANCELLED,
+        }
+        redis.zrem.assert_called_with(dispatch._key(), f"{posted_order.id}:1")
+
+    def test_lapsed_offers_stop_holding_the_order_before_the_timer_fires(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        lapsed = timezone.now() - timedelta(seconds=1)
+        DispatchOffer.objects.filter(order=posted_order).update(expires_at=lapsed)
+
+        resp = _client(drivers[4]).post(f"{BASE}/{posted_order.id}/accept/", {})
+        assert resp.status_code == 200
+
+    def test_driver_lists_and_declines_offers(self, redis, posted_order, drivers):
+        dispatch.start(posted_order)
+        client = _client(drivers[0])
+
+        resp = client.get(f"{BASE}/offers/")
+        assert resp.status_code == 200
+        offers = resp.json()["results"]
+        assert [o["order"] for o in offers] == [str(posted_order.id)]
+
+        resp = client.post(f"{BASE}/offers/{offers[0]['id']}/decline/")
+        assert resp.status_code == 200
+        assert client.get(f"{BASE}/offers/").json()["results"] == []
+
+    def test_posting_starts_dispatch(self, shipper_client, draft_order):
+        with patch("apps.orders.tasks.start_dispatch.delay") as start, \
+                patch("apps.notifications.tasks.notify_new_order_posted.delay") as broadcast:
+            resp = shipper_client.post(f"{BASE}/{draft_order.id}/post/")
+        assert resp.status_code == 200
+        start.assert_called_once_with(str(draft_order.id))
+        broadcast.assert_not_called()
+        draft_order.refresh_from_db()
+        assert draft_order.status == OrderStatus.POSTED
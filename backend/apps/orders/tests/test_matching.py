@@ -0,0 +1,140 @@
+"""
+Tests for the driver–order matching engine.
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from apps.orders.matching import rank_drivers, score
+
+BASE = "/api/v1/orders"
+
+
+def _driver(phone, lat=None, lng=None, rating=0, total_ratings=0):
+    from apps.accounts.models import DriverProfile, User
+    user = User.objects.create_user(phone_number=phone, password="testpass123", first_name="Driver",
+                                    last_name=phone[-2:], role="DRIVER")
+    DriverProfile.objects.create(user=user, license_number=phone, is_available=True, current_lat=lat,
+                                 current_lng=lng, rating=rating, total_ratings=total_ratings)
+    return user
+
+
+def _vehicle(owner, registration, vehicle_type=None, payload_kg=None):
+    from apps.fleet.models import Vehicle
+    return Vehicle.objects.create(owner=owner, registration_number=registration, vehicle_type=vehicle_type,
+                                  payload_kg=payload_kg)
+
+
+@pytest.fixture(autouse=True)
+def profiles_only(settings):
+    """Rank from driver profiles, with every driver present."""
+    settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+    with patch("apps.tracking.presence.filter_online", side_effect=lambda ids: [str(i) for i in ids]):
+        yield
+
+
+class TestScore:
+    def test_weights_are_normalised(self):
+        components = {name: np.array([1.0, 0.0]) for name in ("distance", "payload_fit", "vehicle_type",
+                                                              "rating", "acceptance")}
+        assert score(components, {"distance": 2, "rating": 2}).tolist() == [1.0, 0.0]
+
+    def test_ten_thousand_candidates(self):
+        rng = np.random.default_rng(0)
+        components = {name: rng.random(10_000) for name in ("distance", "payload_fit", "vehicle_type",
+                                                            "rating", "acceptance")}
+        scores = score(components, {"distance": 1, "acceptance": 1})
+        assert scores.shape == (10_000,)
+        assert scores == pytest.approx((components["distance"] + components["acceptance"]) / 2)
+
+
+@pytest.mark.django_db
+class TestRankDrivers:
+    def test_nearer_driver_ranks_first(self, posted_order):
+        far = _driver("+221770000001", lat=14.79, lng=-16.92)
+        near = _driver("+221770000002", lat=14.70, lng=-17.44)
+        matches = rank_drivers(posted_order)
+        assert [m.driver_id for m in matches] == [str(near.id), str(far.id)]
+        assert matches[0].distance_km < 2
+
+    def test_drivers_beyond_the_radius_are_left_out(self, posted_order, settings):
+        settings.ORDER_MATCHING = {**settings.ORDER_MATCHING, "RADIUS_KM": 10}
+        _driver("+221770000001", lat=14.79, lng=-16.92)
+        assert rank_drivers(posted_order) == []
+
+    def test_vehicles_too_small_are_excluded_and_closest_fit_wins(self, posted_order):
+        small = _driver("+221770000001", lat=14.70, lng=-17.44)
+        _vehicle(small, "DK-0001-A", payload_kg=500)
+        huge = _driver("+221770000002", lat=14.70, lng=-17.44)
+        _vehicle(huge, "DK-0002-A", payload_kg=30_000)
+        snug = _driver("+221770000003", lat=14.70, lng=-17.44)
+        _vehicle(snug, "DK-0003-A", payload_kg=500)
+        _vehicle(snug, "DK-0004-A", payload_kg=1_200)
+
+        matches = {m.driver_id: m for m in rank_drivers(posted_order)}
+        assert str(small.id) not in matches
+        assert matches[str(snug.id)].payload_fit == pytest.approx(1000 / 1200, abs=1e-3)
+        assert matches[str(snug.id)].score > matches[str(huge.id)].score
+
+    def test_required_vehicle_type(self, posted_order, vehicle_type):
+        from apps.fleet.models import VehicleType
+        posted_order.required_vehicle_type = vehicle_type
+        posted_order.save(update_fields=["required_vehicle_type"])
+        other_type = VehicleType.objects.create(name="Pickup", name_fr="Pick-up", max_payload_kg=1_500)
+
+        wrong = _driver("+221770000001", lat=14.70, lng=-17.44)
+        _vehicle(wrong, "DK-0001-A", vehicle_type=other_type)
+        right = _driver("+221770000002", lat=14.72, lng=-17.40)
+        _vehicle(right, "DK-0002-A", vehicle_type=vehicle_type)
+
+        matches = rank_drivers(posted_order)
+        assert matches[0].driver_id == str(right.id)
+        assert matches[0].has_vehicle_type and not matches[1].has_vehicle_type
+
+    def test_rating_and_acceptance(self, posted_order, shipper):
+        from apps.notifications.models import Notification
+        from apps.orders.models import FreightOrder, OrderAssignment
+
+        ignores = _driver("+221770000001", lat=14.70, lng=-17.44, rating=4.9, total_ratings=40)
+        Notification.objects.bulk_create([
+            Notification(user=ignores, notification_type="ORDER_POSTED", title="t", body="b")
+            for _ in range(20)
+        ])
+        accepts = _driver("+221770000002", lat=14.70, lng=-17.44, rating=4.9, total_ratings=40)
+        Notification.objects.bulk_create([
+            Notification(user=accepts, notification_type="ORDER_POSTED", title="t", body="b")
+            for _ in range(4)
+        ])
+        for i in range(4):
+            other = FreightOrder.objects.create(
+                shipper=shipper, cargo_description="Rice", weight_kg=500, pickup_address="Dakar",
+                delivery_address="Thiès", delivery_city="Thiès",
+            )
+            OrderAssignment.objects.create(order=other, driver=accepts)
+
+        matches = rank_drivers(posted_order)
+        assert matches[0].driver_id == str(accepts.id)
+        assert matches[0].acceptance_rate > 0.5 > matches[1].acceptance_rate
+
+    def test_limit(self, posted_order):
+        for i in range(5):
+            _driver(f"+22177000001{i}", lat=14.70 + i * 0.01, lng=-17.44)
+        matches = rank_drivers(posted_order, limit=3)
+        assert len(matches) == 3
+        assert [m.score for m in matches] == sorted((m.score for m in matches), reverse=True)
+
+
+@pytest.mark.django_db
+class TestOrderMatchesView:
+    def test_admin_gets_ranked_drivers(self, admin_client, posted_order):
+        driver = _driver("+221770000001", lat=14.70, lng=-17.44)
+        resp = admin_client.get(f"{BASE}/{posted_order.id}/matches/?limit=5")
+        assert resp.status_code == 200
+        assert resp.data["count"] == 1
+        assert resp.data["results"][0]["driver_id"] == str(driver.id)
+        assert resp.data["results"][0]["driver_name"] == driver.full_name
+
+    def test_shippers_cannot_list_matches(self, shipper_client, posted_order):
+        resp = shipper_client.get(f"{BASE}/{posted_order.id}/matches/")
+        assert resp.status_code == 403
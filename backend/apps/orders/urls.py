@@ -3,8 +3,11 @@ from django.urls import path
 from .views import (
     AcceptOrderView,
     ConfirmDeliveryView,
+    DeclineOfferView,
+    DispatchOfferListView,
     FreightOrderDetailView,
     FreightOrderListCreateView,
+    OrderMatchesView,
     OrderTransitionView,
     PickupProofView,
     PostOrderView,
@@ -17,10 +20,13 @@ from .views import (
 urlpatterns = [
     path("estimate-price/", PriceEstimateView.as_view(), name="orders-estimate-price"),
     path("", FreightOrderListCreateView.as_view(), name="orders-list"),
+    path("offers/", DispatchOfferListView.as_view(), name="orders-offers"),
+    path("offers/<uuid:pk>/decline/", DeclineOfferView.as_view(), name="orders-offer-decline"),
     path("<uuid:pk>/", FreightOrderDetailView.as_view(), name="orders-detail"),
     path("<uuid:pk>/post/", PostOrderView.as_view(), name="orders-post"),
     path("<uuid:pk>/transition/", OrderTransitionView.as_view(), name="orders-transition"),
     path("<uuid:pk>/accept/", AcceptOrderView.as_view(), name="orders-accept"),
+    path("<uuid:pk>/matches/", OrderMatchesView.as_view(), name="orders-matches"),
     path("<uuid:pk>/pickup-proof/", PickupProofView.as_view(), name="orders-pickup-proof"),
     path("<uuid:pk>/revert-pickup/", RevertPickupView.as_view(), name="orders-revert-pickup"),
     path("<uuid:pk>/proof-of-delivery/", ProofOfDeliveryView.as_view(), name="orders-pod"),
@@ -5,21 +5,27 @@ Handles the full freight order lifecycle.
 import logging
 
 from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
 from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from core.exceptions import BusinessLogicError, OrderStateError
-from core.permissions import IsAdmin, IsCarrier, IsShipperOrBroker
+from core.exceptions import BusinessLogicError, ConflictError, OrderStateError
+from core.permissions import IsAdminOrBroker, IsCarrier
+from . import claims, dispatch
 from .models import (
     ACTIVE_ORDER_STATUSES,
+    DispatchOffer,
+    DispatchOfferStatus,
     FreightOrder,
     OrderAssignment,
     OrderStatus,
 )
 from .serializers import (
     AcceptOrderSerializer,
+    DispatchOfferSerializer,
     FreightOrderDetailSerializer,
     FreightOrderListSerializer,
     OrderStatusTransitionSerializer,
@@ -152,9 +158,15 @@ class PostOrderView(APIView):
     def post(self, request, pk):
         order = FreightOrder.objects.get(pk=pk, shipper=request.user)
         order.transition_to(OrderStatus.POSTED)
-        # Notify nearby available drivers
-        from apps.notifications.tasks import notify_new_order_posted
-        notify_new_order_posted.delay(str(order.id))
+        from .dispatch import is_auto
+        if is_auto():
+            # Offer it to the best-matched drivers, a wave at a time
+            from .tasks import start_dispatch
+            start_dispatch.delay(str(order.id))
+        else:
+            # Notify nearby available drivers
+            from apps.notifications.tasks import notify_new_order_posted
+            notify_new_order_posted.delay(str(order.id))
         return Response({"message": "Order posted.", "status": order.status})
 
 
@@ -162,6 +174,12 @@ class AcceptOrderView(APIView):
     """
     POST /orders/<id>/accept/
     Driver accepts a posted order at the shipper's proposed price.
+
+    Under a stampede of accepts, the first driver takes the order's Redis
+    claim (apps/orders/claims.py) and the others get a 409 straight away. The
+    winner is decided by a conditional UPDATE on the order row (status still
+    POSTED), so accepts that get past the claim while Redis is down still
+    produce one assignment and 409s.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -169,38 +187,90 @@ class AcceptOrderView(APIView):
         if request.user.role != "DRIVER":
             raise BusinessLogicError("Only drivers can accept orders.")
 
+        serializer = AcceptOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if not claims.acquire(pk, request.user.id):
+            raise ConflictError("This order is being accepted by another driver.")
+        try:
+            order = self._accept(request.user, pk, serializer.validated_data.get("vehicle"))
+        except Exception:
+            claims.release(pk, request.user.id)
+            raise
+
+        from apps.notifications.tasks import notify_order_status_change
+        notify_order_status_change.delay(str(order.id), OrderStatus.ASSIGNED)
+        return Response({"message": "Order accepted. You have been assigned.", "status": order.status})
+
+    def _accept(self, driver, pk, vehicle_id):
         order = FreightOrder.objects.get(pk=pk)
         if order.status != OrderStatus.POSTED:
             raise BusinessLogicError("This order is not available for acceptance.")
-        if hasattr(order, "assignment"):
-            raise BusinessLogicError("This order has already been assigned.")
-
-        serializer = AcceptOrderSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        dispatch.check_can_accept(order, driver)
 
         vehicle = None
-        vehicle_id = serializer.validated_data.get("vehicle")
         if vehicle_id:
             from apps.fleet.models import Vehicle
             try:
-                vehicle = Vehicle.objects.get(id=vehicle_id, owner=request.user)
+                vehicle = Vehicle.objects.get(id=vehicle_id, owner=driver)
             except Vehicle.DoesNotExist:
                 raise BusinessLogicError("Vehicle not found or does not belong to you.")
 
+        accepted_fields = ["status", "final_price", "status_changed_at", "updated_at"]
         with transaction.atomic():
-            order.final_price = order.proposed_price
-            order.transition_to(OrderStatus.ASSIGNED, save=False)
-            order.save(update_fields=["final_price", "status", "status_changed_at"])
+            # Concurrent accepts queue on the row lock; all but the first then match no row
+            now = timezone.now()
+            won = FreightOrder.objects.filter(pk=order.pk, status=OrderStatus.POSTED).update(
+                status=OrderStatus.ASSIGNED,
+                final_price=F("proposed_price"),
+                status_changed_at=now,
+                updated_at=now,
+            )
+            if not won:
+                raise ConflictError("This order has just been accepted by another driver.")
+            order.refresh_from_db(fields=accepted_fields)
 
             OrderAssignment.objects.create(
                 order=order,
-                driver=request.user,
+                driver=driver,
                 vehicle=vehicle,
             )
+            # update() skips save(): run its status hooks (system message, tracking) as save() would
+            post_save.send(
+                sender=FreightOrder, instance=order, created=False, raw=False,
+                using=order._state.db, update_fields=frozenset(accepted_fields),
+            )
+            dispatch.accepted(order, driver)
+        return order
 
-        from apps.notifications.tasks import notify_order_status_change
-        notify_order_status_change.delay(str(order.id), OrderStatus.ASSIGNED)
-        return Response({"message": "Order accepted. You have been assigned.", "status": order.status})
+
+class DispatchOfferListView(generics.ListAPIView):
+    """
+    GET /orders/offers/
+    The driver's open auto-dispatch offers; accept one through /orders/<id>/accept/.
+    """
+    serializer_class = DispatchOfferSerializer
+    permission_classes = [IsCarrier]
+
+    def get_queryset(self):
+        return DispatchOffer.objects.filter(
+            driver=self.request.user,
+            status=DispatchOfferStatus.PENDING,
+            expires_at__gt=timezone.now(),
+        ).select_related("order__shipper", "order__required_vehicle_type")
+
+
+class DeclineOfferView(APIView):
+    """
+    POST /orders/offers/<id>/decline/
+    Decline an auto-dispatch offer so the order moves on to other drivers.
+    """
+    permission_classes = [IsCarrier]
+
+    def post(self, request, pk):
+        offer = DispatchOffer.objects.get(pk=pk, driver=request.user)
+        dispatch.decline(offer)
+        return Response({"message": "Offer declined."})
 
 
 class PickupProofView(APIView):
@@ -368,6 +438,37 @@ class RateDeliveryView(APIView):
         return Response({"message": "Rating submitted. Thank you!"})
 
 
+class OrderMatchesView(APIView):
+    """
+    GET /orders/<id>/matches/?limit=20
+    Drivers ranked for a posted order by the matching engine, best first,
+    with the score and its inputs. Admins and brokers only.
+    """
+    permission_classes = [IsAdminOrBroker]
+
+    def get(self, request, pk):
+        from django.conf import settings
+        from apps.accounts.models import User
+        from .matching import rank_drivers
+
+        order = FreightOrder.objects.get(pk=pk)
+        if order.status != OrderStatus.POSTED:
+            raise BusinessLogicError("Only posted orders can be matched.")
+        try:
+            limit = int(request.query_params.get("limit", settings.ORDER_MATCHING["TOP_K"]))
+        except ValueError:
+            raise BusinessLogicError("limit must be an integer.")
+        limit = max(1, min(limit, 200))
+
+        matches = rank_drivers(order, limit=limit)
+        drivers = User.objects.filter(id__in=[m.driver_id for m in matches]).only(
+            "id", "first_name", "last_name",
+        )
+        names = {str(user.id): user.full_name for user in drivers}
+        results = [{**m.as_dict(), "driver_name": names.get(m.driver_id, "")} for m in matches]
+        return Response({"order_id": str(order.id), "count": len(results), "results": results})
+
+
 class PriceEstimateView(APIView):
     """
     POST /orders/estimate-price/
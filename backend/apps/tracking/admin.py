@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import GPSPing, OrderRoute
+from .models import GeofenceEvent, GPSPing, OrderRoute
 
 
 @admin.register(GPSPing)
@@ -12,3 +12,10 @@ class GPSPingAdmin(admin.ModelAdmin):
 @admin.register(OrderRoute)
 class OrderRouteAdmin(admin.ModelAdmin):
     list_display = ["order", "planned_distance_km", "actual_distance_km"]
+
+
+@admin.register(GeofenceEvent)
+class GeofenceEventAdmin(admin.ModelAdmin):
+    list_display = ["order", "driver", "zone", "event", "occurred_at", "dwell_seconds"]
+    list_filter = ["zone", "event"]
+    date_hierarchy = "occurred_at"
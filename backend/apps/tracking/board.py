@@ -0,0 +1,133 @@
+"""
+MESS Platform — Carrier Dispatch Board
+One live view of a carrier's whole fleet over a single WebSocket.
+
+CarrierDispatchConsumer joins carrier_<carrier_profile_id> and first sends a
+snapshot (build_board): every employed driver with availability, presence,
+last known position, active assignments and their ETAs — a handful of
+queries and Redis pipelines whatever the fleet size. After that only compact
+deltas are sent to the group:
+
+  {"type": "position", "driver_id", "p": [lat, lng, speed, bearing, unix_ts]}
+      from the driver's location stream, at the fleet map rate
+  {"type": "eta", "order_id", "m": minutes_to_delivery, "pm": minutes_to_pickup}
+      from the ETA engine when an estimate changes
+  {"type": "order", "order_id", "driver_id", "reference", "status"}
+      on assignment and on every order status change
+"""
+import logging
+from datetime import datetime
+
+from asgiref.sync import async_to_sync
+
+logger = logging.getLogger(__name__)
+
+BOARD_ORDER_STATUSES = ("ASSIGNED", "PICKUP_PENDING", "PICKED_UP", "IN_TRANSIT", "DELIVERED")
+
+
+def carrier_group(carrier_id) -> str:
+    return f"carrier_{carrier_id}"
+
+
+def position_delta(driver_id, lat, lng, speed, bearing, timestamp: datetime) -> dict:
+    return {
+        "type": "position",
+        "driver_id": str(driver_id),
+        "p": [lat, lng, speed, bearing, round(timestamp.timestamp(), 1)],
+    }
+
+
+def eta_delta(order_id, eta: dict) -> dict:
+    return {
+        "type": "eta",
+        "order_id": str(order_id),
+        "m": eta["to_delivery_minutes"],
+        "pm": eta["to_pickup_minutes"],
+    }
+
+
+def build_board(carrier_id) -> dict:
+    """Snapshot of a carrier's drivers, their positions, active orders and ETAs."""
+    from apps.accounts.models import DriverProfile
+    from apps.orders.models import OrderAssignment
+    from . import eta, live, presence
+
+    drivers = list(
+        DriverProfile.objects.filter(employer_id=carrier_id, user__is_active=True).values(
+            "user_id", "user__first_name", "user__last_name", "is_available",
+        )
+    )
+    driver_ids = [str(d["user_id"]) for d in drivers]
+
+    assignments = list(
+        OrderAssignment.objects.filter(
+            driver_id__in=driver_ids, order__status__in=BOARD_ORDER_STATUSES,
+        ).values("driver_id", "order_id", "order__reference", "order__status")
+    )
+    try:
+        positions = live.get_positions(driver_ids)
+        etas = eta.get_etas([a["order_id"] for a in assignments])
+        online = set(presence.filter_online(driver_ids))
+    except Exception as exc:
+        logger.warning(f"Dispatch board for carrier {carrier_id} without live data: {exc}")
+        positions, etas, online = {}, {}, set()
+
+    orders_by_driver = {}
+    for a in assignments:
+        orders_by_driver.setdefault(str(a["driver_id"]), []).append({
+            "order_id": str(a["order_id"]),
+            "reference": a["order__reference"],
+            "status": a["order__status"],
+            "eta": etas.get(str(a["order_id"])),
+        })
+
+    board = []
+    for d in drivers:
+        driver_id = str(d["user_id"])
+        position = positions.get(driver_id)
+        board.append({
+            "driver_id": driver_id,
+            "driver_name": f"{d['user__first_name']} {d['user__last_name']}".strip(),
+            "is_available": d["is_available"],
+            "online": driver_id in online,
+            "p": None if position is None else [
+                position.lat, position.lng, position.speed, position.bearing,
+                round(position.timestamp.timestamp(), 1) if position.timestamp else None,
+            ],
+            "orders": orders_by_driver.get(driver_id, []),
+        })
+    return {"type": "board_snapshot", "carrier_id": str(carrier_id), "drivers": board}
+
+
+def group_message(delta: dict) -> dict:
+    """Channel layer message carrying a delta to CarrierDispatchConsumer.board_delta."""
+    return {"type": "board_delta", "delta": delta}
+
+
+def send(carrier_id, delta: dict) -> None:
+    """Push a delta to a carrier's board from synchronous code."""
+    try:
+        from channels.layers import get_channel_layer
+        channel_layer = get_channel_layer()
+        if channel_layer:
+            async_to_sync(channel_layer.group_send)(carrier_group(carrier_id), group_message(delta))
+    except Exception as exc:
+        logger.warning(f"Dispatch board update for carrier {carrier_id} failed: {exc}")
+
+
+def order_changed(order_id) -> None:
+    """Send an order's current status to its driver's carrier board, if the driver has an employer."""
+    from apps.orders.models import OrderAssignment
+
+    row = OrderAssignment.objects.filter(order_id=order_id).values(
+        "driver_id", "driver__driver_profile__employer_id", "order__reference", "order__status",
+    ).first()
+    if not row or not row["driver__driver_profile__employer_id"]:
+        return
+    send(row["driver__driver_profile__employer_id"], {
+        "type": "order",
+        "order_id": str(order_id),
+        "driver_id": str(row["driver_id"]),
+        "reference": row["order__reference"],
+        "status": row["order__status"],
+    })
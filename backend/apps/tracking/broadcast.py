@@ -0,0 +1,213 @@
+"""
+MESS Platform — Coalesced Order Tracking Broadcasts
+Rate-limits location fan-out to order_tracking_<order_id> groups.
+
+A driver may send several fixes per second, but a shipper's map only needs
+the newest one about once a second. Per group, the coalescer sends at most
+TRACKING_BROADCAST["MAX_RATE_HZ"] messages: the first update in a window goes
+out immediately, later ones replace each other and only the last is sent
+when the window closes. Groups nobody is watching are skipped entirely —
+OrderTrackingConsumer keeps a per-order watcher count in Redis
+(tracking:watchers:<order_id>), cached here for a couple of seconds. Every
+connected watcher refreshes the count's TTL each WATCHERS_REFRESH_SECONDS,
+so it only expires once no consumer is left to refresh it (e.g. after a
+crash that skipped the decrement).
+
+The coalescer is per worker process; a driver's socket lives on one worker,
+so each order's updates pass through a single coalescer. Its counters are
+logged and reset every TRACKING_BROADCAST["STATS_LOG_SECONDS"].
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+
+logger = logging.getLogger(__name__)
+
+# Recount from scratch if consumers crash without decrementing
+WATCHERS_TTL_SECONDS = 15 * 60
+WATCHERS_REFRESH_SECONDS = WATCHERS_TTL_SECONDS // 3
+
+
+def watchers_key(order_id):
+    return redis_key("tracking", "watchers", order_id)
+
+
+def order_group(order_id) -> str:
+    return f"order_tracking_{order_id}"
+
+
+def location_update(driver_id, driver_name: str, record) -> dict:
+    """The order group message for a driver's newest fix (a PingRecord)."""
+    return {
+        "type": "location_update",
+        "driver_id": str(driver_id),
+        "driver_name": driver_name,
+        "lat": record.lat,
+        "lng": record.lng,
+        "speed": record.speed_kmh,
+        "bearing": record.bearing,
+        "timestamp": record.timestamp.isoformat(),
+    }
+
+
+def add_watcher(order_id) -> None:
+    key = watchers_key(order_id)
+    pipe = get_redis().pipeline()
+    pipe.incr(key)
+    pipe.expire(key, WATCHERS_TTL_SECONDS)
+    pipe.execute()
+
+
+def refresh_watcher(order_id) -> None:
+    """Keep a connected watcher counted; re-count it if the key was lost anyway."""
+    key = watchers_key(order_id)
+    if not get_redis().expire(key, WATCHERS_TTL_SECONDS):
+        add_watcher(order_id)
+
+
+def remove_watcher(order_id) -> None:
+    key = watchers_key(order_id)
+    if get_redis().decr(key) <= 0:
+        get_redis().delete(key)
+
+
+def watcher_count(order_id) -> int:
+    value = get_redis().get(watchers_key(order_id))
+    return max(int(value), 0) if value else 0
+
+
+class BroadcastCoalescer:
+    """
+    Keeps the newest pending message per group and sends it at most once per
+    interval. `sender(group, message)` does the actual group_send and
+    `watchers(order_id)` returns the current subscriber count.
+    """
+
+    def __init__(
+        self,
+        max_rate_hz: float = 1.0,
+        watcher_cache_seconds: float = 2.0,
+        stats_log_seconds: float = 60.0,
+        sender: Optional[Callable[[str, dict], Awaitable]] = None,
+        watchers: Optional[Callable[[str], int]] = None,
+    ):
+        self.interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self.watcher_cache_seconds = watcher_cache_seconds
+        self.stats_log_seconds = stats_log_seconds
+        self._sender = sender or _channel_layer_send
+        self._watchers = watchers or watcher_count
+        self._pending: dict[str, dict] = {}
+        self._last_sent: dict[str, float] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._watcher_cache: dict[str, tuple[float, bool]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"received": 0, "sent": 0, "coalesced": 0, "unwatched": 0, "failed": 0}
+        self._stats_since = time.monotonic()
+
+    async def publish(self, order_id, message: dict) -> None:
+        """Queue the latest location of an order for its tracking group."""
+        if time.monotonic() - self._stats_since >= self.stats_log_seconds:
+            self._report_stats()
+        self.stats["received"] += 1
+        if self.stats["received"] % 1000 == 0:
+            self._prune()
+        order_id = str(order_id)
+        if not await self._is_watched(order_id):
+            self.stats["unwatched"] += 1
+            return
+
+        group = order_group(order_id)
+        if group in self._pending:
+            self.stats["coalesced"] += 1
+            self._pending[group] = message
+            return
+
+        now = time.monotonic()
+        wait = self._last_sent.get(group, float("-inf")) + self.interval - now
+        if wait <= 0:
+            await self._send(group, message)
+            return
+
+        self._pending[group] = message
+        loop = asyncio.get_running_loop()
+        self._timers[group] = loop.call_later(wait, self._spawn_send, group)
+
+    async def _is_watched(self, order_id: str) -> bool:
+        now = time.monotonic()
+        cached = self._watcher_cache.get(order_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        try:
+            watched = await sync_to_async(self._watchers, thread_sensitive=False)(order_id) > 0
+        except Exception as exc:
+            # Fail open: an extra broadcast is better than a frozen map
+            logger.warning(f"Could not read tracking watchers for order {order_id}: {exc}")
+            watched = True
+        self._watcher_cache[order_id] = (now + self.watcher_cache_seconds, watched)
+        return watched
+
+    def _spawn_send(self, group: str):
+        self._timers.pop(group, None)
+        message = self._pending.pop(group, None)
+        if message is None:
+            return
+        task = asyncio.ensure_future(self._send(group, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, group: str, message: dict):
+        self._last_sent[group] = time.monotonic()
+        try:
+            await self._sender(group, message)
+            self.stats["sent"] += 1
+        except Exception as exc:
+            self.stats["failed"] += 1
+            logger.warning(f"Tracking broadcast to {group} failed: {exc}")
+
+    def _prune(self):
+        """Forget per-group state for groups idle longer than the send interval and cache."""
+        now = time.monotonic()
+        for group, sent_at in list(self._last_sent.items()):
+            if sent_at + self.interval < now and group not in self._pending:
+                del self._last_sent[group]
+        for order_id, (expires, _) in list(self._watcher_cache.items()):
+            if expires < now:
+                del self._watcher_cache[order_id]
+
+    def _report_stats(self):
+        """Log the counters since the last report and start counting afresh."""
+        now = time.monotonic()
+        logger.info(f"Tracking broadcasts over the last {now - self._stats_since:.0f}s: {self.stats}")
+        self.stats = dict.fromkeys(self.stats, 0)
+        self._stats_since = now
+
+    def forget_watchers(self, order_id) -> None:
+        """Drop the cached watcher state so the next update re-reads it."""
+        self._watcher_cache.pop(str(order_id), None)
+
+
+async def _channel_layer_send(group: str, message: dict):
+    from channels.layers import get_channel_layer
+    await get_channel_layer().group_send(group, message)
+
+
+_coalescer: Optional[BroadcastCoalescer] = None
+
+
+def get_broadcaster() -> BroadcastCoalescer:
+    """Return this worker's shared coalescer, creating it on first use."""
+    global _coalescer
+    if _coalescer is None:
+        conf = settings.TRACKING_BROADCAST
+        _coalescer = BroadcastCoalescer(
+            max_rate_hz=conf["MAX_RATE_HZ"],
+            watcher_cache_seconds=conf["WATCHER_CACHE_SECONDS"],
+            stats_log_seconds=conf["STATS_LOG_SECONDS"],
+        )
+    return _coalescer
@@ -5,25 +5,62 @@ Drivers stream GPS updates; shippers/admins subscribe to order tracking.
 Connection URL patterns:
   Driver sends location:   ws://.../ws/tracking/driver/
   Shipper watches order:   ws://.../ws/tracking/order/<order_id>/
+  Admin/carrier fleet map: ws://.../ws/tracking/fleet/
+  Carrier dispatch board:  ws://.../ws/tracking/carrier/ (admins: .../carrier/<carrier_id>/)
+
+Drivers may negotiate the "mess.gps.v1" subprotocol to send batches of fixes
+in compact binary frames instead of one JSON frame per fix (see protocol.py).
 """
+import asyncio
 import json
 import logging
-from decimal import Decimal
+import time
+import uuid
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.utils import timezone
 
+from . import protocol
+from .broadcast import get_broadcaster, location_update
+from .filters import PingFilter
+from .ingest import FLUSH_BEFORE_ACK, PingRecord, get_durability_mode, get_ping_buffer
+
 logger = logging.getLogger(__name__)
 
 
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+@database_sync_to_async
+def _carrier_profile_id(user):
+    from apps.accounts.models import CarrierProfile
+    carrier_id = CarrierProfile.objects.filter(user=user).values_list("id", flat=True).first()
+    return str(carrier_id) if carrier_id else None
+
+
 class DriverLocationConsumer(AsyncWebsocketConsumer):
     """
-    Drivers connect here to stream their GPS location.
+    Drivers connect here to stream their GPS location, either as one JSON
+    frame per fix or as binary batches (subprotocol mess.gps.v1).
     Each update is:
-    1. Saved to the database (GPSPing)
-    2. Broadcast to the order's tracking channel group
-    3. Updates the driver's current location on their profile
+    1. Checked by the connection's PingFilter (stationary noise, impossible
+       jumps and inaccurate fixes are dropped), then
+       appended to the worker's write-behind ping buffer, which persists
+       GPSPings and the driver's current location in batches — or, in
+       "stream" ingest mode, hands them to the Redis ping stream for the
+       writer processes
+    2. Broadcast to the order's tracking channel group through the
+       worker's coalescer (newest fix only, rate-limited, skipped when
+       nobody is watching), to the fleet map tiles containing it and to
+       the employing carrier's dispatch board
+    3. Acked to the driver — immediately, or once committed when
+       TRACKING_INGEST["DURABILITY"] is "flush_before_ack". A binary batch
+       gets a single cumulative ack.
+    Pings keep the driver present (apps.tracking.presence); with nothing to
+    report, the app sends {"type": "heartbeat"} text frames instead.
     """
 
     async def connect(self):
@@ -34,94 +71,194 @@ class DriverLocationConsumer(AsyncWebsocketConsumer):
 
         self.driver = user
         self.group_name = f"driver_{user.id}"
+        self.wait_for_commit = get_durability_mode() == FLUSH_BEFORE_ACK
+        self.ping_filter = PingFilter()
+        self.carrier_id = await self._employer_id()
+        self._fleet_groups = set()
+        self._fleet_sent_at = float("-inf")
+        binary = protocol.SUBPROTOCOL in self.scope.get("subprotocols", [])
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        await self.accept(subprotocol=protocol.SUBPROTOCOL if binary else None)
+        await self._sync_live_state()
+        await self._touch_presence()
         logger.info(f"Driver {user.id} connected to location stream.")
 
     async def disconnect(self, close_code):
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self._leave_fleet_tiles(self._fleet_groups)
+            self.ping_filter.report(self.driver.id)
             # Mark driver offline on disconnect
             await self._set_driver_offline()
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            await self._receive_batch(bytes_data)
+            return
+
         try:
             data = json.loads(text_data)
+            if data.get("type") == "heartbeat":
+                await self._touch_presence()
+                await self.send(text_data=json.dumps({"status": "ok"}))
+                return
             lat = float(data["lat"])
             lng = float(data["lng"])
             order_id = data.get("order_id")
-            accuracy = data.get("accuracy")
-            speed = data.get("speed")
-            bearing = data.get("bearing")
+            order_id = uuid.UUID(str(order_id)) if order_id else None
+            accuracy = _optional_float(data.get("accuracy"))
+            speed = _optional_float(data.get("speed"))
+            bearing = _optional_float(data.get("bearing"))
         except (KeyError, ValueError, TypeError) as e:
             await self.send(text_data=json.dumps({"error": f"Invalid payload: {e}"}))
             return
 
-        # Persist ping
-        ping = await self._save_ping(lat, lng, order_id, accuracy, speed, bearing)
+        timestamp = timezone.now()
+        record = PingRecord(
+            driver_id=self.driver.id,
+            order_id=order_id,
+            lat=lat,
+            lng=lng,
+            accuracy_m=accuracy,
+            speed_kmh=speed,
+            bearing=bearing,
+            timestamp=timestamp,
+        )
+        if not await self._ingest([record]):
+            await self.send(text_data=json.dumps({"error": "Location could not be saved. Please retry."}))
+            return
+        await self.send(text_data=json.dumps({"status": "ok", "timestamp": timestamp.isoformat()}))
 
-        # Update driver's current location in profile
-        await self._update_driver_location(lat, lng)
+    async def _receive_batch(self, frame):
+        try:
+            batch = protocol.decode_batch(frame, now=timezone.now())
+        except protocol.ProtocolError as e:
+            logger.debug(f"Rejected binary frame from driver {self.driver.id}: {e}")
+            await self.send(bytes_data=protocol.encode_ack(protocol.peek_seq(frame), e.status))
+            return
+
+        records = [
+            PingRecord(
+                driver_id=self.driver.id,
+                order_id=batch.order_id,
+                lat=fix.lat,
+                lng=fix.lng,
+                accuracy_m=fix.accuracy_m,
+                speed_kmh=fix.speed_kmh,
+                bearing=fix.bearing,
+                timestamp=fix.timestamp,
+            )
+            for fix in batch.fixes
+        ]
+        status = protocol.STATUS_OK
+        if not await self._ingest(records):
+            status = protocol.STATUS_NOT_SAVED
+        await self.send(bytes_data=protocol.encode_ack(batch.last_seq, status))
+
+    async def _ingest(self, records):
+        """
+        Filter out noise, buffer the remaining pings and broadcast the newest.
+        Returns False if they could not be saved; dropped pings count as handled.
+        """
+        records = self.ping_filter.filter(records)
+        if not records:
+            # Nothing reaches the writer, which would otherwise refresh presence
+            await self._touch_presence()
+            return True
+        try:
+            await get_ping_buffer().add_many(records, wait=self.wait_for_commit)
+        except Exception:
+            return False
 
         # Broadcast to order channel if this ping is for an active order
-        if order_id:
-            await self.channel_layer.group_send(
-                f"order_tracking_{order_id}",
-                {
-                    "type": "location_update",
-                    "driver_id": str(self.driver.id),
-                    "driver_name": self.driver.full_name,
-                    "lat": lat,
-                    "lng": lng,
-                    "speed": speed,
-                    "bearing": bearing,
-                    "timestamp": ping.timestamp.isoformat(),
-                },
+        latest = max(records, key=lambda r: r.timestamp)
+        if latest.order_id:
+            await get_broadcaster().publish(
+                latest.order_id, location_update(self.driver.id, self.driver.full_name, latest),
+            )
+        await self._publish_fleet(latest)
+        return True
+
+    async def _publish_fleet(self, latest):
+        """
+        Send the newest fix to its fleet map tiles and the employer's dispatch
+        board, at most once per MIN_INTERVAL_SECONDS.
+        """
+        from . import fleet
+        now = time.monotonic()
+        if now - self._fleet_sent_at < settings.TRACKING_FLEET_MAP["MIN_INTERVAL_SECONDS"]:
+            return
+        self._fleet_sent_at = now
+        groups = fleet.driver_groups(latest.lat, latest.lng)
+        try:
+            await fleet.publish_position(
+                self.channel_layer, groups, self.driver.id, self.driver.full_name, self.carrier_id, latest,
             )
+        except Exception as exc:
+            logger.warning(f"Fleet map update for driver {self.driver.id} failed: {exc}")
+        await self._leave_fleet_tiles(self._fleet_groups - groups)
+        self._fleet_groups = groups
 
-        await self.send(text_data=json.dumps({"status": "ok", "timestamp": ping.timestamp.isoformat()}))
+    async def _leave_fleet_tiles(self, groups):
+        from . import fleet
+        try:
+            await fleet.publish_leave(self.channel_layer, groups, self.driver.id, self.carrier_id)
+        except Exception as exc:
+            logger.warning(f"Fleet map leave for driver {self.driver.id} failed: {exc}")
 
     @database_sync_to_async
-    def _save_ping(self, lat, lng, order_id, accuracy, speed, bearing):
-        from .models import GPSPing
-        return GPSPing.objects.create(
-            driver=self.driver,
-            order_id=order_id,
-            lat=Decimal(str(lat)),
-            lng=Decimal(str(lng)),
-            accuracy_m=Decimal(str(accuracy)) if accuracy else None,
-            speed_kmh=Decimal(str(speed)) if speed else None,
-            bearing=Decimal(str(bearing)) if bearing else None,
-            timestamp=timezone.now(),
+    def _employer_id(self):
+        from apps.accounts.models import DriverProfile
+        employer_id = (
+            DriverProfile.objects.filter(user=self.driver).values_list("employer_id", flat=True).first()
         )
+        return str(employer_id) if employer_id else None
 
     @database_sync_to_async
-    def _update_driver_location(self, lat, lng):
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
+    def _sync_live_state(self):
+        from . import live
+        if not live.is_enabled():
+            return
         try:
-            profile = self.driver.driver_profile
-            profile.current_lat = Decimal(str(lat))
-            profile.current_lng = Decimal(str(lng))
-            profile.last_location_update = timezone.now()
-            profile.save(update_fields=["current_lat", "current_lng", "last_location_update"])
-        except Exception:
-            pass
+            live.sync_driver_state(self.driver)
+        except Exception as exc:
+            logger.warning(f"Could not sync driver {self.driver.id} to live store: {exc}")
+
+    @database_sync_to_async
+    def _touch_presence(self):
+        from . import presence
+        try:
+            presence.touch([self.driver.id])
+        except Exception as exc:
+            logger.warning(f"Could not refresh presence of driver {self.driver.id}: {exc}")
 
     @database_sync_to_async
     def _set_driver_offline(self):
+        from . import live, presence
         try:
             profile = self.driver.driver_profile
             profile.is_available = False
             profile.save(update_fields=["is_available"])
         except Exception:
             pass
+        if live.is_enabled():
+            try:
+                live.set_driver_state(self.driver.id, available=False)
+            except Exception as exc:
+                logger.warning(f"Could not mark driver {self.driver.id} offline in live store: {exc}")
+        try:
+            presence.remove(self.driver.id)
+        except Exception as exc:
+            logger.warning(f"Could not clear presence of driver {self.driver.id}: {exc}")
 
 
 class OrderTrackingConsumer(AsyncWebsocketConsumer):
     """
     Shippers and admins subscribe to real-time location updates for a specific order.
     Receives broadcast messages from DriverLocationConsumer.
+    Right after connecting, the driver's last known position (a
+    location_update with "snapshot": true) and the cached ETA are sent, so
+    the map can be drawn without waiting for the next ping.
     """
 
     async def connect(self):
@@ -141,26 +278,264 @@ class OrderTrackingConsumer(AsyncWebsocketConsumer):
         self.group_name = f"order_tracking_{self.order_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        for frame in await self._snapshot():
+            await self.send(text_data=json.dumps(frame))
+        await self._update_watchers(joined=True)
+        get_broadcaster().forget_watchers(self.order_id)
+        self._watching = asyncio.ensure_future(self._keep_watching())
 
     async def disconnect(self, close_code):
+        if hasattr(self, "_watching"):
+            self._watching.cancel()
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self._update_watchers(joined=False)
+
+    async def _keep_watching(self):
+        """Refresh the watcher count's TTL for as long as this socket is open."""
+        from .broadcast import WATCHERS_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(WATCHERS_REFRESH_SECONDS)
+            await self._refresh_watcher()
 
     # Receive broadcast from DriverLocationConsumer
     async def location_update(self, event):
         await self.send(text_data=json.dumps(event))
 
+    # Receive ETA changes from the ping writer (apps.tracking.eta)
+    async def eta_update(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    @database_sync_to_async
+    def _snapshot(self):
+        """Frames describing the order's current state: last position, then ETA."""
+        from . import eta, live
+        frames = []
+        try:
+            position = live.get_order_position(self.order_id)
+            if position:
+                frames.append({
+                    "type": "location_update",
+                    "snapshot": True,
+                    "driver_name": self.driver_name,
+                    **position,
+                })
+            order_eta = eta.get_eta(self.order_id)
+            if order_eta:
+                frames.append({"type": "eta_update", "order_id": str(self.order_id), **order_eta})
+        except Exception as exc:
+            logger.warning(f"Could not load tracking snapshot for order {self.order_id}: {exc}")
+        return frames
+
+    @database_sync_to_async
+    def _update_watchers(self, joined):
+        from . import broadcast
+        try:
+            if joined:
+                broadcast.add_watcher(self.order_id)
+            else:
+                broadcast.remove_watcher(self.order_id)
+        except Exception as exc:
+            logger.warning(f"Could not update tracking watchers for order {self.order_id}: {exc}")
+
+    @database_sync_to_async
+    def _refresh_watcher(self):
+        from . import broadcast
+        try:
+            broadcast.refresh_watcher(self.order_id)
+        except Exception as exc:
+            logger.warning(f"Could not refresh tracking watchers for order {self.order_id}: {exc}")
+
     @database_sync_to_async
     def _check_access(self, user, order_id):
         from apps.orders.models import FreightOrder
         try:
-            order = FreightOrder.objects.get(id=order_id)
+            order = FreightOrder.objects.select_related("assignment__driver").get(id=order_id)
+            assignment = getattr(order, "assignment", None)
+            self.driver_name = assignment.driver.full_name if assignment else None
             if user.role == "ADMIN":
                 return True
             if order.shipper == user:
                 return True
-            if hasattr(order, "assignment") and order.assignment.driver == user:
+            if assignment and assignment.driver == user:
                 return True
             return False
         except FreightOrder.DoesNotExist:
             return False
+
+
+class FleetMapConsumer(AsyncWebsocketConsumer):
+    """
+    Live fleet map: admins see every driver, carriers the drivers they employ.
+    Only drivers inside the subscribed viewport are streamed (see fleet.py).
+
+    Client messages (a new subscription replaces the previous one):
+      {"action": "subscribe", "bbox": [west, south, east, north]}
+      {"action": "subscribe", "tiles": ["9/231/234", ...]}
+      {"action": "unsubscribe"}
+    A subscription is answered with "subscribed" (zoom and tiles joined) and
+    a "fleet_snapshot" of the drivers currently in those tiles; after that
+    "fleet_position" and "fleet_leave" events arrive as drivers move.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close(code=4001)
+            return
+        if user.role == "ADMIN":
+            self.carrier_id = None
+        elif user.role == "CARRIER":
+            self.carrier_id = await _carrier_profile_id(user)
+            if self.carrier_id is None:
+                await self.close(code=4003)
+                return
+        else:
+            await self.close(code=4003)
+            return
+
+        self.tile_groups = set()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, "tile_groups", ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        from . import fleet
+        try:
+            data = json.loads(text_data or "")
+            action = data["action"]
+        except (KeyError, ValueError, TypeError) as e:
+            await self.send(text_data=json.dumps({"error": f"Invalid payload: {e}"}))
+            return
+
+        if action == "unsubscribe":
+            await self._set_groups(set())
+            await self.send(text_data=json.dumps({"type": "unsubscribed"}))
+            return
+        if action != "subscribe":
+            await self.send(text_data=json.dumps({"error": f"Unknown action: {action}"}))
+            return
+
+        try:
+            if "bbox" in data:
+                west, south, east, north = (float(v) for v in data["bbox"])
+                tileset = fleet.tiles_for_bbox(west, south, east, north)
+            else:
+                tileset = fleet.parse_tiles(data.get("tiles"))
+        except (ValueError, TypeError) as e:
+            await self.send(text_data=json.dumps({"error": str(e)}))
+            return
+
+        await self._set_groups(tileset.groups)
+        await self.send(text_data=json.dumps({
+            "type": "subscribed", "zoom": tileset.zoom, "tiles": tileset.names(),
+        }))
+        drivers = await self._snapshot(tileset)
+        await self.send(text_data=json.dumps({"type": "fleet_snapshot", "drivers": drivers}))
+
+    async def _set_groups(self, groups):
+        """Join and leave only the tile groups that changed."""
+        for group in self.tile_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in groups - self.tile_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.tile_groups = groups
+
+    def _visible(self, event) -> bool:
+        return self.carrier_id is None or event.get("carrier_id") == self.carrier_id
+
+    async def fleet_position(self, event):
+        if self._visible(event):
+            await self.send(text_data=json.dumps(event))
+
+    async def fleet_leave(self, event):
+        if self._visible(event):
+            await self.send(text_data=json.dumps(event))
+
+    @database_sync_to_async
+    def _snapshot(self, tileset):
+        """Present drivers inside the subscribed tiles, from the live location store."""
+        from django.contrib.auth import get_user_model
+        from apps.accounts.models import DriverProfile
+        from . import fleet, live
+
+        if not live.is_enabled():
+            return []
+        try:
+            positions = live.search_box(
+                *fleet.tileset_bounds(tileset), limit=settings.TRACKING_FLEET_MAP["SNAPSHOT_LIMIT"],
+            )
+        except Exception as exc:
+            logger.warning(f"Fleet map snapshot unavailable: {exc}")
+            return []
+
+        ids = [p.driver_id for p in positions]
+        profiles = DriverProfile.objects.filter(user_id__in=ids, user__is_active=True)
+        if self.carrier_id is not None:
+            profiles = profiles.filter(employer_id=self.carrier_id)
+        carriers = {str(u): str(c) if c else None for u, c in profiles.values_list("user_id", "employer_id")}
+        names = {
+            str(u["id"]): f"{u['first_name']} {u['last_name']}".strip()
+            for u in get_user_model().objects.filter(id__in=carriers.keys()).values(
+                "id", "first_name", "last_name",
+            )
+        }
+        return [
+            {
+                "driver_id": p.driver_id,
+                "driver_name": names.get(p.driver_id, ""),
+                "carrier_id": carriers[p.driver_id],
+                "lat": p.lat,
+                "lng": p.lng,
+                "speed": p.speed,
+                "bearing": p.bearing,
+                "timestamp": p.timestamp.isoformat() if p.timestamp else None,
+            }
+            for p in positions if p.driver_id in carriers
+        ]
+
+
+class CarrierDispatchConsumer(AsyncWebsocketConsumer):
+    """
+    A carrier's dispatch board: a snapshot of every employed driver (position,
+    presence, active orders, ETAs) on connect, then compact deltas as pings
+    and order transitions happen. See board.py for the message formats.
+    Carriers get their own board; admins pass the carrier profile id.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close(code=4001)
+            return
+
+        requested = self.scope["url_route"]["kwargs"].get("carrier_id")
+        if user.role == "ADMIN" and requested:
+            self.carrier_id = requested
+        elif user.role == "CARRIER" and not requested:
+            self.carrier_id = await _carrier_profile_id(user)
+        else:
+            self.carrier_id = None
+        if self.carrier_id is None:
+            await self.close(code=4003)
+            return
+
+        from . import board
+        self.group_name = board.carrier_group(self.carrier_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send(text_data=json.dumps(await self._snapshot()))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def board_delta(self, event):
+        await self.send(text_data=json.dumps(event["delta"]))
+
+    @database_sync_to_async
+    def _snapshot(self):
+        from . import board
+        return board.build_board(self.carrier_id)
@@ -0,0 +1,214 @@
+"""
+MESS Platform — Live ETA
+Time-to-pickup and time-to-delivery for orders being driven.
+
+Updated incrementally by the ping writer: each batch advances, per order, an
+exponentially weighted moving average of the speed observed between
+consecutive fixes (time constant TRACKING_ETA["SPEED_WINDOW_SECONDS"]), and
+the remaining road distance (great-circle × the pricing ROAD_FACTOR) is
+divided by it. Everything lives in one Redis value per order,
+tracking:eta:<order_id>, read by FreightOrderDetailSerializer and pushed to
+order_tracking_<order_id> as "eta_update" messages when someone is watching,
+and to the driver's carrier dispatch board (apps.tracking.board).
+
+  ASSIGNED / PICKUP_PENDING   driver → pickup, + dwell, + pickup → delivery
+  PICKED_UP / IN_TRANSIT      driver → delivery
+"""
+import json
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.pricing import ROAD_FACTOR
+from core.redis import get_redis, redis_key
+from core.utils import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+PICKUP_PHASE = ("ASSIGNED", "PICKUP_PENDING")
+DELIVERY_PHASE = ("PICKED_UP", "IN_TRANSIT")
+ETA_STATUSES = PICKUP_PHASE + DELIVERY_PHASE
+
+_CARRIER_FIELD = "assignment__driver__driver_profile__employer_id"
+_ORDER_FIELDS = ("id", "status", "pickup_lat", "pickup_lng", "delivery_lat", "delivery_lng", _CARRIER_FIELD)
+
+
+def _key(order_id):
+    return redis_key("tracking", "eta", order_id)
+
+
+def _road_km(lat1, lng1, lat2, lng2) -> float:
+    return haversine_distance(float(lat1), float(lng1), float(lat2), float(lng2)) * float(ROAD_FACTOR)
+
+
+def advance_speed(speed_kmh: Optional[float], prev: Optional[dict], lat: float, lng: float, ts: datetime):
+    """Fold one fix into the speed EWMA. prev is {"lat", "lng", "ts"} of the previous fix."""
+    if prev is None:
+        return speed_kmh
+    elapsed = (ts - datetime.fromisoformat(prev["ts"])).total_seconds()
+    if elapsed < 1:
+        return speed_kmh
+    observed = haversine_distance(prev["lat"], prev["lng"], lat, lng) / (elapsed / 3600)
+    if speed_kmh is None:
+        return observed
+    alpha = 1 - math.exp(-elapsed / settings.TRACKING_ETA["SPEED_WINDOW_SECONDS"])
+    return speed_kmh + alpha * (observed - speed_kmh)
+
+
+def estimate(
+    order: dict, lat: float, lng: float, speed_kmh: Optional[float], now: datetime,
+) -> Optional[dict]:
+    """ETA for an order (a values() dict) from the driver's position; None if it cannot be computed."""
+    conf = settings.TRACKING_ETA
+    status = order["status"]
+    if status not in ETA_STATUSES or order["delivery_lat"] is None or order["delivery_lng"] is None:
+        return None
+    known_speed = speed_kmh if speed_kmh is not None else conf["DEFAULT_SPEED_KMH"]
+    effective_speed = max(known_speed, conf["MIN_SPEED_KMH"])
+
+    to_pickup_km = None
+    pickup_minutes = None
+    if status in PICKUP_PHASE:
+        if order["pickup_lat"] is None or order["pickup_lng"] is None:
+            return None
+        to_pickup_km = _road_km(lat, lng, order["pickup_lat"], order["pickup_lng"])
+        leg_km = _road_km(
+            order["pickup_lat"], order["pickup_lng"], order["delivery_lat"], order["delivery_lng"],
+        )
+        pickup_minutes = to_pickup_km / effective_speed * 60
+        to_delivery_km = to_pickup_km + leg_km
+        delivery_minutes = pickup_minutes + conf["PICKUP_DWELL_MINUTES"] + leg_km / effective_speed * 60
+    else:
+        to_delivery_km = _road_km(lat, lng, order["delivery_lat"], order["delivery_lng"])
+        delivery_minutes = to_delivery_km / effective_speed * 60
+
+    return {
+        "to_pickup_km": None if to_pickup_km is None else round(to_pickup_km, 1),
+        "to_pickup_minutes": None if pickup_minutes is None else round(pickup_minutes),
+        "pickup_eta": (
+            None if pickup_minutes is None else (now + timedelta(minutes=pickup_minutes)).isoformat()
+        ),
+        "to_delivery_km": round(to_delivery_km, 1),
+        "to_delivery_minutes": round(delivery_minutes),
+        "delivery_eta": (now + timedelta(minutes=delivery_minutes)).isoformat(),
+        "speed_kmh": None if speed_kmh is None else round(speed_kmh, 1),
+        "updated_at": now.isoformat(),
+    }
+
+
+def update_etas(records: Iterable) -> int:
+    """
+    Advance the ETA of every active order referenced by `records` (ingest
+    PingRecords): one orders query and two Redis round trips per batch.
+    Returns the number of orders updated.
+    """
+    from apps.orders.models import FreightOrder
+    from . import board
+    from .broadcast import order_group, watchers_key
+
+    by_order = defaultdict(list)
+    for r in records:
+        if r.order_id:
+            by_order[r.order_id].append(r)
+    if not by_order:
+        return 0
+
+    orders = list(
+        FreightOrder.objects.filter(id__in=by_order.keys(), status__in=ETA_STATUSES).values(*_ORDER_FIELDS)
+    )
+    if not orders:
+        return 0
+
+    conf = settings.TRACKING_ETA
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.mget([_key(o["id"]) for o in orders])
+    pipe.mget([watchers_key(o["id"]) for o in orders])
+    stored, watchers = pipe.execute()
+
+    now = timezone.now()
+    pipe = redis.pipeline(transaction=False)
+    to_broadcast = []
+    to_boards = []
+    for order, raw, watching in zip(orders, stored, watchers):
+        previous = json.loads(raw) if raw else {}
+        state = previous.get("state")
+        speed = state["speed_kmh"] if state else None
+        fixes = sorted(by_order[order["id"]], key=lambda r: r.timestamp)
+        for fix in fixes:
+            if state and fix.timestamp <= datetime.fromisoformat(state["ts"]):
+                continue
+            speed = advance_speed(speed, state, fix.lat, fix.lng, fix.timestamp)
+            state = {"lat": fix.lat, "lng": fix.lng, "ts": fix.timestamp.isoformat(), "speed_kmh": speed}
+        if not state:
+            continue
+        eta = estimate(order, state["lat"], state["lng"], speed, now)
+        if eta is None:
+            continue
+
+        last_broadcast = previous.get("broadcast_at")
+        due = (
+            previous.get("to_delivery_minutes") != eta["to_delivery_minutes"]
+            or last_broadcast is None
+            or (now - datetime.fromisoformat(last_broadcast)).total_seconds()
+            >= conf["BROADCAST_INTERVAL_SECONDS"]
+        )
+        broadcast_at = last_broadcast
+        if due and watching and int(watching) > 0:
+            to_broadcast.append((order["id"], eta))
+            broadcast_at = now.isoformat()
+        if due and order[_CARRIER_FIELD]:
+            to_boards.append((order[_CARRIER_FIELD], order["id"], eta))
+            broadcast_at = now.isoformat()
+        pipe.set(_key(order["id"]), json.dumps({**eta, "state": state, "broadcast_at": broadcast_at}),
+                 ex=conf["TTL_SECONDS"])
+    pipe.execute()
+
+    if to_broadcast:
+        _broadcast(order_group, to_broadcast)
+    for carrier_id, order_id, order_eta in to_boards:
+        board.send(carrier_id, board.eta_delta(order_id, order_eta))
+    return len(orders)
+
+
+def _broadcast(order_group, updates):
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+        for order_id, eta in updates:
+            async_to_sync(channel_layer.group_send)(
+                order_group(order_id), {"type": "eta_update", "order_id": str(order_id), **eta},
+            )
+    except Exception as exc:
+        logger.warning("Could not broadcast ETA updates: %s", exc)
+
+
+def _public(raw) -> dict:
+    """Stored ETA without the engine's internal state."""
+    data = json.loads(raw)
+    data.pop("state", None)
+    data.pop("broadcast_at", None)
+    return data
+
+
+def get_eta(order_id) -> Optional[dict]:
+    """Cached ETA for an order, or None if there is none yet."""
+    raw = get_redis().get(_key(order_id))
+    return _public(raw) if raw else None
+
+
+def get_etas(order_ids) -> dict:
+    """Cached ETAs of several orders in one MGET: {order_id: eta}, orders without one left out."""
+    order_ids = [str(o) for o in order_ids]
+    if not order_ids:
+        return {}
+    raws = get_redis().mget([_key(o) for o in order_ids])
+    return {order_id: _public(raw) for order_id, raw in zip(order_ids, raws) if raw}
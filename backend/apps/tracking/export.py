@@ -0,0 +1,180 @@
+"""
+MESS Platform — GPS Track Export
+Streams an order's pings as NDJSON, GeoJSON or CSV in constant memory.
+
+Rows are read straight from the ping table (values_list, no model instances)
+with a server-side cursor, optionally downsampled, encoded one at a time and
+emitted in chunks of CHUNK_ROWS rows. Both a sync and an async generator are
+provided so the response streams under WSGI and ASGI alike.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+CHUNK_ROWS = 500
+DB_CHUNK_SIZE = 2000
+
+COLUMNS = ("timestamp", "lat_e6", "lng_e6", "accuracy_m", "speed_x10", "bearing_x10")
+
+
+class TrackPoint(NamedTuple):
+    timestamp: datetime
+    lat: float
+    lng: float
+    accuracy_m: Optional[int]
+    speed_kmh: Optional[float]
+    bearing: Optional[float]
+
+    @classmethod
+    def from_row(cls, row):
+        ts, lat_e6, lng_e6, accuracy, speed_x10, bearing_x10 = row
+        return cls(
+            timestamp=ts,
+            lat=lat_e6 / 1_000_000,
+            lng=lng_e6 / 1_000_000,
+            accuracy_m=accuracy,
+            speed_kmh=None if speed_x10 is None else speed_x10 / 10,
+            bearing=None if bearing_x10 is None else bearing_x10 / 10,
+        )
+
+    def properties(self) -> dict:
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "accuracy_m": self.accuracy_m,
+            "speed_kmh": self.speed_kmh,
+            "bearing": self.bearing,
+        }
+
+
+class NDJSONEncoder:
+    content_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def header(self) -> str:
+        return ""
+
+    def row(self, point: TrackPoint) -> str:
+        return json.dumps({"lat": point.lat, "lng": point.lng, **point.properties()}) + "\n"
+
+    def footer(self) -> str:
+        return ""
+
+
+class GeoJSONEncoder:
+    """FeatureCollection of Point features, one per ping."""
+    content_type = "application/geo+json"
+    extension = "geojson"
+
+    def __init__(self):
+        self._first = True
+
+    def header(self) -> str:
+        return '{"type":"FeatureCollection","features":['
+
+    def row(self, point: TrackPoint) -> str:
+        feature = json.dumps({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [point.lng, point.lat]},
+            "properties": point.properties(),
+        })
+        if self._first:
+            self._first = False
+            return feature
+        return "," + feature
+
+    def footer(self) -> str:
+        return "]}\n"
+
+
+class CSVEncoder:
+    content_type = "text/csv"
+    extension = "csv"
+    fields = ("timestamp", "lat", "lng", "accuracy_m", "speed_kmh", "bearing")
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _line(self, values) -> str:
+        self._writer.writerow(values)
+        line = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line
+
+    def header(self) -> str:
+        return self._line(self.fields)
+
+    def row(self, point: TrackPoint) -> str:
+        return self._line([
+            point.timestamp.isoformat(), point.lat, point.lng,
+            "" if point.accuracy_m is None else point.accuracy_m,
+            "" if point.speed_kmh is None else point.speed_kmh,
+            "" if point.bearing is None else point.bearing,
+        ])
+
+    def footer(self) -> str:
+        return ""
+
+
+ENCODERS = {
+    "ndjson": NDJSONEncoder,
+    "geojson": GeoJSONEncoder,
+    "csv": CSVEncoder,
+}
+
+
+class Sampler:
+    """
+    Downsamples a time-ordered stream: keeps at most one ping per
+    `interval_s` seconds and/or every `every`-th ping.
+    """
+
+    def __init__(self, interval_s: Optional[float] = None, every: Optional[int] = None):
+        self.interval_s = interval_s
+        self.every = every
+        self._last_kept = None
+        self._seen = 0
+
+    def keep(self, timestamp: datetime) -> bool:
+        self._seen += 1
+        if self.every and (self._seen - 1) % self.every:
+            return False
+        if self.interval_s and self._last_kept is not None:
+            if (timestamp - self._last_kept).total_seconds() < self.interval_s:
+                return False
+        self._last_kept = timestamp
+        return True
+
+
+def export_rows(queryset):
+    """Ping queryset → time-ordered raw rows for TrackPoint.from_row."""
+    return queryset.order_by("timestamp").values_list(*COLUMNS)
+
+
+def stream(rows, encoder, sampler: Sampler):
+    """Sync generator of encoded chunks over `export_rows(...)`."""
+    chunk = [encoder.header()]
+    for row in rows.iterator(chunk_size=DB_CHUNK_SIZE):
+        if sampler.keep(row[0]):
+            chunk.append(encoder.row(TrackPoint.from_row(row)))
+            if len(chunk) >= CHUNK_ROWS:
+                yield "".join(chunk)
+                chunk = []
+    chunk.append(encoder.footer())
+    yield "".join(chunk)
+
+
+async def astream(rows, encoder, sampler: Sampler):
+    """Async twin of stream() for ASGI, reading with aiterator()."""
+    chunk = [encoder.header()]
+    async for row in rows.aiterator(chunk_size=DB_CHUNK_SIZE):
+        if sampler.keep(row[0]):
+            chunk.append(encoder.row(TrackPoint.from_row(row)))
+            if len(chunk) >= CHUNK_ROWS:
+                yield "".join(chunk)
+                chunk = []
+    chunk.append(encoder.footer())
+    yield "".join(chunk)
@@ -0,0 +1,94 @@
+"""
+MESS Platform — GPS Ingest Filter
+Drops pings that add nothing to a driver's track before they are persisted.
+
+Per driver stream the filter remembers the last fix it kept and drops a new fix when:
+  - inaccurate:  reported accuracy is worse than MAX_ACCURACY_M
+  - stale:       it is not newer than the last kept fix
+  - stationary:  it is within the noise radius of the last kept fix — the
+                 larger of MIN_DISTANCE_M and the two fixes' reported
+                 accuracy — and less than MAX_SILENCE_SECONDS later (one
+                 fix per interval is still kept as a heartbeat)
+  - jump:        reaching it would need more than MAX_SPEED_KMH. The
+                 MAX_CONSECUTIVE_JUMPS-th jump in a row is accepted as the
+                 new position, so one bad anchor cannot freeze the track.
+A fix for a different order than the last one is always kept.
+
+Counts of kept and dropped fixes per reason are kept per stream (`counts`)
+and process-wide (`stats`); both are logged when a driver disconnects.
+"""
+import logging
+from collections import Counter
+from typing import Optional
+
+from django.conf import settings
+
+from core.utils import haversine_distance
+
+ACCEPTED = "accepted"
+INACCURATE = "inaccurate"
+STALE = "stale"
+STATIONARY = "stationary"
+JUMP = "jump"
+
+logger = logging.getLogger(__name__)
+
+stats: Counter = Counter()
+
+
+class PingFilter:
+    """Stateful filter for one driver's stream of PingRecords."""
+
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config or settings.TRACKING_PING_FILTER
+        self._last = None
+        self._jumps = 0
+        self.counts: Counter = Counter()
+
+    def check(self, record) -> str:
+        """Classify a fix; only ACCEPTED ones should be persisted."""
+        if not self.config["ENABLED"]:
+            return ACCEPTED
+        accuracy = record.accuracy_m
+        if accuracy is not None and accuracy > self.config["MAX_ACCURACY_M"]:
+            return INACCURATE
+
+        last = self._last
+        if last is None or record.order_id != last.order_id:
+            return ACCEPTED
+
+        elapsed = (record.timestamp - last.timestamp).total_seconds()
+        if elapsed <= 0:
+            return STALE
+
+        distance_m = haversine_distance(last.lat, last.lng, record.lat, record.lng) * 1000
+        noise_m = max(self.config["MIN_DISTANCE_M"], accuracy or 0, last.accuracy_m or 0)
+        if distance_m <= noise_m and elapsed < self.config["MAX_SILENCE_SECONDS"]:
+            return STATIONARY
+
+        # Implied speed above noise is measured from the edge of the noise radius
+        if (distance_m - noise_m) / 1000 / (elapsed / 3600) > self.config["MAX_SPEED_KMH"]:
+            if self._jumps + 1 < self.config["MAX_CONSECUTIVE_JUMPS"]:
+                return JUMP
+        return ACCEPTED
+
+    def accept(self, record) -> bool:
+        """Check a fix, update the filter state and counters; True if it should be kept."""
+        verdict = self.check(record)
+        self.counts[verdict] += 1
+        stats[verdict] += 1
+        if verdict == JUMP:
+            self._jumps += 1
+        elif verdict == ACCEPTED:
+            self._jumps = 0
+            self._last = record
+        return verdict == ACCEPTED
+
+    def filter(self, records) -> list:
+        """Keep the accepted fixes of a time-ordered batch."""
+        return [r for r in sorted(records, key=lambda r: r.timestamp) if self.accept(r)]
+
+    def report(self, driver_id) -> None:
+        """Log this stream's kept and dropped fixes alongside the process-wide totals."""
+        if self.counts:
+            logger.info(f"Ping filter for driver {driver_id}: {dict(self.counts)} (process: {dict(stats)})")
@@ -0,0 +1,151 @@
+"""
+MESS Platform — Fleet Live Map
+Viewport-scoped driver positions for admins and carriers.
+
+Driver positions are fanned out to web-map tile groups rather than to every
+map viewer: each driver's location stream publishes (at most once every
+TRACKING_FLEET_MAP["MIN_INTERVAL_SECONDS"]) to the tile containing it at each
+zoom in TILE_ZOOMS, e.g. fleet_tile_9_231_234. A map client subscribes with a
+bounding box; the finest zoom at which the box spans no more than MAX_TILES
+tiles is picked and the client joins those tile groups only. Panning or
+zooming re-subscribes, joining and leaving only the tiles that changed.
+When a driver moves to another tile the old tiles get a "fleet_leave".
+publish_position/publish_leave do the sending for DriverLocationConsumer and
+the ingest gateway alike.
+"""
+import math
+from typing import NamedTuple
+
+from django.conf import settings
+
+from core.utils import haversine_distance
+
+# Web-mercator is undefined at the poles
+MAX_LAT = 85.05112878
+
+
+class TileSet(NamedTuple):
+    zoom: int
+    tiles: list[tuple[int, int]]
+
+    @property
+    def groups(self) -> set[str]:
+        return {tile_group(self.zoom, x, y) for x, y in self.tiles}
+
+    def names(self) -> list[str]:
+        return [f"{self.zoom}/{x}/{y}" for x, y in self.tiles]
+
+
+def tile_for(lat: float, lng: float, zoom: int) -> tuple[int, int]:
+    """Slippy-map (x, y) of the tile containing a point."""
+    n = 2 ** zoom
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_group(zoom: int, x: int, y: int) -> str:
+    return f"fleet_tile_{zoom}_{x}_{y}"
+
+
+def driver_groups(lat: float, lng: float) -> set[str]:
+    """The tile group at each configured zoom that a driver at (lat, lng) publishes to."""
+    return {tile_group(z, *tile_for(lat, lng, z)) for z in settings.TRACKING_FLEET_MAP["TILE_ZOOMS"]}
+
+
+def tiles_for_bbox(west: float, south: float, east: float, north: float) -> TileSet:
+    """
+    Tiles covering a viewport, at the finest configured zoom where they number
+    at most MAX_TILES. Raises ValueError for an invalid or oversized box.
+    """
+    conf = settings.TRACKING_FLEET_MAP
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError("bbox must be [west, south, east, north] with west < east and south < north.")
+    for zoom in sorted(conf["TILE_ZOOMS"], reverse=True):
+        min_x, min_y = tile_for(north, west, zoom)
+        max_x, max_y = tile_for(south, east, zoom)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= conf["MAX_TILES"]:
+            return TileSet(zoom, [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)])
+    raise ValueError("Viewport is too large; zoom in.")
+
+
+def parse_tiles(names: list[str]) -> TileSet:
+    """["z/x/y", ...] → TileSet; all tiles must share one configured zoom."""
+    conf = settings.TRACKING_FLEET_MAP
+    try:
+        parsed = [tuple(int(part) for part in name.split("/")) for name in names]
+    except (AttributeError, ValueError):
+        raise ValueError("Tiles must be \"z/x/y\" strings.")
+    if not parsed or any(len(t) != 3 for t in parsed):
+        raise ValueError("Tiles must be \"z/x/y\" strings.")
+    zooms = {z for z, _, _ in parsed}
+    if len(zooms) != 1 or not zooms <= set(conf["TILE_ZOOMS"]):
+        raise ValueError(f"All tiles must share one zoom out of {conf['TILE_ZOOMS']}.")
+    if len(parsed) > conf["MAX_TILES"]:
+        raise ValueError(f"At most {conf['MAX_TILES']} tiles per subscription.")
+    zoom = zooms.pop()
+    return TileSet(zoom, sorted({(x, y) for _, x, y in parsed}))
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(west, south, east, north) of a tile."""
+    n = 2 ** zoom
+
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tileset_bounds(tileset: TileSet) -> tuple[float, float, float, float]:
+    xs = [x for x, _ in tileset.tiles]
+    ys = [y for _, y in tileset.tiles]
+    west, _, _, north = tile_bounds(tileset.zoom, min(xs), min(ys))
+    _, south, east, _ = tile_bounds(tileset.zoom, max(xs), max(ys))
+    return west, south, east, north
+
+
+def box_size_km(west: float, south: float, east: float, north: float) -> tuple[float, float]:
+    """(width, height) in km of a box, the width taken at its widest (most equatorward) edge."""
+    widest_lat = 0.0 if south <= 0 <= north else min(south, north, key=abs)
+    mid_lng = (west + east) / 2
+    return (
+        haversine_distance(widest_lat, west, widest_lat, east),
+        haversine_distance(south, mid_lng, north, mid_lng),
+    )
+
+
+async def publish_position(
+    channel_layer, groups: set[str], driver_id, driver_name: str, carrier_id, record,
+) -> None:
+    """Send a driver's fix (a PingRecord) to its tile groups and the employer's dispatch board."""
+    from . import board
+
+    message = {
+        "type": "fleet_position",
+        "driver_id": str(driver_id),
+        "driver_name": driver_name,
+        "carrier_id": carrier_id,
+        "order_id": str(record.order_id) if record.order_id else None,
+        "lat": record.lat,
+        "lng": record.lng,
+        "speed": record.speed_kmh,
+        "bearing": record.bearing,
+        "timestamp": record.timestamp.isoformat(),
+    }
+    for group in groups:
+        await channel_layer.group_send(group, message)
+    if carrier_id:
+        await channel_layer.group_send(board.carrier_group(carrier_id), board.group_message(
+            board.position_delta(
+                driver_id, record.lat, record.lng, record.speed_kmh, record.bearing, record.timestamp,
+            )
+        ))
+
+
+async def publish_leave(channel_layer, groups: set[str], driver_id, carrier_id) -> None:
+    """Tell map viewers of tiles a driver left (or disconnected from) to drop the marker."""
+    message = {"type": "fleet_leave", "driver_id": str(driver_id), "carrier_id": carrier_id}
+    for group in groups:
+        await channel_layer.group_send(group, message)
@@ -0,0 +1,257 @@
+"""
+MESS Platform — Driver Ingest Gateway
+A slim ASGI app serving only the driver location stream, deployable as its
+own process next to the main ASGI stack (see config/gateway_asgi.py):
+
+    uvicorn config.gateway_asgi:application --host 0.0.0.0 --port 8001
+
+Drivers connect to ws/tracking/driver/?token=<jwt> with the mess.gps.v1
+subprotocol (see protocol.py). Per connection the gateway
+  - verifies the JWT statelessly: signature, expiry, access token type and the
+    DRIVER role claim — no user lookup, so a deactivated driver can stream
+    until the token expires
+  - decodes FIX_BATCH frames, drops noise with the PingFilter, appends the
+    fixes to the ping stream and refreshes presence in one pipeline on an
+    asyncio Redis client, then acks the batch
+  - sends the newest fix to the order's tracking group (through the
+    coalescer) and, at the fleet map rate, to the map tiles and the employer's
+    dispatch board, the employer coming from the live store
+It never queries the database: the stream writers (apps.tracking.stream)
+persist the pings, profiles and routes. On disconnect the driver's presence
+is expired, so the next presence sweep marks them offline.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.redis import redis_key
+from . import presence, protocol, stream
+from .filters import PingFilter
+from .ingest import PingRecord
+
+logger = logging.getLogger(__name__)
+
+PATH = "/ws/tracking/driver/"
+
+CLOSE_UNAUTHORIZED = 4001
+CLOSE_UNSUPPORTED = 4002
+CLOSE_NOT_FOUND = 4004
+
+
+class DriverClaims(NamedTuple):
+    driver_id: uuid.UUID
+    name: str
+
+
+def verify_token(token: str) -> Optional[DriverClaims]:
+    """Claims of a valid driver access token, or None. Stateless: no database access."""
+    from rest_framework_simplejwt.backends import TokenBackend
+    from apps.accounts.constants import UserRole
+
+    try:
+        data = TokenBackend(
+            algorithm=settings.SIMPLE_JWT.get("ALGORITHM", "HS256"),
+            signing_key=settings.SECRET_KEY,
+        ).decode(token, verify=True)
+        if data.get("token_type") != "access" or data.get("role") != UserRole.DRIVER:
+            return None
+        return DriverClaims(uuid.UUID(str(data["user_id"])), data.get("name", ""))
+    except Exception:
+        return None
+
+
+_redis = None
+
+
+def get_async_redis():
+    """This process's asyncio Redis client (same server as the cache)."""
+    global _redis
+    if _redis is None:
+        import redis.asyncio
+        _redis = redis.asyncio.from_url(settings.CACHES["default"]["LOCATION"])
+    return _redis
+
+
+class DriverConnection:
+    """State and frame handling for one connected driver."""
+
+    def __init__(self, claims: DriverClaims, redis, carrier_id: Optional[str] = None, channel_layer=None):
+        self.claims = claims
+        self.redis = redis
+        self.carrier_id = carrier_id
+        self.channel_layer = channel_layer
+        self.ping_filter = PingFilter()
+        self._fleet_groups = set()
+        self._fleet_sent_at = float("-inf")
+
+    async def handle_batch(self, frame: bytes) -> bytes:
+        """Decode, filter, queue and broadcast one FIX_BATCH frame; returns the ack frame."""
+        try:
+            batch = protocol.decode_batch(frame, now=datetime.now(dt_timezone.utc))
+        except protocol.ProtocolError as e:
+            logger.debug(f"Gateway rejected binary frame from driver {self.claims.driver_id}: {e}")
+            return protocol.encode_ack(protocol.peek_seq(frame), e.status)
+
+        records = self.ping_filter.filter([
+            PingRecord(
+                driver_id=self.claims.driver_id,
+                order_id=batch.order_id,
+                lat=fix.lat,
+                lng=fix.lng,
+                accuracy_m=fix.accuracy_m,
+                speed_kmh=fix.speed_kmh,
+                bearing=fix.bearing,
+                timestamp=fix.timestamp,
+            )
+            for fix in batch.fixes
+        ])
+        try:
+            await self._queue(records)
+        except Exception as exc:
+            logger.warning(f"Gateway could not queue pings of driver {self.claims.driver_id}: {exc}")
+            return protocol.encode_ack(batch.last_seq, protocol.STATUS_NOT_SAVED)
+
+        if records:
+            await self._broadcast(max(records, key=lambda r: r.timestamp))
+        return protocol.encode_ack(batch.last_seq)
+
+    async def heartbeat(self) -> None:
+        await self.redis.zadd(redis_key(*presence.PRESENCE), {str(self.claims.driver_id): time.time()})
+
+    async def close(self) -> None:
+        """Expire presence (the sweeper takes the driver offline) and leave the fleet map."""
+        from . import fleet
+        self.ping_filter.report(self.claims.driver_id)
+        try:
+            await self.redis.zadd(redis_key(*presence.PRESENCE), {str(self.claims.driver_id): 0})
+        except Exception as exc:
+            logger.warning(f"Gateway could not expire presence of driver {self.claims.driver_id}: {exc}")
+        if self.channel_layer and self._fleet_groups:
+            try:
+                await fleet.publish_leave(
+                    self.channel_layer, self._fleet_groups, self.claims.driver_id, self.carrier_id,
+                )
+            except Exception as exc:
+                logger.warning(f"Fleet map leave for driver {self.claims.driver_id} failed: {exc}")
+
+    async def _queue(self, records: list[PingRecord]) -> None:
+        """XADD the pings and refresh presence in one round trip (presence alone if all filtered)."""
+        maxlen = settings.TRACKING_STREAM["MAXLEN"]
+        pipe = self.redis.pipeline(transaction=False)
+        for record in records:
+            pipe.xadd(redis_key(*stream.STREAM), stream.encode(record), maxlen=maxlen, approximate=True)
+        pipe.zadd(redis_key(*presence.PRESENCE), {str(self.claims.driver_id): time.time()})
+        await pipe.execute()
+
+    async def _broadcast(self, latest: PingRecord) -> None:
+        from . import fleet
+        from .broadcast import get_broadcaster, location_update
+
+        driver_id = self.claims.driver_id
+        if latest.order_id:
+            message = location_update(driver_id, self.claims.name, latest)
+            await get_broadcaster().publish(latest.order_id, message)
+
+        now = time.monotonic()
+        min_interval = settings.TRACKING_FLEET_MAP["MIN_INTERVAL_SECONDS"]
+        if not self.channel_layer or now - self._fleet_sent_at < min_interval:
+            return
+        self._fleet_sent_at = now
+        groups = fleet.driver_groups(latest.lat, latest.lng)
+        try:
+            await fleet.publish_position(
+                self.channel_layer, groups, driver_id, self.claims.name, self.carrier_id, latest,
+            )
+            left = self._fleet_groups - groups
+            await fleet.publish_leave(self.channel_layer, left, driver_id, self.carrier_id)
+        except Exception as exc:
+            logger.warning(f"Fleet map update for driver {driver_id} failed: {exc}")
+        self._fleet_groups = groups
+
+
+async def _carrier_id(driver_id) -> Optional[str]:
+    from . import live
+    try:
+        return await sync_to_async(live.get_carrier_id, thread_sensitive=False)(driver_id)
+    except Exception as exc:
+        logger.warning(f"Gateway could not read the employer of driver {driver_id}: {exc}")
+        return None
+
+
+async def _serve_driver(scope, receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token", [""])[0]
+    claims = verify_token(token) if token else None
+    if claims is None:
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+    if protocol.SUBPROTOCOL not in scope.get("subprotocols", []):
+        await send({"type": "websocket.close", "code": CLOSE_UNSUPPORTED})
+        return
+
+    from channels.layers import get_channel_layer
+    connection = DriverConnection(
+        claims, get_async_redis(),
+        carrier_id=await _carrier_id(claims.driver_id),
+        channel_layer=get_channel_layer(),
+    )
+    await send({"type": "websocket.accept", "subprotocol": protocol.SUBPROTOCOL})
+    try:
+        await connection.heartbeat()
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                ack = await connection.handle_batch(message["bytes"])
+                await send({"type": "websocket.send", "bytes": ack})
+            elif message.get("text") is not None:
+                # The only text frame is {"type": "heartbeat"}, sent when there is nothing to report
+                try:
+                    is_heartbeat = json.loads(message["text"]).get("type") == "heartbeat"
+                except (ValueError, AttributeError):
+                    is_heartbeat = False
+                if is_heartbeat:
+                    await connection.heartbeat()
+                    await send({"type": "websocket.send", "text": json.dumps({"status": "ok"})})
+                else:
+                    error = json.dumps({"error": "Send binary fix batches."})
+                    await send({"type": "websocket.send", "text": error})
+    finally:
+        await connection.close()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _redis is not None:
+                await _redis.connection_pool.disconnect()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI entry point: the driver location stream and nothing else."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+    elif scope["type"] == "websocket" and scope["path"] == PATH:
+        await _serve_driver(scope, receive, send)
+    elif scope["type"] == "websocket":
+        await receive()
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+    else:
+        await send({
+            "type": "http.response.start", "status": 404, "headers": [(b"content-type", b"text/plain")],
+        })
+        await send({"type": "http.response.body", "body": b"Not found"})
@@ -0,0 +1,271 @@
+"""
+MESS Platform — Pickup and Delivery Geofences
+Arrival at and departure from an order's pickup and delivery points, from pings.
+
+Every active order of a driver (ASSIGNED → IN_TRANSIT) has two circular
+zones, around its pickup and delivery coordinates (TRACKING_GEOFENCE
+["PICKUP_RADIUS_M"] / ["DELIVERY_RADIUS_M"]), each with a precomputed
+bounding box. A driver's zones are cached in Redis
+(tracking:fences:<driver_id>) and dropped by apps.tracking.signals whenever
+an assignment is created or an order changes status, so the ping writer only
+queries the database for drivers whose cache is cold. Per ping and zone the
+cost is a bounding-box test, plus a haversine when inside the box.
+
+A driver arrives when a fix falls within the radius and departs when a later
+fix is beyond radius × EXIT_FACTOR (hysteresis against jitter at the edge).
+Both are stored as GeofenceEvents; departures carry the dwell time. The zones
+a driver is currently in are kept in tracking:fence_state:<driver_id>, apart
+from the zone cache so that invalidation does not reset them. With NOTIFY on,
+the shipper is notified of each arrival and departure.
+"""
+import json
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional
+
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+from core.utils import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+PICKUP = "PICKUP"
+DELIVERY = "DELIVERY"
+ARRIVED = "ARRIVED"
+DEPARTED = "DEPARTED"
+
+METRES_PER_DEGREE_LAT = 111_320
+# Forget in-zone state of drivers that stop sending pings
+STATE_TTL_SECONDS = 24 * 60 * 60
+
+
+class Zone(NamedTuple):
+    order_id: str
+    kind: str
+    lat: float
+    lng: float
+    radius_m: float
+    # Bounding box of the exit radius
+    min_lat: float
+    max_lat: float
+    min_lng: float
+    max_lng: float
+
+    @classmethod
+    def around(cls, order_id, kind: str, lat: float, lng: float, radius_m: float, exit_factor: float):
+        reach = radius_m * exit_factor
+        dlat = reach / METRES_PER_DEGREE_LAT
+        dlng = reach / (METRES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        return cls(str(order_id), kind, lat, lng, radius_m, lat - dlat, lat + dlat, lng - dlng, lng + dlng)
+
+    @property
+    def key(self) -> str:
+        return f"{self.order_id}:{self.kind}"
+
+    def distance_m(self, lat: float, lng: float) -> Optional[float]:
+        """Metres from the centre, or None when outside the exit bounding box."""
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng):
+            return None
+        return haversine_distance(self.lat, self.lng, lat, lng) * 1000
+
+
+class Transition(NamedTuple):
+    zone: Zone
+    event: str
+    lat: float
+    lng: float
+    timestamp: datetime
+    dwell_seconds: Optional[int] = None
+
+
+def _fences_key(driver_id):
+    return redis_key("tracking", "fences", driver_id)
+
+
+def _state_key(driver_id):
+    return redis_key("tracking", "fence_state", driver_id)
+
+
+def zones_for_order(order_id, pickup, delivery, conf: Optional[dict] = None) -> list[Zone]:
+    """Pickup and delivery zones of an order; pickup/delivery are (lat, lng), either may be None."""
+    conf = conf or settings.TRACKING_GEOFENCE
+    zones = []
+    for kind, point, radius in (
+        (PICKUP, pickup, conf["PICKUP_RADIUS_M"]),
+        (DELIVERY, delivery, conf["DELIVERY_RADIUS_M"]),
+    ):
+        if point and point[0] is not None and point[1] is not None:
+            zones.append(
+                Zone.around(order_id, kind, float(point[0]), float(point[1]), radius, conf["EXIT_FACTOR"])
+            )
+    return zones
+
+
+def load_zones(driver_ids: Iterable) -> dict[str, list[Zone]]:
+    """Zones of the active assignments of several drivers, in one query."""
+    from apps.orders.models import OrderAssignment
+    from .eta import ETA_STATUSES
+
+    zones = {str(d): [] for d in driver_ids}
+    rows = OrderAssignment.objects.filter(
+        driver_id__in=list(zones), order__status__in=ETA_STATUSES,
+    ).values_list(
+        "driver_id", "order_id",
+        "order__pickup_lat", "order__pickup_lng", "order__delivery_lat", "order__delivery_lng",
+    )
+    for driver_id, order_id, p_lat, p_lng, d_lat, d_lng in rows:
+        zones[str(driver_id)].extend(zones_for_order(order_id, (p_lat, p_lng), (d_lat, d_lng)))
+    return zones
+
+
+def invalidate(driver_id) -> None:
+    """Drop a driver's cached zones; the next ping batch reloads them."""
+    get_redis().delete(_fences_key(driver_id))
+
+
+def evaluate(zones: list[Zone], inside: dict, record, exit_factor: float) -> list[Transition]:
+    """
+    Check one fix against a driver's zones. `inside` maps Zone.key to
+    {"at": <arrival ISO time>} and is updated in place.
+    """
+    transitions = []
+    for zone in zones:
+        distance = zone.distance_m(record.lat, record.lng)
+        entry = inside.get(zone.key)
+        if entry is None:
+            if distance is not None and distance <= zone.radius_m:
+                inside[zone.key] = {"at": record.timestamp.isoformat()}
+                transitions.append(Transition(zone, ARRIVED, record.lat, record.lng, record.timestamp))
+        elif distance is None or distance > zone.radius_m * exit_factor:
+            del inside[zone.key]
+            dwell = (record.timestamp - datetime.fromisoformat(entry["at"])).total_seconds()
+            transitions.append(Transition(
+                zone, DEPARTED, record.lat, record.lng, record.timestamp, max(int(dwell), 0),
+            ))
+    return transitions
+
+
+def process_pings(records: Iterable) -> int:
+    """
+    Run a batch of PingRecords through the drivers' geofences: two Redis round
+    trips per batch, plus one query for drivers without cached zones and one
+    insert when something happened. Returns the number of events recorded.
+    """
+    conf = settings.TRACKING_GEOFENCE
+    if not conf["ENABLED"]:
+        return 0
+
+    by_driver = defaultdict(list)
+    for r in records:
+        by_driver[str(r.driver_id)].append(r)
+    if not by_driver:
+        return 0
+    drivers = list(by_driver)
+
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.mget([_fences_key(d) for d in drivers])
+    pipe.mget([_state_key(d) for d in drivers])
+    cached, states = pipe.execute()
+
+    zones = {}
+    missing = []
+    for driver_id, raw in zip(drivers, cached):
+        if raw is None:
+            missing.append(driver_id)
+        else:
+            zones[driver_id] = [Zone(*z) for z in json.loads(raw)]
+
+    pipe = redis.pipeline(transaction=False)
+    if missing:
+        loaded = load_zones(missing)
+        zones.update(loaded)
+        for driver_id, driver_zones in loaded.items():
+            pipe.set(_fences_key(driver_id), json.dumps(driver_zones), ex=conf["CACHE_SECONDS"])
+
+    events = []
+    for driver_id, raw_state in zip(drivers, states):
+        driver_zones = zones.get(driver_id, [])
+        inside = json.loads(raw_state) if raw_state else {}
+        if not driver_zones and not inside:
+            continue
+        before = dict(inside)
+        for record in sorted(by_driver[driver_id], key=lambda r: r.timestamp):
+            events.extend(
+                (driver_id, t) for t in evaluate(driver_zones, inside, record, conf["EXIT_FACTOR"])
+            )
+        # Zones of orders that are no longer active
+        active = {z.key for z in driver_zones}
+        inside = {k: v for k, v in inside.items() if k in active}
+        if inside != before:
+            if inside:
+                pipe.set(_state_key(driver_id), json.dumps(inside), ex=STATE_TTL_SECONDS)
+            else:
+                pipe.delete(_state_key(driver_id))
+    pipe.execute()
+
+    if events:
+        record_events(events, notify=conf["NOTIFY"])
+    return len(events)
+
+
+NOTIFICATION_TEXT = {
+    (PICKUP, ARRIVED): ("Driver at Pickup", "The driver has arrived at the pickup point for order {ref}."),
+    (PICKUP, DEPARTED): ("Driver Left Pickup", "The driver has left the pickup point for order {ref}."),
+    (DELIVERY, ARRIVED): (
+        "Driver at Destination", "The driver has arrived at the delivery point for order {ref}.",
+    ),
+    (DELIVERY, DEPARTED): (
+        "Driver Left Destination", "The driver has left the delivery point for order {ref}.",
+    ),
+}
+
+
+def record_events(events: list[tuple[str, Transition]], notify: bool = False) -> None:
+    """Store (driver_id, Transition) pairs as GeofenceEvents and optionally notify shippers."""
+    from .models import GeofenceEvent
+
+    GeofenceEvent.objects.bulk_create([
+        GeofenceEvent(
+            order_id=t.zone.order_id,
+            driver_id=driver_id,
+            zone=t.zone.kind,
+            event=t.event,
+            lat=Decimal(f"{t.lat:.6f}"),
+            lng=Decimal(f"{t.lng:.6f}"),
+            occurred_at=t.timestamp,
+            dwell_seconds=t.dwell_seconds,
+        )
+        for driver_id, t in events
+    ])
+    if notify:
+        _notify_shippers(events)
+
+
+def _notify_shippers(events):
+    from apps.notifications.tasks import send_notification_task
+    from apps.orders.models import FreightOrder
+
+    order_ids = {t.zone.order_id for _, t in events}
+    orders = {
+        str(pk): (shipper_id, reference)
+        for pk, shipper_id, reference in FreightOrder.objects.filter(id__in=order_ids).values_list(
+            "id", "shipper_id", "reference"
+        )
+    }
+    for _, t in events:
+        if t.zone.order_id not in orders:
+            continue
+        shipper_id, reference = orders[t.zone.order_id]
+        title, body = NOTIFICATION_TEXT[(t.zone.kind, t.event)]
+        try:
+            send_notification_task.delay(
+                str(shipper_id), title, body.format(ref=reference),
+                {"type": "SYSTEM", "order_id": t.zone.order_id, "geofence": t.zone.kind, "event": t.event},
+            )
+        except Exception as exc:
+            logger.warning("Could not queue geofence notification for order %s: %s", t.zone.order_id, exc)
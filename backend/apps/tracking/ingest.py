@@ -0,0 +1,323 @@
+"""
+MESS Platform — GPS Ingestion Buffer
+Write-behind buffer for driver pings.
+
+Every worker process keeps one PingBuffer. Consumers append pings to it and
+the buffer persists them in batches — one COPY into GPSPing plus one
+pipelined write of the drivers' latest positions to the live location store
+(apps.tracking.live) — whenever BATCH_SIZE pings are pending or
+FLUSH_INTERVAL_MS has elapsed since the first pending ping.
+
+Durability modes (settings.TRACKING_INGEST["DURABILITY"]):
+  ack_then_flush    The client is acked as soon as the ping is buffered.
+                    A worker crash loses at most one unflushed batch.
+  flush_before_ack  The client is acked once the batch holding its ping has
+                    been committed (group commit — pings from all connected
+                    drivers still share a single COPY).
+
+Modes (settings.TRACKING_INGEST["MODE"]):
+  inline            The buffer writes its batches to Postgres itself.
+  stream            The buffer appends its batches to a Redis Stream that
+                    separate writer processes drain (apps.tracking.stream);
+                    "committed" then means durably queued.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+
+from core.bulk import copy_insert
+
+logger = logging.getLogger(__name__)
+
+ACK_THEN_FLUSH = "ack_then_flush"
+FLUSH_BEFORE_ACK = "flush_before_ack"
+DURABILITY_MODES = (ACK_THEN_FLUSH, FLUSH_BEFORE_ACK)
+
+INLINE = "inline"
+STREAM = "stream"
+INGEST_MODES = (INLINE, STREAM)
+
+
+class PingRecord(NamedTuple):
+    """A validated GPS fix waiting to be persisted."""
+    driver_id: uuid.UUID
+    order_id: Optional[uuid.UUID]
+    lat: float
+    lng: float
+    accuracy_m: Optional[float]
+    speed_kmh: Optional[float]
+    bearing: Optional[float]
+    timestamp: datetime
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    return Decimal(str(value)) if value is not None else None
+
+
+def update_profile_locations(positions: dict) -> int:
+    """
+    Move drivers' profiles to the given fixes in a single UPDATE.
+    positions: {driver_id: (lat, lng, timestamp)}
+    """
+    from apps.accounts.models import DriverProfile
+
+    if not positions:
+        return 0
+    coord_field = models.DecimalField(max_digits=9, decimal_places=6)
+    return DriverProfile.objects.filter(user_id__in=positions.keys()).update(
+        current_lat=Case(
+            *[When(user_id=d, then=Value(_to_decimal(lat))) for d, (lat, _, _) in positions.items()],
+            output_field=coord_field,
+        ),
+        current_lng=Case(
+            *[When(user_id=d, then=Value(_to_decimal(lng))) for d, (_, lng, _) in positions.items()],
+            output_field=coord_field,
+        ),
+        last_location_update=Case(
+            *[When(user_id=d, then=Value(ts)) for d, (_, _, ts) in positions.items()],
+            output_field=models.DateTimeField(),
+        ),
+    )
+
+
+def insert_pings(records: list[PingRecord]) -> set:
+    """
+    Insert pings with one COPY (core.bulk) and return
+    the ids of the orders they reference that exist. Pings referencing an
+    order that does not exist are kept, with the order link dropped, so one
+    bad payload cannot fail the whole batch.
+    """
+    from apps.orders.models import FreightOrder
+    from .models import GPSPing
+
+    order_ids = {r.order_id for r in records if r.order_id}
+    known_orders = set(
+        FreightOrder.objects.filter(id__in=order_ids).values_list("id", flat=True)
+    ) if order_ids else set()
+
+    with transaction.atomic():
+        copy_insert(
+            GPSPing,
+            [
+                GPSPing(
+                    driver_id=r.driver_id,
+                    order_id=r.order_id if r.order_id in known_orders else None,
+                    lat=r.lat,
+                    lng=r.lng,
+                    accuracy_m=GPSPing.accuracy_for(r.accuracy_m),
+                    speed_kmh=r.speed_kmh,
+                    bearing=r.bearing,
+                    timestamp=r.timestamp,
+                )
+                for r in records
+            ],
+            fallback_batch_size=settings.TRACKING_UPLOAD["INSERT_BATCH_SIZE"],
+        )
+    return known_orders
+
+
+def publish_latest(records: list[PingRecord], known_orders: set) -> None:
+    """
+    Publish each driver's most recent fix to the live location store, or
+    update the driver profiles directly, with one conditional UPDATE, when the
+    store is disabled or unreachable. Then refresh presence, the orders'
+    latest positions and ETAs and the drivers' geofences; failures there are
+    logged only.
+    """
+    from . import eta, geofence, live, presence
+
+    latest: dict[uuid.UUID, PingRecord] = {}
+    for r in records:
+        current = latest.get(r.driver_id)
+        if current is None or r.timestamp >= current.timestamp:
+            latest[r.driver_id] = r
+
+    published = False
+    if live.is_enabled():
+        try:
+            live.update_positions(latest.values())
+            published = True
+        except Exception as exc:
+            logger.warning("Live location store unavailable, updating profiles directly: %s", exc)
+    if not published:
+        update_profile_locations({d: (r.lat, r.lng, r.timestamp) for d, r in latest.items()})
+    try:
+        presence.touch(latest.keys())
+    except Exception as exc:
+        logger.warning("Could not refresh driver presence: %s", exc)
+
+    on_orders = [r for r in records if r.order_id in known_orders]
+    if on_orders:
+        try:
+            live.update_order_positions(on_orders)
+        except Exception as exc:
+            logger.warning("Could not cache order positions: %s", exc)
+        try:
+            eta.update_etas(on_orders)
+        except Exception as exc:
+            logger.warning("Could not update ETAs: %s", exc)
+
+    try:
+        geofence.process_pings(records)
+    except Exception:
+        logger.exception("Failed to evaluate geofences")
+
+
+def write_ping_batch(records: list[PingRecord]) -> int:
+    """
+    Persist a batch of pings.
+
+    Inserts all pings (insert_pings), advances the actual routes of the
+    orders they belong to, then publishes the drivers' latest fixes
+    (publish_latest). Failures after the insert never fail the write.
+    """
+    from . import routes
+
+    if not records:
+        return 0
+
+    known_orders = insert_pings(records)
+    on_orders = [r for r in records if r.order_id in known_orders]
+    if on_orders:
+        try:
+            routes.extend_routes(on_orders)
+        except Exception:
+            # The pings are committed; the route catches up on the next batch
+            logger.exception("Failed to extend actual routes")
+    publish_latest(records, known_orders)
+    return len(records)
+
+
+class PingBuffer:
+    """
+    Per-process write-behind buffer.
+
+    Flushes are serialized by a lock so batches commit in arrival order; pings
+    appended while a flush is running go into the next batch.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval_ms: int = 500, writer=None):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self._writer = writer or write_ping_batch
+        self._pending: list[PingRecord] = []
+        self._waiters: list[asyncio.Future] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"received": 0, "written": 0, "batches": 0, "failed": 0}
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def add(self, record: PingRecord, wait: bool = False) -> None:
+        """
+        Buffer a ping. With wait=True, return only once it has been committed
+        (raises if its batch failed to write).
+        """
+        await self.add_many([record], wait=wait)
+
+    async def add_many(self, records: list[PingRecord], wait: bool = False) -> None:
+        """
+        Buffer several pings at once. They always land in the same batch, so
+        with wait=True a single commit covers all of them.
+        """
+        if not records:
+            return
+        loop = asyncio.get_running_loop()
+        self._pending.extend(records)
+        self.stats["received"] += len(records)
+
+        waiter = None
+        if wait:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+
+        if len(self._pending) >= self.batch_size:
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._spawn_flush)
+
+        if waiter is not None:
+            await waiter
+
+    async def flush(self) -> int:
+        """Write everything currently pending. Returns the number of pings written."""
+        async with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            waiters, self._waiters = self._waiters, []
+
+            try:
+                written = await database_sync_to_async(self._writer)(batch)
+            except Exception as exc:
+                self.stats["failed"] += len(batch)
+                logger.exception("Failed to persist a batch of %d GPS pings.", len(batch))
+                for w in waiters:
+                    if not w.done():
+                        w.set_exception(exc)
+                return 0
+
+            self.stats["written"] += written
+            self.stats["batches"] += 1
+            for w in waiters:
+                if not w.done():
+                    w.set_result(written)
+            return written
+
+    def _spawn_flush(self):
+        self._cancel_timer()
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+_buffer: Optional[PingBuffer] = None
+
+
+def get_ping_buffer() -> PingBuffer:
+    """Return this worker's shared ping buffer, creating it on first use."""
+    global _buffer
+    if _buffer is None:
+        conf = settings.TRACKING_INGEST
+        writer = None
+        if get_ingest_mode() == STREAM:
+            from .stream import append_or_write
+            writer = append_or_write
+        _buffer = PingBuffer(
+            batch_size=conf["BATCH_SIZE"],
+            flush_interval_ms=conf["FLUSH_INTERVAL_MS"],
+            writer=writer,
+        )
+    return _buffer
+
+
+def get_ingest_mode() -> str:
+    mode = settings.TRACKING_INGEST.get("MODE", INLINE)
+    if mode not in INGEST_MODES:
+        logger.warning("Unknown TRACKING_INGEST mode %r; using %s.", mode, INLINE)
+        return INLINE
+    return mode
+
+
+def get_durability_mode() -> str:
+    mode = settings.TRACKING_INGEST.get("DURABILITY", ACK_THEN_FLUSH)
+    if mode not in DURABILITY_MODES:
+        logger.warning("Unknown TRACKING_INGEST durability mode %r; using %s.", mode, ACK_THEN_FLUSH)
+        return ACK_THEN_FLUSH
+    return mode
@@ -0,0 +1,351 @@
+"""
+MESS Platform — Live Driver Locations
+Redis GEO sets holding every tracked driver's latest position.
+
+Keys (prefixed with the cache KEY_PREFIX):
+  tracking:geo:all                  every driver with a known fix
+  tracking:geo:available            drivers that are online and free
+  tracking:geo:available:vt:<id>    the same, per vehicle type
+  tracking:loc:<driver_id>          hash — lat, lng, ts, speed, bearing, order_id
+  tracking:meta:<driver_id>         hash — available ("1"/"0"), vehicle_types (csv)
+  tracking:dirty                    drivers that moved since the last DB snapshot
+  tracking:order_pos:<order_id>     JSON — latest fix of the order's driver, sent
+                                    to tracking subscribers as their first frame
+
+The ping pipeline writes here; radius queries read from here and only return
+drivers that are present (apps.tracking.presence). Postgres
+(DriverProfile.current_lat/lng) only receives periodic snapshots from
+apps.tracking.tasks.snapshot_driver_locations.
+"""
+import json
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+
+GEO_ALL = ("tracking", "geo", "all")
+GEO_AVAILABLE = ("tracking", "geo", "available")
+ORDER_POSITION_TTL_SECONDS = 24 * 60 * 60
+
+
+class LivePosition(NamedTuple):
+    driver_id: str
+    lat: float
+    lng: float
+    timestamp: Optional[datetime]
+    speed: Optional[float]
+    bearing: Optional[float]
+    distance_km: Optional[float] = None
+
+
+def is_enabled() -> bool:
+    return settings.TRACKING_LIVE_LOCATIONS["ENABLED"]
+
+
+def _vehicle_type_key(vehicle_type_id):
+    return redis_key(*GEO_AVAILABLE, "vt", vehicle_type_id)
+
+
+def _loc_key(driver_id):
+    return redis_key("tracking", "loc", driver_id)
+
+
+def _meta_key(driver_id):
+    return redis_key("tracking", "meta", driver_id)
+
+
+def _order_pos_key(order_id):
+    return redis_key("tracking", "order_pos", order_id)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _optional_float(value):
+    value = _decode(value)
+    return float(value) if value not in (None, "") else None
+
+
+def _vehicle_types(meta: dict) -> list[str]:
+    raw = _decode(meta.get(b"vehicle_types") or meta.get("vehicle_types") or "")
+    return [vt for vt in raw.split(",") if vt]
+
+
+def _is_available(meta: dict) -> bool:
+    return _decode(meta.get(b"available") or meta.get("available")) == "1"
+
+
+def update_positions(records: Iterable) -> None:
+    """
+    Store the latest fix of each driver (PingRecords, at most one per driver).
+    Two round trips whatever the batch size: one to read availability, one
+    pipeline for all GEOADD/HSET writes.
+    """
+    records = list(records)
+    if not records:
+        return
+    r = get_redis()
+
+    pipe = r.pipeline(transaction=False)
+    for rec in records:
+        pipe.hgetall(_meta_key(rec.driver_id))
+    metas = pipe.execute()
+
+    pipe = r.pipeline(transaction=False)
+    for rec, meta in zip(records, metas):
+        member = str(rec.driver_id)
+        coords = (rec.lng, rec.lat, member)
+        pipe.geoadd(redis_key(*GEO_ALL), coords)
+        if _is_available(meta):
+            pipe.geoadd(redis_key(*GEO_AVAILABLE), coords)
+            for vt in _vehicle_types(meta):
+                pipe.geoadd(_vehicle_type_key(vt), coords)
+        pipe.hset(_loc_key(member), mapping={
+            "lat": rec.lat,
+            "lng": rec.lng,
+            "ts": rec.timestamp.isoformat(),
+            "speed": "" if rec.speed_kmh is None else rec.speed_kmh,
+            "bearing": "" if rec.bearing is None else rec.bearing,
+            "order_id": str(rec.order_id) if rec.order_id else "",
+        })
+        pipe.sadd(redis_key("tracking", "dirty"), member)
+    pipe.execute()
+
+
+def update_order_positions(records: Iterable) -> None:
+    """Store the latest fix per order (PingRecords with an order); one pipeline."""
+    latest = {}
+    for rec in records:
+        current = latest.get(rec.order_id)
+        if current is None or rec.timestamp >= current.timestamp:
+            latest[rec.order_id] = rec
+    if not latest:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    for order_id, rec in latest.items():
+        pipe.set(_order_pos_key(order_id), json.dumps({
+            "driver_id": str(rec.driver_id),
+            "lat": rec.lat,
+            "lng": rec.lng,
+            "speed": rec.speed_kmh,
+            "bearing": rec.bearing,
+            "timestamp": rec.timestamp.isoformat(),
+        }), ex=ORDER_POSITION_TTL_SECONDS)
+    pipe.execute()
+
+
+def get_order_position(order_id) -> Optional[dict]:
+    """Latest known fix of an order's driver, or None."""
+    raw = get_redis().get(_order_pos_key(order_id))
+    return json.loads(raw) if raw else None
+
+
+def set_driver_state(
+    driver_id, available: bool, vehicle_type_ids: Iterable = (), carrier_id: Optional[str] = None,
+) -> None:
+    """
+    Move a driver in or out of the availability sets, keeping their last
+    position. carrier_id ("" for none) updates the employer kept in the
+    driver's meta for readers without database access (the ingest gateway).
+    """
+    r = get_redis()
+    member = str(driver_id)
+    new_types = [str(vt) for vt in vehicle_type_ids]
+    old_types = _vehicle_types(r.hgetall(_meta_key(member)))
+
+    meta = {"available": "1" if available else "0", "vehicle_types": ",".join(new_types)}
+    if carrier_id is not None:
+        meta["carrier"] = carrier_id
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(_meta_key(member), mapping=meta)
+    pipe.zrem(redis_key(*GEO_AVAILABLE), member)
+    for vt in set(old_types) | set(new_types):
+        pipe.zrem(_vehicle_type_key(vt), member)
+    pipe.geopos(redis_key(*GEO_ALL), member)
+    position = pipe.execute()[-1][0]
+
+    if available and position:
+        lng, lat = position
+        pipe = r.pipeline(transaction=False)
+        pipe.geoadd(redis_key(*GEO_AVAILABLE), (lng, lat, member))
+        for vt in new_types:
+            pipe.geoadd(_vehicle_type_key(vt), (lng, lat, member))
+        pipe.execute()
+
+
+def mark_unavailable(driver_ids: Iterable) -> None:
+    """Take several drivers out of the availability sets; two round trips."""
+    members = [str(d) for d in driver_ids]
+    if not members:
+        return
+    r = get_redis()
+    pipe = r.pipeline(transaction=False)
+    for member in members:
+        pipe.hget(_meta_key(member), "vehicle_types")
+    vehicle_types = pipe.execute()
+
+    pipe = r.pipeline(transaction=False)
+    pipe.zrem(redis_key(*GEO_AVAILABLE), *members)
+    for member, raw in zip(members, vehicle_types):
+        pipe.hset(_meta_key(member), "available", "0")
+        for vt in _vehicle_types({"vehicle_types": raw}):
+            pipe.zrem(_vehicle_type_key(vt), member)
+    pipe.execute()
+
+
+def sync_driver_state(user, available: Optional[bool] = None) -> None:
+    """Load a driver's availability and vehicle types from the DB into the store."""
+    from apps.fleet.models import Vehicle
+    if available is None:
+        available = user.driver_profile.is_available
+    vehicle_types = Vehicle.objects.filter(
+        owner=user, is_active=True, vehicle_type__isnull=False,
+    ).values_list("vehicle_type_id", flat=True).distinct()
+    employer_id = user.driver_profile.employer_id
+    set_driver_state(user.id, available, vehicle_types, carrier_id=str(employer_id) if employer_id else "")
+
+
+def get_carrier_id(driver_id) -> Optional[str]:
+    """The driver's employer as last synced from the DB (sync_driver_state), or None."""
+    return _decode(get_redis().hget(_meta_key(driver_id), "carrier")) or None
+
+
+def _hydrate(r, rows) -> list[LivePosition]:
+    """
+    rows: (driver_id, lat, lng, distance_km) → LivePositions with ts/speed/bearing,
+    leaving out drivers that are no longer present (apps.tracking.presence).
+    """
+    from . import presence
+
+    if not rows:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for driver_id, *_ in rows:
+        pipe.hmget(_loc_key(driver_id), "ts", "speed", "bearing")
+    pipe.zmscore(redis_key(*presence.PRESENCE), [driver_id for driver_id, *_ in rows])
+    *details, seen = pipe.execute()
+
+    cutoff = presence.stale_before()
+    positions = []
+    for (driver_id, lat, lng, distance_km), (ts, speed, bearing), last_seen in zip(rows, details, seen):
+        if last_seen is None or last_seen < cutoff:
+            continue
+        ts = _decode(ts)
+        positions.append(LivePosition(
+            driver_id=driver_id,
+            lat=lat,
+            lng=lng,
+            timestamp=datetime.fromisoformat(ts) if ts else None,
+            speed=_optional_float(speed),
+            bearing=_optional_float(bearing),
+            distance_km=distance_km,
+        ))
+    return positions
+
+
+def search_available(
+    lat: float, lng: float, radius_km: float,
+    vehicle_type_id=None, limit: Optional[int] = None,
+) -> list[LivePosition]:
+    """Available drivers within radius_km of (lat, lng), nearest first."""
+    r = get_redis()
+    key = _vehicle_type_key(vehicle_type_id) if vehicle_type_id else redis_key(*GEO_AVAILABLE)
+    results = r.geosearch(
+        key,
+        longitude=lng,
+        latitude=lat,
+        radius=radius_km,
+        unit="km",
+        sort="ASC",
+        count=limit,
+        withdist=True,
+        withcoord=True,
+    )
+    rows = [
+        (_decode(member), coord[1], coord[0], round(dist, 2))
+        for member, dist, coord in results
+    ]
+    return _hydrate(r, rows)
+
+
+def get_positions(driver_ids: Iterable) -> dict[str, LivePosition]:
+    """Latest fixes of several drivers in one pipeline; drivers without a fix are left out."""
+    members = [str(d) for d in driver_ids]
+    if not members:
+        return {}
+    pipe = get_redis().pipeline(transaction=False)
+    for member in members:
+        pipe.hmget(_loc_key(member), "lat", "lng", "ts", "speed", "bearing")
+    positions = {}
+    for member, (lat, lng, ts, speed, bearing) in zip(members, pipe.execute()):
+        if lat is None or lng is None:
+            continue
+        ts = _decode(ts)
+        positions[member] = LivePosition(
+            driver_id=member,
+            lat=float(lat),
+            lng=float(lng),
+            timestamp=datetime.fromisoformat(ts) if ts else None,
+            speed=_optional_float(speed),
+            bearing=_optional_float(bearing),
+        )
+    return positions
+
+
+def search_box(
+    west: float, south: float, east: float, north: float, limit: Optional[int] = None,
+) -> list[LivePosition]:
+    """Every present driver (available or not) inside a lng/lat bounding box."""
+    from .fleet import box_size_km
+
+    r = get_redis()
+    width_km, height_km = box_size_km(west, south, east, north)
+    results = r.geosearch(
+        redis_key(*GEO_ALL),
+        longitude=(west + east) / 2,
+        latitude=(south + north) / 2,
+        width=width_km,
+        height=height_km,
+        unit="km",
+        count=limit,
+        withcoord=True,
+    )
+    rows = [
+        (_decode(member), coord[1], coord[0], None)
+        for member, coord in results
+        if west <= coord[0] <= east and south <= coord[1] <= north
+    ]
+    return _hydrate(r, rows)
+
+
+def list_available(vehicle_type_id=None) -> list[LivePosition]:
+    """Every available driver with a known position."""
+    r = get_redis()
+    key = _vehicle_type_key(vehicle_type_id) if vehicle_type_id else redis_key(*GEO_AVAILABLE)
+    members = [_decode(m) for m in r.zrange(key, 0, -1)]
+    if not members:
+        return []
+    coords = r.geopos(key, *members)
+    rows = [(m, c[1], c[0], None) for m, c in zip(members, coords) if c]
+    return _hydrate(r, rows)
+
+
+def pop_dirty_positions(count: int) -> dict[str, tuple[float, float, Optional[datetime]]]:
+    """Take up to `count` moved drivers off the dirty set with their latest fix."""
+    r = get_redis()
+    members = [_decode(m) for m in (r.spop(redis_key("tracking", "dirty"), count) or [])]
+    if not members:
+        return {}
+    pipe = r.pipeline(transaction=False)
+    for member in members:
+        pipe.hmget(_loc_key(member), "lat", "lng", "ts")
+    positions = {}
+    for member, (lat, lng, ts) in zip(members, pipe.execute()):
+        if lat is None or lng is None:
+            continue
+        ts = _decode(ts)
+        positions[member] = (float(lat), float(lng), datetime.fromisoformat(ts) if ts else None)
+    return positions
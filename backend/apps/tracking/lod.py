@@ -0,0 +1,51 @@
+"""
+MESS Platform — Track Level of Detail
+Keeps responses bounded when a map is zoomed out on a long trip.
+
+Two pyramids:
+  - Routes: OrderRoute keeps the driven path pre-simplified at each
+    TRACKING_ROUTES["TOLERANCES_M"] level (apps.tracking.routes); a map zoom
+    level is translated to the tolerance of about one screen pixel.
+  - Pings: ?resolution= picks a TRACKING_PING_RESOLUTIONS bucket (e.g. 30s,
+    5m) and only the newest ping per time bucket is returned, computed in
+    SQL with date_bin + row_number() over the already time-bounded (and thus
+    partition-pruned) query.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import DateTimeField, DurationField, F, Func, Value, Window
+from django.db.models.functions import RowNumber
+
+# Web-mercator ground resolution at zoom 0 on the equator, metres per 256px tile pixel
+METRES_PER_PIXEL_Z0 = 156543.03392
+BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=dt_timezone.utc)  # a Monday, like the partitions
+
+
+class DateBin(Func):
+    """PostgreSQL 14+ date_bin(stride, source, origin)."""
+    function = "date_bin"
+    output_field = DateTimeField()
+
+
+def resolution_seconds(name: str) -> Optional[int]:
+    return settings.TRACKING_PING_RESOLUTIONS.get(name)
+
+
+def downsample_pings(queryset, seconds: int):
+    """Newest ping per `seconds`-wide time bucket of a GPSPing queryset."""
+    bucket = DateBin(
+        Value(timedelta(seconds=seconds), output_field=DurationField()),
+        F("timestamp"),
+        Value(BUCKET_ORIGIN, output_field=DateTimeField()),
+    )
+    return queryset.annotate(
+        bucket_rank=Window(RowNumber(), partition_by=bucket, order_by=F("timestamp").desc()),
+    ).filter(bucket_rank=1)
+
+
+def tolerance_for_zoom(zoom: float, lat: float = 0.0) -> float:
+    """Metres covered by one screen pixel at a web-map zoom level and latitude."""
+    return METRES_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom)
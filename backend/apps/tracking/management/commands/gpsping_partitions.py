@@ -0,0 +1,49 @@
+"""
+Management command to maintain the weekly GPS ping partitions.
+Creates upcoming weeks and detaches/drops weeks past the retention window.
+The same work runs nightly via the maintain_gpsping_partitions Celery task.
+
+Usage:
+    ./manage.py gpsping_partitions
+    ./manage.py gpsping_partitions --weeks-ahead 8 --retention-days 365
+    ./manage.py gpsping_partitions --detach-only      # keep expired tables for archiving
+    ./manage.py gpsping_partitions --list
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tracking import partitions
+
+
+class Command(BaseCommand):
+    help = "Create future GPS ping partitions and expire old ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--weeks-ahead", type=int, help="Weeks to pre-create (default: settings)")
+        parser.add_argument("--retention-days", type=int, help="Days of pings to keep (default: settings)")
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            help="Detach expired partitions without dropping them",
+        )
+        parser.add_argument("--list", action="store_true", help="List partitions and exit")
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            raise CommandError("GPS ping partitioning requires PostgreSQL.")
+
+        if options["list"]:
+            for partition in partitions.list_partitions():
+                self.stdout.write(f"{partition.name}  {partition.start} → {partition.end}")
+            return
+
+        created = partitions.ensure_partitions(weeks_ahead=options["weeks_ahead"])
+        expired = partitions.expire_partitions(
+            retention_days=options["retention_days"],
+            drop=False if options["detach_only"] else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} partition(s): {', '.join(created) or '-'}"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {len(expired)} partition(s): {', '.join(expired) or '-'}"
+        ))
@@ -0,0 +1,61 @@
+"""
+Management command running one writer of the GPS ping stream
+(TRACKING_INGEST["MODE"] = "stream", see apps.tracking.stream).
+Run as many as needed; they share the stream through a consumer group.
+
+Usage:
+    ./manage.py tracking_stream_writer
+    ./manage.py tracking_stream_writer --consumer writer-1 --batch-size 5000
+    ./manage.py tracking_stream_writer --info
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.tracking import stream
+
+MAX_BACKOFF_SECONDS = 5.0
+
+
+class Command(BaseCommand):
+    help = "Drain the GPS ping stream into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", help="Consumer name in the group (default: <hostname>-<pid>)")
+        parser.add_argument("--batch-size", type=int, help="Entries per read (default: settings)")
+        parser.add_argument("--info", action="store_true", help="Print the stream backlog and exit")
+
+    def handle(self, *args, **options):
+        if options["info"]:
+            stream.ensure_group()
+            for name, value in stream.info().items():
+                self.stdout.write(f"{name}: {value}")
+            return
+
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        writer = stream.StreamWriter(consumer=options["consumer"], batch_size=options["batch_size"])
+        self.stdout.write(f"Ping stream writer {writer.consumer} started.")
+        backoff, group_ready = 0.0, False
+        while self._running:
+            close_old_connections()
+            try:
+                if not group_ready:
+                    stream.ensure_group()
+                    group_ready = True
+                writer.run_once()
+                backoff = 0.0
+            except Exception as exc:
+                # A restarted Redis may have lost the group (NOGROUP); recreate it
+                group_ready = False
+                backoff = min(max(backoff * 2, 0.5), MAX_BACKOFF_SECONDS)
+                self.stderr.write(f"Ping stream writer error, retrying in {backoff:.1f}s: {exc}")
+                time.sleep(backoff)
+        self.stdout.write(self.style.SUCCESS(f"Ping stream writer {writer.consumer} stopped: {writer.stats}"))
+
+    def _stop(self, signum, frame):
+        self._running = False
@@ -0,0 +1,94 @@
+"""
+Convert tracking_gpsping into a table range-partitioned by week on "timestamp".
+
+Django has no declarative partitioning, so the model state is unchanged and the
+table is rebuilt with raw SQL: existing rows are copied into weekly partitions
+(Monday 00:00 UTC boundaries) plus a DEFAULT partition catching anything
+outside the pre-created range. The primary key becomes (id, "timestamp")
+because a partitioned table's unique constraints must include the partition
+key. Future partitions are created by apps.tracking.partitions.
+"""
+from django.db import migrations
+
+FORWARD_SQL = """
+ALTER TABLE tracking_gpsping RENAME TO tracking_gpsping_unpartitioned;
+
+CREATE TABLE tracking_gpsping (
+    LIKE tracking_gpsping_unpartitioned INCLUDING DEFAULTS
+) PARTITION BY RANGE ("timestamp");
+
+ALTER TABLE tracking_gpsping ADD PRIMARY KEY (id, "timestamp");
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_driver_id_fk_accounts_user_id
+    FOREIGN KEY (driver_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_order_id_fk_orders_freightorder_id
+    FOREIGN KEY (order_id) REFERENCES orders_freightorder (id) DEFERRABLE INITIALLY DEFERRED;
+
+CREATE TABLE tracking_gpsping_default PARTITION OF tracking_gpsping DEFAULT;
+
+DO $$
+DECLARE
+    week date := date_trunc(
+        'week',
+        COALESCE((SELECT min("timestamp") FROM tracking_gpsping_unpartitioned), now()) AT TIME ZONE 'UTC'
+    )::date;
+    last_week date := date_trunc('week', now() AT TIME ZONE 'UTC')::date + 28;
+BEGIN
+    WHILE week <= last_week LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF tracking_gpsping FOR VALUES FROM (%L) TO (%L)',
+            'tracking_gpsping_p' || to_char(week, 'YYYYMMDD'),
+            to_char(week, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(week + 7, 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+        week := week + 7;
+    END LOOP;
+END $$;
+
+INSERT INTO tracking_gpsping SELECT * FROM tracking_gpsping_unpartitioned;
+DROP TABLE tracking_gpsping_unpartitioned;
+
+CREATE INDEX tracking_gpsping_timestamp_idx ON tracking_gpsping ("timestamp");
+CREATE INDEX tracking_gpsping_driver_id_idx ON tracking_gpsping (driver_id);
+CREATE INDEX tracking_gpsping_order_id_idx ON tracking_gpsping (order_id);
+CREATE INDEX tracking_gp_driver__276e42_idx ON tracking_gpsping (driver_id, "timestamp" DESC);
+CREATE INDEX tracking_gp_order_i_1aa739_idx ON tracking_gpsping (order_id, "timestamp" DESC);
+"""
+
+REVERSE_SQL = """
+ALTER TABLE tracking_gpsping RENAME TO tracking_gpsping_partitioned;
+
+CREATE TABLE tracking_gpsping (
+    LIKE tracking_gpsping_partitioned INCLUDING DEFAULTS
+);
+ALTER TABLE tracking_gpsping ADD PRIMARY KEY (id);
+INSERT INTO tracking_gpsping SELECT * FROM tracking_gpsping_partitioned;
+DROP TABLE tracking_gpsping_partitioned CASCADE;
+
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_driver_id_fk_accounts_user_id
+    FOREIGN KEY (driver_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_order_id_fk_orders_freightorder_id
+    FOREIGN KEY (order_id) REFERENCES orders_freightorder (id) DEFERRABLE INITIALLY DEFERRED;
+
+CREATE INDEX tracking_gpsping_timestamp_idx ON tracking_gpsping ("timestamp");
+CREATE INDEX tracking_gpsping_driver_id_idx ON tracking_gpsping (driver_id);
+CREATE INDEX tracking_gpsping_order_id_idx ON tracking_gpsping (order_id);
+CREATE INDEX tracking_gp_driver__276e42_idx ON tracking_gpsping (driver_id, "timestamp" DESC);
+CREATE INDEX tracking_gp_order_i_1aa739_idx ON tracking_gpsping (order_id, "timestamp" DESC);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0001_initial"),
+        ("accounts", "0013_driverprofile_avail_latlng_index"),
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,256 @@
+"""
+Rewrite tracking_gpsping in a compact fixed-point layout.
+
+UUID id -> BIGINT identity, NUMERIC coordinates -> integer microdegrees,
+NUMERIC speed/bearing -> smallint tenths, NUMERIC accuracy -> smallint metres.
+Columns are ordered 8-byte, 16-byte, 4-byte, 2-byte to avoid alignment padding.
+The FK-only indexes are dropped (the composite (driver|order, timestamp)
+indexes cover them) and the timestamp B-tree becomes a BRIN index.
+
+The table is rebuilt partition by partition: every existing partition (and
+the DEFAULT one) is recreated with the same bounds, rows are converted on copy,
+then the new table takes over the old names. Reversing rebuilds the NUMERIC
+layout of 0002 the same way; pings get fresh UUIDs.
+"""
+import django.utils.timezone
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import migrations, models
+
+FORWARD_SQL = """
+CREATE TABLE tracking_gpsping_compact (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    "timestamp" timestamp with time zone NOT NULL,
+    driver_id uuid NOT NULL,
+    order_id uuid NULL,
+    lat_e6 integer NOT NULL,
+    lng_e6 integer NOT NULL,
+    accuracy_m smallint NULL CHECK (accuracy_m >= 0),
+    speed_x10 smallint NULL,
+    bearing_x10 smallint NULL,
+    PRIMARY KEY (id, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+
+DO $$
+DECLARE
+    part record;
+BEGIN
+    FOR part IN
+        SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'tracking_gpsping'
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF tracking_gpsping_compact %s',
+            part.name || '_c', part.bound
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO tracking_gpsping_compact
+    ("timestamp", driver_id, order_id, lat_e6, lng_e6, accuracy_m, speed_x10, bearing_x10)
+SELECT
+    "timestamp",
+    driver_id,
+    order_id,
+    round(lat * 1000000)::integer,
+    round(lng * 1000000)::integer,
+    CASE WHEN accuracy_m IS NOT NULL THEN least(greatest(round(accuracy_m), 0), 32767) END::smallint,
+    CASE WHEN speed_kmh IS NOT NULL THEN least(greatest(round(speed_kmh * 10), -32767), 32767) END::smallint,
+    (((round(bearing * 10)::integer % 3600) + 3600) % 3600)::smallint
+FROM tracking_gpsping
+ORDER BY "timestamp";
+
+DROP TABLE tracking_gpsping;
+ALTER TABLE tracking_gpsping_compact RENAME TO tracking_gpsping;
+ALTER SEQUENCE tracking_gpsping_compact_id_seq RENAME TO tracking_gpsping_id_seq;
+ALTER TABLE tracking_gpsping RENAME CONSTRAINT tracking_gpsping_compact_pkey TO tracking_gpsping_pkey;
+
+DO $$
+DECLARE
+    part record;
+BEGIN
+    FOR part IN
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'tracking_gpsping'
+    LOOP
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', part.name, left(part.name, -2));
+    END LOOP;
+END $$;
+
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_driver_id_fk_accounts_user_id
+    FOREIGN KEY (driver_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_order_id_fk_orders_freightorder_id
+    FOREIGN KEY (order_id) REFERENCES orders_freightorder (id) DEFERRABLE INITIALLY DEFERRED;
+
+CREATE INDEX tracking_gp_driver__276e42_idx ON tracking_gpsping (driver_id, "timestamp" DESC);
+CREATE INDEX tracking_gp_order_i_1aa739_idx ON tracking_gpsping (order_id, "timestamp" DESC);
+CREATE INDEX tracking_gpsping_ts_brin ON tracking_gpsping USING brin ("timestamp");
+"""
+
+REVERSE_SQL = """
+CREATE TABLE tracking_gpsping_numeric (
+    id uuid NOT NULL,
+    lat numeric(9, 6) NOT NULL,
+    lng numeric(9, 6) NOT NULL,
+    accuracy_m numeric(6, 2) NULL,
+    speed_kmh numeric(5, 2) NULL,
+    bearing numeric(5, 2) NULL,
+    "timestamp" timestamp with time zone NOT NULL,
+    driver_id uuid NOT NULL,
+    order_id uuid NULL,
+    PRIMARY KEY (id, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+
+DO $$
+DECLARE
+    part record;
+BEGIN
+    FOR part IN
+        SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'tracking_gpsping'
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF tracking_gpsping_numeric %s',
+            part.name || '_n', part.bound
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO tracking_gpsping_numeric
+    (id, lat, lng, accuracy_m, speed_kmh, bearing, "timestamp", driver_id, order_id)
+SELECT
+    gen_random_uuid(),
+    lat_e6 / 1000000.0,
+    lng_e6 / 1000000.0,
+    CASE WHEN accuracy_m IS NOT NULL THEN least(accuracy_m, 9999.99) END,
+    CASE WHEN speed_x10 IS NOT NULL THEN least(greatest(speed_x10 / 10.0, -999.99), 999.99) END,
+    bearing_x10 / 10.0,
+    "timestamp",
+    driver_id,
+    order_id
+FROM tracking_gpsping;
+
+DROP TABLE tracking_gpsping;
+ALTER TABLE tracking_gpsping_numeric RENAME TO tracking_gpsping;
+ALTER TABLE tracking_gpsping RENAME CONSTRAINT tracking_gpsping_numeric_pkey TO tracking_gpsping_pkey;
+
+DO $$
+DECLARE
+    part record;
+BEGIN
+    FOR part IN
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'tracking_gpsping'
+    LOOP
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', part.name, left(part.name, -2));
+    END LOOP;
+END $$;
+
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_driver_id_fk_accounts_user_id
+    FOREIGN KEY (driver_id) REFERENCES accounts_user (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE tracking_gpsping
+    ADD CONSTRAINT tracking_gpsping_order_id_fk_orders_freightorder_id
+    FOREIGN KEY (order_id) REFERENCES orders_freightorder (id) DEFERRABLE INITIALLY DEFERRED;
+
+CREATE INDEX tracking_gpsping_timestamp_idx ON tracking_gpsping ("timestamp");
+CREATE INDEX tracking_gpsping_driver_id_idx ON tracking_gpsping (driver_id);
+CREATE INDEX tracking_gpsping_order_id_idx ON tracking_gpsping (order_id);
+CREATE INDEX tracking_gp_driver__276e42_idx ON tracking_gpsping (driver_id, "timestamp" DESC);
+CREATE INDEX tracking_gp_order_i_1aa739_idx ON tracking_gpsping (order_id, "timestamp" DESC);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0002_partition_gpsping_by_week"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(FORWARD_SQL, REVERSE_SQL)],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="gpsping",
+                    name="id",
+                    field=models.BigAutoField(primary_key=True, serialize=False),
+                ),
+                migrations.RemoveField(model_name="gpsping", name="lat"),
+                migrations.RemoveField(model_name="gpsping", name="lng"),
+                migrations.RemoveField(model_name="gpsping", name="speed_kmh"),
+                migrations.RemoveField(model_name="gpsping", name="bearing"),
+                migrations.AddField(
+                    model_name="gpsping",
+                    name="lat_e6",
+                    field=models.IntegerField(default=0),
+                    preserve_default=False,
+                ),
+                migrations.AddField(
+                    model_name="gpsping",
+                    name="lng_e6",
+                    field=models.IntegerField(default=0),
+                    preserve_default=False,
+                ),
+                migrations.AddField(
+                    model_name="gpsping",
+                    name="speed_x10",
+                    field=models.SmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AddField(
+                    model_name="gpsping",
+                    name="bearing_x10",
+                    field=models.SmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name="gpsping",
+                    name="accuracy_m",
+                    field=models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name="gpsping",
+                    name="driver",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=models.deletion.CASCADE,
+                        related_name="gps_pings",
+                        to="accounts.user",
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="gpsping",
+                    name="order",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=models.deletion.SET_NULL,
+                        related_name="gps_pings",
+                        to="orders.freightorder",
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="gpsping",
+                    name="timestamp",
+                    field=models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                migrations.AddIndex(
+                    model_name="gpsping",
+                    index=BrinIndex(fields=["timestamp"], name="tracking_gpsping_ts_brin"),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracking", "0003_compact_gpsping"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderroute",
+            name="actual_route_levels",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="orderroute",
+            name="actual_point_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="orderroute",
+            name="last_point_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
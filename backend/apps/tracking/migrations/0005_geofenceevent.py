@@ -0,0 +1,84 @@
+# Generated by Django 6.0.6 on 2026-10-18 13:05
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0001_initial"),
+        ("tracking", "0004_orderroute_incremental_actual_route"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeofenceEvent",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "zone",
+                    models.CharField(
+                        choices=[("PICKUP", "Pickup"), ("DELIVERY", "Delivery")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "event",
+                    models.CharField(
+                        choices=[("ARRIVED", "Arrived"), ("DEPARTED", "Departed")],
+                        max_length=10,
+                    ),
+                ),
+                ("lat", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("lng", models.DecimalField(decimal_places=6, max_digits=9)),
+                ("occurred_at", models.DateTimeField()),
+                ("dwell_seconds", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="geofence_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="geofence_events",
+                        to="orders.freightorder",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Geofence Event",
+                "ordering": ["occurred_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["order", "occurred_at"],
+                        name="tracking_ge_order_i_71ba31_idx",
+                    )
+                ],
+            },
+        ),
+    ]
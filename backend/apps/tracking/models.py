@@ -2,31 +2,56 @@
 MESS Platform — Tracking Models
 Real-time GPS pings and route storage.
 """
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Optional
+
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from django.utils import timezone
 
-from core.models import BaseModel, UUIDModel
+from core.models import BaseModel
+
+
+def _scaled(value, factor: int, limit: int) -> Optional[int]:
+    """Round a coordinate/measurement to a fixed-point integer, clamped to ±limit."""
+    if value is None:
+        return None
+    scaled = int((Decimal(str(value)) * factor).to_integral_value(rounding=ROUND_HALF_EVEN))
+    return max(-limit, min(limit, scaled))
 
 
-class GPSPing(UUIDModel):
+class GPSPing(models.Model):
     """
     A single GPS location update from a driver.
     High-volume, append-only table — no updated_at, no soft-delete.
-    Partitioned by timestamp in production for performance.
+    Range-partitioned by week on timestamp (see apps.tracking.partitions);
+    the primary key is (id, timestamp) at the database level.
+
+    Stored in fixed point to keep rows small: coordinates in integer
+    microdegrees (~11 cm), speed and bearing in tenths, accuracy in whole
+    metres, and a BIGINT identity key. lat/lng/speed_kmh/bearing are float
+    properties (settable, also as constructor kwargs) so callers keep working
+    in degrees and km/h.
     """
+    id = models.BigAutoField(primary_key=True)
+    # (driver, -timestamp) and (order, -timestamp) below cover FK lookups
     driver = models.ForeignKey(
-        "accounts.User", on_delete=models.CASCADE, related_name="gps_pings"
+        "accounts.User", on_delete=models.CASCADE, related_name="gps_pings", db_index=False
     )
     order = models.ForeignKey(
         "orders.FreightOrder", on_delete=models.SET_NULL,
-        null=True, blank=True, related_name="gps_pings"
+        null=True, blank=True, related_name="gps_pings", db_index=False
     )
-    lat = models.DecimalField(max_digits=9, decimal_places=6)
-    lng = models.DecimalField(max_digits=9, decimal_places=6)
-    accuracy_m = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    speed_kmh = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    bearing = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    lat_e6 = models.IntegerField()
+    lng_e6 = models.IntegerField()
+    accuracy_m = models.PositiveSmallIntegerField(null=True, blank=True)
+    speed_x10 = models.SmallIntegerField(null=True, blank=True)    # km/h × 10
+    bearing_x10 = models.SmallIntegerField(null=True, blank=True)  # degrees × 10
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    COORD_SCALE = 1_000_000
+    TENTHS = 10
+    SMALLINT_MAX = 32767
 
     class Meta:
         verbose_name = "GPS Ping"
@@ -34,11 +59,52 @@ class GPSPing(UUIDModel):
         indexes = [
             models.Index(fields=["driver", "-timestamp"]),
             models.Index(fields=["order", "-timestamp"]),
+            # Pings arrive in time order, so a BRIN index is a few pages per partition
+            BrinIndex(fields=["timestamp"], name="tracking_gpsping_ts_brin"),
         ]
 
     def __str__(self):
         return f"{self.driver} @ ({self.lat}, {self.lng}) {self.timestamp}"
 
+    @property
+    def lat(self) -> Optional[float]:
+        return None if self.lat_e6 is None else self.lat_e6 / self.COORD_SCALE
+
+    @lat.setter
+    def lat(self, value):
+        self.lat_e6 = _scaled(value, self.COORD_SCALE, 90 * self.COORD_SCALE)
+
+    @property
+    def lng(self) -> Optional[float]:
+        return None if self.lng_e6 is None else self.lng_e6 / self.COORD_SCALE
+
+    @lng.setter
+    def lng(self, value):
+        self.lng_e6 = _scaled(value, self.COORD_SCALE, 180 * self.COORD_SCALE)
+
+    @property
+    def speed_kmh(self) -> Optional[float]:
+        return None if self.speed_x10 is None else self.speed_x10 / self.TENTHS
+
+    @speed_kmh.setter
+    def speed_kmh(self, value):
+        self.speed_x10 = _scaled(value, self.TENTHS, self.SMALLINT_MAX)
+
+    @property
+    def bearing(self) -> Optional[float]:
+        return None if self.bearing_x10 is None else self.bearing_x10 / self.TENTHS
+
+    @bearing.setter
+    def bearing(self, value):
+        scaled = _scaled(value, self.TENTHS, self.SMALLINT_MAX)
+        self.bearing_x10 = None if scaled is None else scaled % 3600
+
+    @classmethod
+    def accuracy_for(cls, value) -> Optional[int]:
+        """Whole metres for the accuracy_m column (0..SMALLINT_MAX)."""
+        scaled = _scaled(value, 1, cls.SMALLINT_MAX)
+        return None if scaled is None else max(0, scaled)
+
 
 class OrderRoute(BaseModel):
     """
@@ -50,8 +116,12 @@ class OrderRoute(BaseModel):
     )
     # GeoJSON LineString of the planned route from routing engine
     planned_route_geojson = models.JSONField(null=True, blank=True)
-    # GeoJSON LineString built from actual GPS pings
+    # GeoJSON LineString built from actual GPS pings (finest simplification level)
     actual_route_geojson = models.JSONField(null=True, blank=True)
+    # Streaming simplification state per tolerance, see apps.tracking.routes
+    actual_route_levels = models.JSONField(default=dict, blank=True)
+    actual_point_count = models.PositiveIntegerField(default=0)
+    last_point_at = models.DateTimeField(null=True, blank=True)
 
     planned_distance_km = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     planned_duration_minutes = models.PositiveIntegerField(null=True, blank=True)
@@ -62,3 +132,43 @@ class OrderRoute(BaseModel):
 
     def __str__(self):
         return f"Route for {self.order.reference}"
+
+
+class GeofenceZone(models.TextChoices):
+    PICKUP = "PICKUP", "Pickup"
+    DELIVERY = "DELIVERY", "Delivery"
+
+
+class GeofenceEventType(models.TextChoices):
+    ARRIVED = "ARRIVED", "Arrived"
+    DEPARTED = "DEPARTED", "Departed"
+
+
+class GeofenceEvent(BaseModel):
+    """
+    A driver entering or leaving an order's pickup or delivery zone,
+    detected from pings by apps.tracking.geofence.
+    """
+    order = models.ForeignKey(
+        "orders.FreightOrder", on_delete=models.CASCADE, related_name="geofence_events"
+    )
+    driver = models.ForeignKey(
+        "accounts.User", on_delete=models.CASCADE, related_name="geofence_events"
+    )
+    zone = models.CharField(max_length=10, choices=GeofenceZone.choices)
+    event = models.CharField(max_length=10, choices=GeofenceEventType.choices)
+    lat = models.DecimalField(max_digits=9, decimal_places=6)
+    lng = models.DecimalField(max_digits=9, decimal_places=6)
+    occurred_at = models.DateTimeField()
+    # Time spent in the zone, on departures
+    dwell_seconds = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Geofence Event"
+        ordering = ["occurred_at"]
+        indexes = [
+            models.Index(fields=["order", "occurred_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.driver} {self.event} {self.zone} of {self.order_id} at {self.occurred_at}"
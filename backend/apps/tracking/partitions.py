@@ -0,0 +1,158 @@
+"""
+MESS Platform — GPS Ping Partitions
+Lifecycle of the weekly range partitions of tracking_gpsping
+(see migration 0002_partition_gpsping_by_week).
+
+Partitions are named tracking_gpsping_pYYYYMMDD after the Monday (UTC) that
+starts their week. Future weeks are created ahead of time so inserts never
+land in the DEFAULT partition; weeks older than the retention window are
+detached and, unless configured otherwise, dropped — far cheaper than a
+DELETE over millions of rows.
+"""
+import logging
+import re
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = "tracking_gpsping"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_DAYS = 7
+
+_NAME_RE = re.compile(rf"^{TABLE}_p(\d{{8}})$")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: date  # inclusive, 00:00 UTC
+    end: date    # exclusive, 00:00 UTC
+
+
+def is_supported() -> bool:
+    """Partitioning only exists on PostgreSQL; other backends are a no-op."""
+    return connection.vendor == "postgresql"
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def partition_for(day: date) -> Partition:
+    start = week_start(day)
+    return Partition(f"{TABLE}_p{start:%Y%m%d}", start, start + timedelta(days=PARTITION_DAYS))
+
+
+def _bound(day: date) -> str:
+    return f"{day:%Y-%m-%d} 00:00:00+00"
+
+
+def list_partitions() -> list[Partition]:
+    """Weekly partitions currently attached to the ping table, oldest first."""
+    if not is_supported():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = _NAME_RE.match(name)
+        if match:
+            start = date(int(match[1][:4]), int(match[1][4:6]), int(match[1][6:]))
+            partitions.append(Partition(name, start, start + timedelta(days=PARTITION_DAYS)))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def create_partition(partition: Partition) -> None:
+    """
+    Attach a partition for one week.
+    Rows that already fell into the DEFAULT partition for that range are
+    moved into the new partition in the same transaction — Postgres refuses
+    to create it otherwise. The staging table only lives until this call
+    returns, so several weeks can be created in one transaction.
+    """
+    start, end = _bound(partition.start), _bound(partition.end)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS _gpsping_moved")
+        cursor.execute(
+            f'CREATE TEMP TABLE _gpsping_moved ON COMMIT DROP AS '
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f'SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(
+            f'CREATE TABLE "{partition.name}" PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM _gpsping_moved")
+        moved = cursor.rowcount
+        cursor.execute("DROP TABLE _gpsping_moved")
+        if moved:
+            logger.warning(f"Moved {moved} pings from {DEFAULT_PARTITION} into {partition.name}.")
+
+
+def ensure_partitions(weeks_ahead: Optional[int] = None, today: Optional[date] = None) -> list[str]:
+    """Create any missing partitions from the current week to `weeks_ahead` weeks out."""
+    if not is_supported():
+        return []
+    if weeks_ahead is None:
+        weeks_ahead = settings.TRACKING_PING_PARTITIONS["WEEKS_AHEAD"]
+    today = today or timezone.now().date()
+
+    existing = {p.name for p in list_partitions()}
+    created = []
+    for week in range(weeks_ahead + 1):
+        partition = partition_for(today + timedelta(weeks=week))
+        if partition.name not in existing:
+            create_partition(partition)
+            created.append(partition.name)
+    if created:
+        logger.info(f"Created GPS ping partitions: {', '.join(created)}")
+    return created
+
+
+def expire_partitions(
+    retention_days: Optional[int] = None,
+    drop: Optional[bool] = None,
+    today: Optional[date] = None,
+) -> list[str]:
+    """
+    Detach partitions whose whole week is older than `retention_days`.
+    Detached tables are dropped when `drop` is true; otherwise they are left
+    in place as standalone tables for archiving.
+    """
+    if not is_supported():
+        return []
+    config = settings.TRACKING_PING_PARTITIONS
+    if retention_days is None:
+        retention_days = config["RETENTION_DAYS"]
+    if drop is None:
+        drop = config["DROP_EXPIRED"]
+    today = today or timezone.now().date()
+    cutoff = today - timedelta(days=retention_days)
+
+    expired = [p for p in list_partitions() if p.end <= cutoff]
+    for partition in expired:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION "{partition.name}"')
+            if drop:
+                cursor.execute(f'DROP TABLE "{partition.name}"')
+    if expired:
+        action = "Dropped" if drop else "Detached"
+        logger.info(f"{action} expired GPS ping partitions: {', '.join(p.name for p in expired)}")
+    return [p.name for p in expired]
@@ -0,0 +1,103 @@
+"""
+MESS Platform — Driver Presence
+Who is actually connected, independent of clean WebSocket closes.
+
+Every ping batch, heartbeat frame and availability update refreshes the
+driver's score in one Redis sorted set (tracking:presence, score = unix time
+last seen). A driver is present while that score is newer than
+TRACKING_PRESENCE["TIMEOUT_SECONDS"]. The sweeper task marks everyone older
+than that offline — one bulk UPDATE of DriverProfile.is_available plus one
+pipeline removing them from the live availability sets — so crashed workers
+and phones that drop off the network no longer leave drivers "available".
+
+DriverProfile.is_available remains the driver's own on/off-duty switch;
+availability queries combine it with presence (filter_online).
+"""
+import logging
+import time
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+
+logger = logging.getLogger(__name__)
+
+PRESENCE = ("tracking", "presence")
+
+
+def _key():
+    return redis_key(*PRESENCE)
+
+
+def stale_before(now: Optional[float] = None) -> float:
+    """Unix time before which a driver last seen counts as gone."""
+    return (now or time.time()) - settings.TRACKING_PRESENCE["TIMEOUT_SECONDS"]
+
+
+def touch(driver_ids: Iterable, now: Optional[float] = None) -> None:
+    """Mark drivers as seen now; one ZADD whatever the number of drivers."""
+    mapping = {str(d): now or time.time() for d in driver_ids}
+    if mapping:
+        get_redis().zadd(_key(), mapping)
+
+
+def remove(driver_id) -> None:
+    get_redis().zrem(_key(), str(driver_id))
+
+
+def last_seen(driver_id) -> Optional[float]:
+    return get_redis().zscore(_key(), str(driver_id))
+
+
+def is_online(driver_id, now: Optional[float] = None) -> bool:
+    seen = last_seen(driver_id)
+    return seen is not None and seen >= stale_before(now)
+
+
+def filter_online(driver_ids: Iterable, now: Optional[float] = None) -> list[str]:
+    """
+    The present subset of `driver_ids`, in the given order, in one round trip.
+    Fails open (returns every id) when Redis is unreachable.
+    """
+    ids = [str(d) for d in driver_ids]
+    if not ids:
+        return []
+    try:
+        scores = get_redis().zmscore(_key(), ids)
+    except Exception as exc:
+        logger.warning("Driver presence unavailable, not filtering: %s", exc)
+        return ids
+    cutoff = stale_before(now)
+    return [d for d, score in zip(ids, scores) if score is not None and score >= cutoff]
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def sweep(now: Optional[float] = None) -> int:
+    """
+    Take drivers not seen within the timeout offline, SWEEP_BATCH_SIZE at a
+    time: one UPDATE and one live-store pipeline per batch. Returns the
+    number of drivers swept.
+    """
+    from apps.accounts.models import DriverProfile
+    from . import live
+
+    r = get_redis()
+    cutoff = stale_before(now)
+    batch_size = settings.TRACKING_PRESENCE["SWEEP_BATCH_SIZE"]
+    total = 0
+    while True:
+        stale = [_decode(m) for m in r.zrangebyscore(_key(), "-inf", cutoff, start=0, num=batch_size)]
+        if not stale:
+            break
+        DriverProfile.objects.filter(user_id__in=stale, is_available=True).update(is_available=False)
+        if live.is_enabled():
+            live.mark_unavailable(stale)
+        r.zrem(_key(), *stale)
+        total += len(stale)
+        if len(stale) < batch_size:
+            break
+    return total
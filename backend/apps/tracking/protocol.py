@@ -0,0 +1,180 @@
+"""
+MESS Platform — Binary Driver Location Protocol (WebSocket subprotocol "mess.gps.v1")
+
+Drivers on slow links negotiate this subprotocol on ws/tracking/driver/ and
+send binary frames carrying a batch of fixes; the server answers each batch
+with one cumulative ack. Clients that do not ask for it keep the JSON protocol.
+
+All integers are little-endian.
+
+Fix batch (client → server):
+    header  <B B H I q 16s>   32 bytes
+        version       uint8   = 1
+        type          uint8   = 1 (FIX_BATCH)
+        count         uint16  number of fixes that follow (1..MAX_BATCH)
+        seq           uint32  sequence number of the first fix; fixes are seq..seq+count-1
+        base_time_ms  int64   Unix epoch milliseconds
+        order_id      16 bytes UUID, all zeros when not on an order
+    fix     <I i i H h H>     18 bytes each
+        dt_ms         uint32  offset from base_time_ms
+        lat_e6        int32   microdegrees
+        lng_e6        int32   microdegrees
+        accuracy_m    uint16  metres, 0xFFFF = unknown
+        speed_x10     int16   km/h × 10, -1 = unknown
+        bearing_x10   uint16  degrees × 10, 0xFFFF = unknown
+
+A body of back-to-back FIX_BATCH frames (media type MEDIA_TYPE) can also be
+POSTed to /api/v1/tracking/pings/upload/ to upload fixes buffered offline.
+
+Ack (server → client):
+    <B B H I>                 8 bytes
+        version       uint8   = 1
+        type          uint8   = 2 (ACK)
+        status        uint16  STATUS_OK or an error code
+        acked_seq     uint32  every fix up to and including this one was accepted
+                              (on error: the last seq of the rejected batch)
+"""
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import NamedTuple, Optional
+
+SUBPROTOCOL = "mess.gps.v1"
+MEDIA_TYPE = "application/vnd.mess.gps.v1"
+VERSION = 1
+
+FIX_BATCH = 1
+ACK = 2
+
+STATUS_OK = 0
+STATUS_MALFORMED = 1
+STATUS_UNSUPPORTED = 2
+STATUS_NOT_SAVED = 3
+
+MAX_BATCH = 500
+# Older fixes (e.g. a phone's stale backlog) are dropped
+MAX_FIX_AGE = timedelta(hours=24)
+
+HEADER = struct.Struct("<BBHIq16s")
+FIX = struct.Struct("<IiiHhH")
+ACK_FRAME = struct.Struct("<BBHI")
+
+_UNKNOWN_U16 = 0xFFFF
+_UNKNOWN_SPEED = -1
+
+
+class ProtocolError(ValueError):
+    def __init__(self, message: str, status: int = STATUS_MALFORMED):
+        super().__init__(message)
+        self.status = status
+
+
+class Fix(NamedTuple):
+    lat: float
+    lng: float
+    accuracy_m: Optional[float]
+    speed_kmh: Optional[float]
+    bearing: Optional[float]
+    timestamp: datetime
+
+
+class FixBatch(NamedTuple):
+    seq: int
+    count: int  # fixes in the frame, including any dropped as too old
+    order_id: Optional[uuid.UUID]
+    fixes: list[Fix]
+
+    @property
+    def last_seq(self) -> int:
+        return (self.seq + self.count - 1) & 0xFFFFFFFF
+
+
+def decode_batch(frame: bytes, now: Optional[datetime] = None, max_age: timedelta = MAX_FIX_AGE) -> FixBatch:
+    """
+    Parse a FIX_BATCH frame. Timestamps ahead of `now` (client clock skew) are
+    clamped to it; fixes older than max_age are dropped (they still count towards the ack).
+    """
+    if len(frame) < HEADER.size:
+        raise ProtocolError("Frame shorter than header.")
+    version, msg_type, count, seq, base_ms, order_bytes = HEADER.unpack_from(frame)
+    if version != VERSION or msg_type != FIX_BATCH:
+        raise ProtocolError(f"Unsupported frame version={version} type={msg_type}.", STATUS_UNSUPPORTED)
+    if not 1 <= count <= MAX_BATCH:
+        raise ProtocolError(f"Batch size must be 1..{MAX_BATCH}.")
+    if len(frame) != HEADER.size + count * FIX.size:
+        raise ProtocolError("Frame length does not match fix count.")
+
+    order_id = uuid.UUID(bytes=order_bytes) if any(order_bytes) else None
+    now = now or datetime.now(dt_timezone.utc)
+    try:
+        base = datetime.fromtimestamp(base_ms / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise ProtocolError("Invalid base time.")
+
+    fixes = []
+    for dt_ms, lat_e6, lng_e6, accuracy, speed, bearing in FIX.iter_unpack(frame[HEADER.size:]):
+        if not (-90_000_000 <= lat_e6 <= 90_000_000 and -180_000_000 <= lng_e6 <= 180_000_000):
+            raise ProtocolError("Coordinates out of range.")
+        timestamp = min(base + timedelta(milliseconds=dt_ms), now)
+        if now - timestamp > max_age:
+            continue
+        fixes.append(Fix(
+            lat=lat_e6 / 1_000_000,
+            lng=lng_e6 / 1_000_000,
+            accuracy_m=None if accuracy == _UNKNOWN_U16 else float(accuracy),
+            speed_kmh=None if speed == _UNKNOWN_SPEED else speed / 10,
+            bearing=None if bearing == _UNKNOWN_U16 else bearing / 10,
+            timestamp=timestamp,
+        ))
+    return FixBatch(seq=seq, count=count, order_id=order_id, fixes=fixes)
+
+
+def split_frames(data: bytes) -> list[bytes]:
+    """Cut a body of back-to-back FIX_BATCH frames into frames, using each header's count."""
+    frames, offset = [], 0
+    while offset < len(data):
+        if len(data) - offset < HEADER.size:
+            raise ProtocolError("Trailing bytes shorter than a header.")
+        count = HEADER.unpack_from(data, offset)[2]
+        end = offset + HEADER.size + count * FIX.size
+        if count == 0 or end > len(data):
+            raise ProtocolError("Frame length does not match fix count.")
+        frames.append(data[offset:end])
+        offset = end
+    return frames
+
+
+def encode_batch(seq: int, fixes: list[Fix], order_id: Optional[uuid.UUID] = None) -> bytes:
+    """Build a FIX_BATCH frame (reference encoder for clients and tests)."""
+    base = min(f.timestamp for f in fixes)
+    base_ms = int(base.timestamp() * 1000)
+    order_bytes = order_id.bytes if order_id else bytes(16)
+    parts = [HEADER.pack(VERSION, FIX_BATCH, len(fixes), seq, base_ms, order_bytes)]
+    for f in fixes:
+        parts.append(FIX.pack(
+            int(f.timestamp.timestamp() * 1000) - base_ms,
+            round(f.lat * 1_000_000),
+            round(f.lng * 1_000_000),
+            _UNKNOWN_U16 if f.accuracy_m is None else min(round(f.accuracy_m), _UNKNOWN_U16 - 1),
+            _UNKNOWN_SPEED if f.speed_kmh is None else round(f.speed_kmh * 10),
+            _UNKNOWN_U16 if f.bearing is None else round(f.bearing * 10) % 3600,
+        ))
+    return b"".join(parts)
+
+
+def encode_ack(acked_seq: int, status: int = STATUS_OK) -> bytes:
+    return ACK_FRAME.pack(VERSION, ACK, status, acked_seq & 0xFFFFFFFF)
+
+
+def decode_ack(frame: bytes) -> tuple[int, int]:
+    """Return (status, acked_seq)."""
+    _, _, status, acked_seq = ACK_FRAME.unpack(frame)
+    return status, acked_seq
+
+
+def peek_seq(frame: bytes) -> int:
+    """Best-effort seq of a frame for error acks (0 if the header is unreadable)."""
+    if len(frame) < HEADER.size:
+        return 0
+    _, _, count, seq, _, _ = HEADER.unpack_from(frame)
+    return (seq + max(count, 1) - 1) & 0xFFFFFFFF
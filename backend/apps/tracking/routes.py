@@ -0,0 +1,265 @@
+"""
+MESS Platform — Actual Route Builder
+Grows OrderRoute.actual_route_* incrementally as pings are written.
+
+Each batch of fixes for an order is appended to the route under a row lock:
+the running distance is extended segment by segment, and the path is kept
+pre-simplified at several Douglas–Peucker tolerances (metres). Simplification
+is streaming: per level we keep the committed polyline plus the raw "tail" of
+fixes since its last anchor, and only that tail is re-simplified when new
+fixes arrive. A tail point is committed once the simplification keeps it as an
+interior vertex, so every committed segment is within tolerance of the raw
+fixes it replaces. The endpoint is always the latest fix.
+
+Fixes older than a route's last point (an offline backlog uploaded late)
+cannot be appended; backfill_routes rebuilds such routes from the stored pings.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from core.utils import EARTH_RADIUS_KM, haversine_distance
+
+logger = logging.getLogger(__name__)
+
+COORD_DECIMALS = 6
+ROUTE_FIELDS = [
+    "actual_route_levels", "actual_route_geojson", "actual_distance_km",
+    "actual_point_count", "last_point_at", "updated_at",
+]
+
+
+def simplify(points: list, tolerance_m: float) -> list[int]:
+    """
+    Douglas–Peucker over [lng, lat] points; returns the indices kept, in order.
+    Points are projected onto a local equirectangular plane in metres, which is
+    accurate enough at route scale.
+    """
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+
+    coords = np.asarray(points, dtype=np.float64)
+    scale = EARTH_RADIUS_KM * 1000 * np.pi / 180
+    x = coords[:, 0] * scale * np.cos(np.radians(coords[:, 1].mean()))
+    y = coords[:, 1] * scale
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        seg_len2 = dx * dx + dy * dy
+        if seg_len2 == 0:
+            dist = np.hypot(px, py)
+        else:
+            t = np.clip((px * dx + py * dy) / seg_len2, 0.0, 1.0)
+            dist = np.hypot(px - t * dx, py - t * dy)
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep).tolist()
+
+
+def _extend_level(level: dict, new_points: list, tolerance_m: float, max_tail: int) -> None:
+    points, tail = level.setdefault("points", []), level.setdefault("tail", [])
+    if not points:
+        points.append(new_points[0])
+        new_points = new_points[1:]
+    tail.extend(new_points)
+    if not tail:
+        return
+
+    chain = [points[-1]] + tail
+    kept = simplify(chain, tolerance_m)
+    interior = kept[1:-1]
+    if interior:
+        points.extend(chain[i] for i in interior)
+        tail[:] = chain[interior[-1] + 1:]
+    if len(tail) > max_tail:
+        # Nothing in the tail deviates from anchor→endpoint; pin the endpoint
+        points.append(tail[-1])
+        tail.clear()
+
+
+def level_line(level: dict) -> list:
+    points, tail = level.get("points", []), level.get("tail", [])
+    return points + tail[-1:]
+
+
+def _tolerances() -> list[int]:
+    return sorted(settings.TRACKING_ROUTES["TOLERANCES_M"])
+
+
+def pick_tolerance(requested: Optional[float] = None) -> int:
+    """The coarsest configured level not coarser than `requested` (default level if None)."""
+    tolerances = _tolerances()
+    if requested is None:
+        requested = settings.TRACKING_ROUTES["DEFAULT_TOLERANCE_M"]
+    eligible = [t for t in tolerances if t <= requested]
+    return eligible[-1] if eligible else tolerances[0]
+
+
+def route_line(route, tolerance_m: Optional[float] = None, zoom: Optional[float] = None) -> Optional[dict]:
+    """
+    GeoJSON LineString of the driven path at the given simplification level,
+    or at about one pixel of the given web-map zoom level.
+    """
+    if tolerance_m is None and zoom is not None:
+        from .lod import tolerance_for_zoom
+        coords = (route.actual_route_geojson or {}).get("coordinates") or [[0.0, 0.0]]
+        tolerance_m = tolerance_for_zoom(zoom, coords[-1][1])
+    level = (route.actual_route_levels or {}).get(str(pick_tolerance(tolerance_m)))
+    if not level:
+        return route.actual_route_geojson
+    return {"type": "LineString", "coordinates": level_line(level)}
+
+
+def append_fixes(route, fixes: list) -> int:
+    """
+    Append time-ordered fixes [(lng, lat, timestamp), ...] to a locked route.
+    Fixes not newer than the last one applied are ignored (replays, late batches).
+    Returns the number of fixes applied; the caller saves the route.
+    """
+    if route.last_point_at is not None:
+        fixes = [f for f in fixes if f[2] > route.last_point_at]
+    if not fixes:
+        return 0
+
+    levels = route.actual_route_levels or {}
+    new_points = [[round(lng, COORD_DECIMALS), round(lat, COORD_DECIMALS)] for lng, lat, _ in fixes]
+
+    previous = None
+    if levels:
+        any_level = next(iter(levels.values()))
+        previous = level_line(any_level)[-1]
+    distance_km = 0.0
+    for point in new_points:
+        if previous is not None:
+            distance_km += haversine_distance(previous[1], previous[0], point[1], point[0])
+        previous = point
+
+    max_tail = settings.TRACKING_ROUTES["MAX_TAIL_POINTS"]
+    for tolerance in _tolerances():
+        level = levels.setdefault(str(tolerance), {})
+        _extend_level(level, new_points, tolerance, max_tail)
+
+    route.actual_route_levels = levels
+    route.actual_route_geojson = {
+        "type": "LineString",
+        "coordinates": level_line(levels[str(_tolerances()[0])]),
+    }
+    total_km = float(route.actual_distance_km or 0) + distance_km
+    route.actual_distance_km = Decimal(f"{total_km:.2f}")
+    route.actual_point_count += len(fixes)
+    route.last_point_at = fixes[-1][2]
+    return len(fixes)
+
+
+def extend_routes(records: Iterable) -> int:
+    """
+    Extend the actual routes of every order referenced by `records`
+    (ingest PingRecords). One locked read-modify-write per order.
+    Returns the number of routes extended.
+    """
+    from .models import OrderRoute
+
+    by_order = defaultdict(list)
+    for r in records:
+        if r.order_id:
+            by_order[r.order_id].append((float(r.lng), float(r.lat), r.timestamp))
+
+    applied = 0
+    for order_id, fixes in by_order.items():
+        fixes.sort(key=lambda f: f[2])
+        with transaction.atomic():
+            route, _ = OrderRoute.objects.select_for_update().get_or_create(order_id=order_id)
+            if append_fixes(route, fixes):
+                applied += 1
+                route.save(update_fields=ROUTE_FIELDS)
+    return applied
+
+
+def _reset(route) -> None:
+    route.actual_route_levels = {}
+    route.actual_route_geojson = None
+    route.actual_distance_km = None
+    route.actual_point_count = 0
+    route.last_point_at = None
+
+
+def rebuild_route(route) -> int:
+    """
+    Rebuild a locked route's actual path and distance from all of its order's
+    stored pings, oldest first, in chunks. The caller saves the route.
+    Uploaded backlogs carry device timestamps, which are not bounded by the
+    order's lifetime, so every ping of the order is read (via its
+    (order, timestamp) index).
+    """
+    from .models import GPSPing
+
+    _reset(route)
+    chunk_size = settings.TRACKING_ROUTES["REBUILD_CHUNK_SIZE"]
+    rows = (
+        GPSPing.objects.filter(order_id=route.order_id)
+        .order_by("timestamp")
+        .values_list("lng_e6", "lat_e6", "timestamp")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    applied, chunk = 0, []
+    for lng_e6, lat_e6, timestamp in rows:
+        chunk.append((lng_e6 / GPSPing.COORD_SCALE, lat_e6 / GPSPing.COORD_SCALE, timestamp))
+        if len(chunk) >= chunk_size:
+            applied += append_fixes(route, chunk)
+            chunk = []
+    if chunk:
+        applied += append_fixes(route, chunk)
+    return applied
+
+
+def backfill_routes(records: Iterable) -> int:
+    """
+    Like extend_routes, for fixes that may predate what the routes already
+    hold: a route whose last point is not older than its oldest new fix is
+    rebuilt from the stored pings (which must already include `records`).
+    Returns the number of routes changed.
+    """
+    from .models import OrderRoute
+
+    oldest = {}
+    for r in records:
+        if r.order_id and (r.order_id not in oldest or r.timestamp < oldest[r.order_id]):
+            oldest[r.order_id] = r.timestamp
+    if not oldest:
+        return 0
+
+    last_points = dict(
+        OrderRoute.objects.filter(order_id__in=oldest.keys(), last_point_at__isnull=False)
+        .values_list("order_id", "last_point_at")
+    )
+    late = {
+        order_id for order_id, ts in oldest.items()
+        if order_id in last_points and ts <= last_points[order_id]
+    }
+
+    changed = extend_routes([r for r in records if r.order_id in oldest and r.order_id not in late])
+    for order_id in late:
+        with transaction.atomic():
+            route = OrderRoute.objects.select_for_update().get(order_id=order_id)
+            rebuild_route(route)
+            route.save(update_fields=ROUTE_FIELDS)
+            changed += 1
+    return changed
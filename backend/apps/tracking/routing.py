@@ -1,8 +1,16 @@
 """Tracking WebSocket URL routing."""
 from django.urls import re_path
-from .consumers import DriverLocationConsumer, OrderTrackingConsumer
+from .consumers import (
+    CarrierDispatchConsumer,
+    DriverLocationConsumer,
+    FleetMapConsumer,
+    OrderTrackingConsumer,
+)
 
 websocket_urlpatterns = [
     re_path(r"ws/tracking/driver/$", DriverLocationConsumer.as_asgi()),
     re_path(r"ws/tracking/order/(?P<order_id>[0-9a-f-]+)/$", OrderTrackingConsumer.as_asgi()),
+    re_path(r"ws/tracking/fleet/$", FleetMapConsumer.as_asgi()),
+    re_path(r"ws/tracking/carrier/$", CarrierDispatchConsumer.as_asgi()),
+    re_path(r"ws/tracking/carrier/(?P<carrier_id>[0-9a-f-]+)/$", CarrierDispatchConsumer.as_asgi()),
 ]
@@ -1,9 +1,19 @@
 """Tracking Serializers"""
 from rest_framework import serializers
-from .models import GPSPing, OrderRoute
+from .models import GeofenceEvent, GPSPing, OrderRoute
 
 
 class GPSPingSerializer(serializers.ModelSerializer):
+    # Pings are keyed by a BIGINT identity since 0003_compact_gpsping: `id` is an
+    # integer, unique only within the ping table, no longer a UUID
+    id = serializers.IntegerField(read_only=True)
+    # Columns are fixed-point integers; expose the same decimal format as before
+    lat = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
+    lng = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
+    accuracy_m = serializers.DecimalField(max_digits=6, decimal_places=2, read_only=True)
+    speed_kmh = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    bearing = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+
     class Meta:
         model = GPSPing
         fields = ["id", "lat", "lng", "accuracy_m", "speed_kmh", "bearing", "timestamp"]
@@ -11,10 +21,25 @@ class GPSPingSerializer(serializers.ModelSerializer):
 
 
 class OrderRouteSerializer(serializers.ModelSerializer):
+    # Simplified at context["tolerance_m"] or context["zoom"] (default level otherwise)
+    actual_route_geojson = serializers.SerializerMethodField()
+
     class Meta:
         model = OrderRoute
         fields = [
             "id", "order", "planned_route_geojson", "actual_route_geojson",
             "planned_distance_km", "planned_duration_minutes", "actual_distance_km",
+            "actual_point_count", "last_point_at",
         ]
-        read_only_fields = ["id", "order"]
+        read_only_fields = ["id", "order", "actual_point_count", "last_point_at"]
+
+    def get_actual_route_geojson(self, obj):
+        from .routes import route_line
+        return route_line(obj, self.context.get("tolerance_m"), self.context.get("zoom"))
+
+
+class GeofenceEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GeofenceEvent
+        fields = ["id", "order", "driver", "zone", "event", "lat", "lng", "occurred_at", "dwell_seconds"]
+        read_only_fields = fields
@@ -0,0 +1,45 @@
+"""
+MESS Platform — Tracking Signals
+Keep the geofence zone cache and carrier dispatch boards in step with
+drivers' assignments.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_zones(driver_id):
+    from . import geofence
+    try:
+        geofence.invalidate(driver_id)
+    except Exception as exc:
+        logger.warning("Could not invalidate geofences of driver %s: %s", driver_id, exc)
+
+
+def _update_board(order_id):
+    from . import board
+    transaction.on_commit(lambda: board.order_changed(order_id))
+
+
+@receiver(post_save, sender="orders.OrderAssignment")
+def reset_zones_on_assignment(sender, instance, created, **kwargs):
+    if created:
+        _invalidate_zones(instance.driver_id)
+        _update_board(instance.order_id)
+
+
+@receiver(post_save, sender="orders.FreightOrder")
+def reset_zones_on_status_change(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None and "status" not in update_fields):
+        return
+    from apps.orders.models import OrderAssignment
+    driver_id = (
+        OrderAssignment.objects.filter(order_id=instance.id).values_list("driver_id", flat=True).first()
+    )
+    if driver_id:
+        _invalidate_zones(driver_id)
+        _update_board(instance.id)
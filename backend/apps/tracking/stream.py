@@ -0,0 +1,213 @@
+"""
+MESS Platform — GPS Ping Stream
+Durable hand-off from the WebSocket workers to the database writers.
+
+With TRACKING_INGEST["MODE"] = "stream", each worker's PingBuffer flushes a
+batch as one pipelined XADD to the Redis Stream mess:tracking:pings instead
+of writing to Postgres, so a slow or locked database never stalls connected
+drivers. `manage.py tracking_stream_writer` processes (any number of them,
+sharing the consumer group "ping-writers") read the stream in large batches,
+persist them with ingest.write_ping_batch — GPSPing rows, profiles or live
+positions, routes, ETAs, geofences — and XACK the entries.
+
+Delivery is at-least-once. A writer that crashes leaves its entries pending;
+on restart it re-reads them, and entries idle for CLAIM_IDLE_MS are claimed by
+another writer. Replayed entries are checked against stored pings on
+(driver, timestamp) first so they are not written twice. When the stream is
+unreachable a worker writes its batch directly instead.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+
+from core.redis import get_redis, redis_key
+from .ingest import PingRecord, write_ping_batch
+
+logger = logging.getLogger(__name__)
+
+STREAM = ("tracking", "pings")
+GROUP = "ping-writers"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _key() -> str:
+    return redis_key(*STREAM)
+
+
+def _str(value) -> str:
+    return "" if value is None else str(value)
+
+
+def encode(record: PingRecord) -> dict:
+    """Stream entry fields for a ping; the timestamp in integer microseconds."""
+    return {
+        "d": str(record.driver_id),
+        "o": _str(record.order_id),
+        "lat": record.lat,
+        "lng": record.lng,
+        "acc": _str(record.accuracy_m),
+        "spd": _str(record.speed_kmh),
+        "brg": _str(record.bearing),
+        "t": (record.timestamp - _EPOCH) // timedelta(microseconds=1),
+    }
+
+
+def decode(fields: dict) -> PingRecord:
+    """Inverse of encode; raises ValueError/KeyError for a malformed entry."""
+    f = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+         for k, v in fields.items()}
+
+    def optional(name):
+        return float(f[name]) if f.get(name) else None
+
+    return PingRecord(
+        driver_id=uuid.UUID(f["d"]),
+        order_id=uuid.UUID(f["o"]) if f.get("o") else None,
+        lat=float(f["lat"]),
+        lng=float(f["lng"]),
+        accuracy_m=optional("acc"),
+        speed_kmh=optional("spd"),
+        bearing=optional("brg"),
+        timestamp=_EPOCH + timedelta(microseconds=int(f["t"])),
+    )
+
+
+def append(records: list[PingRecord]) -> int:
+    """Append pings to the stream in one pipeline, trimming it to about MAXLEN entries."""
+    if not records:
+        return 0
+    maxlen = settings.TRACKING_STREAM["MAXLEN"]
+    pipe = get_redis().pipeline(transaction=False)
+    for record in records:
+        pipe.xadd(_key(), encode(record), maxlen=maxlen, approximate=True)
+    pipe.execute()
+    return len(records)
+
+
+def append_or_write(records: list[PingRecord]) -> int:
+    """PingBuffer writer in stream mode: append, or write to Postgres if Redis is unreachable."""
+    try:
+        return append(records)
+    except Exception as exc:
+        logger.warning("Ping stream unavailable, writing %d pings directly: %s", len(records), exc)
+        return write_ping_batch(records)
+
+
+def ensure_group() -> None:
+    """Create the stream and the writers' consumer group if missing."""
+    try:
+        get_redis().xgroup_create(_key(), GROUP, id="0", mkstream=True)
+    except Exception as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def drop_stored(records: list[PingRecord]) -> list[PingRecord]:
+    """Records not already stored, matched on (driver, timestamp); one query."""
+    from .models import GPSPing
+
+    if not records:
+        return records
+    timestamps = [r.timestamp for r in records]
+    stored = set(
+        GPSPing.objects.filter(
+            driver_id__in={r.driver_id for r in records},
+            timestamp__gte=min(timestamps),
+            timestamp__lte=max(timestamps),
+        ).values_list("driver_id", "timestamp")
+    )
+    return [r for r in records if (r.driver_id, r.timestamp) not in stored]
+
+
+class StreamWriter:
+    """
+    One member of the ping-writers consumer group. Call run_once() in a loop;
+    each call handles at most one batch and returns the number of entries acked.
+    """
+
+    def __init__(self, consumer: Optional[str] = None, batch_size: Optional[int] = None, writer=None):
+        conf = settings.TRACKING_STREAM
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size or conf["BATCH_SIZE"]
+        self.block_ms = conf["BLOCK_MS"]
+        self.claim_idle_ms = conf["CLAIM_IDLE_MS"]
+        self._writer = writer or write_ping_batch
+        # Start by re-reading whatever this consumer left pending before a restart
+        self._recovering = True
+        self._next_claim = 0.0
+        self.stats = {"read": 0, "written": 0, "skipped": 0, "failed": 0}
+
+    def run_once(self) -> int:
+        r = get_redis()
+        if self._recovering:
+            entries = self._read(r, "0", block=None)
+            if entries:
+                return self._process(r, entries, replayed=True)
+            self._recovering = False
+
+        if time.monotonic() >= self._next_claim:
+            self._next_claim = time.monotonic() + self.claim_idle_ms / 2000
+            claimed = r.xautoclaim(
+                _key(), GROUP, self.consumer, self.claim_idle_ms, "0-0", count=self.batch_size,
+            )
+            if claimed and claimed[1]:
+                logger.info(f"Writer {self.consumer} took over {len(claimed[1])} idle ping stream entries.")
+                return self._process(r, claimed[1], replayed=True)
+
+        entries = self._read(r, ">", block=self.block_ms)
+        return self._process(r, entries, replayed=False) if entries else 0
+
+    def _read(self, r, start: str, block: Optional[int]) -> list:
+        response = r.xreadgroup(GROUP, self.consumer, {_key(): start}, count=self.batch_size, block=block)
+        return response[0][1] if response else []
+
+    def _process(self, r, entries: list, replayed: bool) -> int:
+        ids, records = [], []
+        for entry_id, fields in entries:
+            ids.append(entry_id)
+            if not fields:
+                # Trimmed from the stream before it was written
+                self.stats["skipped"] += 1
+                continue
+            try:
+                records.append(decode(fields))
+            except (KeyError, ValueError) as exc:
+                self.stats["skipped"] += 1
+                logger.warning(f"Skipping malformed ping stream entry {entry_id!r}: {exc}")
+        self.stats["read"] += len(entries)
+
+        if replayed:
+            records = drop_stored(records)
+        try:
+            written = self._writer(records) if records else 0
+        except Exception:
+            # Left pending: re-read by this writer next time or claimed by another
+            self.stats["failed"] += len(records)
+            self._recovering = True
+            raise
+        self.stats["written"] += written
+        r.xack(_key(), GROUP, *ids)
+        return len(ids)
+
+
+def info() -> dict:
+    """Stream length and the writers' backlog, for monitoring."""
+    r = get_redis()
+    groups = {
+        g["name"].decode() if isinstance(g["name"], bytes) else g["name"]: g
+        for g in r.xinfo_groups(_key())
+    }
+    group = groups.get(GROUP, {})
+    return {
+        "length": r.xlen(_key()),
+        "pending": group.get("pending", 0),
+        "lag": group.get("lag"),
+        "consumers": group.get("consumers", 0),
+    }
@@ -0,0 +1,55 @@
+"""Tracking Celery Tasks"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="apps.tracking.tasks.snapshot_driver_locations")
+def snapshot_driver_locations():
+    """
+    Copy live driver positions from Redis to DriverProfile.
+    Only drivers that moved since the previous snapshot are written,
+    in batches of one UPDATE each.
+    """
+    from . import live
+    from .ingest import update_profile_locations
+
+    if not live.is_enabled():
+        return 0
+
+    batch_size = settings.TRACKING_LIVE_LOCATIONS["SNAPSHOT_BATCH_SIZE"]
+    total = 0
+    while True:
+        positions = live.pop_dirty_positions(batch_size)
+        if not positions:
+            break
+        update_profile_locations(positions)
+        total += len(positions)
+        if len(positions) < batch_size:
+            break
+    logger.info(f"Snapshotted {total} driver locations.")
+    return total
+
+
+@shared_task(name="apps.tracking.tasks.maintain_gpsping_partitions")
+def maintain_gpsping_partitions():
+    """Pre-create upcoming weekly GPS ping partitions and expire old ones."""
+    from . import partitions
+
+    created = partitions.ensure_partitions()
+    expired = partitions.expire_partitions()
+    return {"created": created, "expired": expired}
+
+
+@shared_task(name="apps.tracking.tasks.sweep_driver_presence")
+def sweep_driver_presence():
+    """Mark drivers who stopped pinging and heartbeating offline."""
+    from . import presence
+
+    swept = presence.sweep()
+    if swept:
+        logger.info(f"Marked {swept} silent drivers offline.")
+    return swept
@@ -0,0 +1,76 @@
+"""
+Tests for the carrier dispatch board.
+"""
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+import pytest
+
+from apps.tracking import board
+from apps.tracking.live import LivePosition
+
+TS = datetime(2026, 10, 18, 8, 0, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def carrier(db, driver):
+    from apps.accounts.models import CarrierProfile, User
+    user = User.objects.create_user(
+        phone_number="+221775550100", password="pass", first_name="Transports", last_name="Ndiaye",
+        role="CARRIER",
+    )
+    profile = CarrierProfile.objects.create(user=user, legal_company_name="Transports Ndiaye SARL")
+    driver.driver_profile.employer = profile
+    driver.driver_profile.save(update_fields=["employer"])
+    return profile
+
+
+@pytest.mark.django_db
+class TestBuildBoard:
+    def test_snapshot_has_positions_orders_and_etas(self, carrier, driver, accepted_order):
+        position = LivePosition(str(driver.id), 14.70, -17.40, TS, 55.0, 90.0)
+        eta = {"to_delivery_minutes": 42, "to_pickup_minutes": 5}
+        with patch("apps.tracking.live.get_positions", return_value={str(driver.id): position}), \
+                patch("apps.tracking.eta.get_etas", return_value={str(accepted_order.id): eta}), \
+                patch("apps.tracking.presence.filter_online", return_value=[str(driver.id)]):
+            snapshot = board.build_board(carrier.id)
+
+        assert snapshot["type"] == "board_snapshot"
+        (entry,) = snapshot["drivers"]
+        assert entry["driver_id"] == str(driver.id)
+        assert entry["online"] is True
+        assert entry["p"] == [14.70, -17.40, 55.0, 90.0, TS.timestamp()]
+        assert entry["orders"] == [{
+            "order_id": str(accepted_order.id),
+            "reference": accepted_order.reference,
+            "status": accepted_order.status,
+            "eta": eta,
+        }]
+
+    def test_board_survives_redis_outage(self, carrier, driver):
+        with patch("apps.tracking.live.get_positions", side_effect=ConnectionError):
+            snapshot = board.build_board(carrier.id)
+        (entry,) = snapshot["drivers"]
+        assert entry["p"] is None
+        assert entry["online"] is False
+
+
+@pytest.mark.django_db
+class TestOrderChanged:
+    def test_status_change_is_sent_to_employer(self, carrier, driver, accepted_order):
+        with patch("apps.tracking.board.send") as send:
+            board.order_changed(accepted_order.id)
+        carrier_id, delta = send.call_args.args
+        assert carrier_id == carrier.id
+        assert delta == {
+            "type": "order",
+            "order_id": str(accepted_order.id),
+            "driver_id": str(driver.id),
+            "reference": accepted_order.reference,
+            "status": accepted_order.status,
+        }
+
+    def test_freelance_drivers_have_no_board(self, driver, accepted_order):
+        with patch("apps.tracking.board.send") as send:
+            board.order_changed(accepted_order.id)
+        send.assert_not_called()
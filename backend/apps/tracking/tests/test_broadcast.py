@@ -0,0 +1,155 @@
+"""
+Tests for the coalesced order tracking broadcaster.
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from apps.tracking import broadcast
+from apps.tracking.broadcast import BroadcastCoalescer
+
+
+def _coalescer(sent, watched=True, rate_hz=20.0):
+    async def sender(group, message):
+        sent.append((group, message))
+
+    return BroadcastCoalescer(
+        max_rate_hz=rate_hz,
+        watcher_cache_seconds=60,
+        sender=sender,
+        watchers=lambda order_id: 1 if watched else 0,
+    )
+
+
+class FakeWatcherRedis:
+    """The counter commands add/refresh/remove_watcher use, with TTLs only recorded."""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    def decr(self, key):
+        self.values[key] = self.values.get(key, 0) - 1
+        return self.values[key]
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def expire(self, key, seconds):
+        if key not in self.values:
+            return False
+        self.ttls[key] = seconds
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+    def pipeline(self):
+        fake = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args: self.calls.append((name, args))
+
+            def execute(self):
+                return [getattr(fake, name)(*args) for name, args in self.calls]
+
+        return Pipeline()
+
+
+class TestWatchers:
+    def test_refresh_extends_the_ttl(self):
+        redis = FakeWatcherRedis()
+        with patch("apps.tracking.broadcast.get_redis", return_value=redis):
+            broadcast.add_watcher("o1")
+            redis.ttls.clear()
+            broadcast.refresh_watcher("o1")
+            assert redis.ttls[broadcast.watchers_key("o1")] == broadcast.WATCHERS_TTL_SECONDS
+            assert broadcast.watcher_count("o1") == 1
+
+    def test_watcher_is_recounted_after_the_key_expired(self):
+        redis = FakeWatcherRedis()
+        with patch("apps.tracking.broadcast.get_redis", return_value=redis):
+            broadcast.add_watcher("o1")
+            redis.delete(broadcast.watchers_key("o1"))  # The TTL ran out
+            assert broadcast.watcher_count("o1") == 0
+
+            broadcast.refresh_watcher("o1")
+            assert broadcast.watcher_count("o1") == 1
+            broadcast.remove_watcher("o1")
+            assert broadcast.watcher_count("o1") == 0
+
+    async def test_connected_consumer_keeps_refreshing(self):
+        from apps.tracking.consumers import OrderTrackingConsumer
+        consumer = OrderTrackingConsumer()
+        consumer._refresh_watcher = AsyncMock()
+        with patch("apps.tracking.broadcast.WATCHERS_REFRESH_SECONDS", 0.01):
+            task = asyncio.ensure_future(consumer._keep_watching())
+            await asyncio.sleep(0.05)
+            task.cancel()
+        assert consumer._refresh_watcher.await_count >= 2
+
+
+class TestBroadcastCoalescer:
+    async def test_first_update_is_sent_immediately(self):
+        sent = []
+        coalescer = _coalescer(sent)
+        await coalescer.publish("o1", {"n": 1})
+        assert sent == [("order_tracking_o1", {"n": 1})]
+
+    async def test_burst_is_coalesced_to_latest(self):
+        sent = []
+        coalescer = _coalescer(sent, rate_hz=20.0)  # 50 ms window
+        for n in range(1, 6):
+            await coalescer.publish("o1", {"n": n})
+        assert [m["n"] for _, m in sent] == [1]
+
+        await asyncio.sleep(0.1)
+        assert [m["n"] for _, m in sent] == [1, 5]
+        assert coalescer.stats["coalesced"] == 3
+        assert coalescer.stats["sent"] == 2
+
+    async def test_groups_are_rate_limited_independently(self):
+        sent = []
+        coalescer = _coalescer(sent, rate_hz=1.0)
+        await coalescer.publish("o1", {"n": 1})
+        await coalescer.publish("o2", {"n": 1})
+        assert {g for g, _ in sent} == {"order_tracking_o1", "order_tracking_o2"}
+
+    async def test_unwatched_groups_are_skipped(self):
+        sent = []
+        coalescer = _coalescer(sent, watched=False)
+        await coalescer.publish("o1", {"n": 1})
+        assert sent == []
+        assert coalescer.stats["unwatched"] == 1
+
+    async def test_stats_are_logged_and_reset_each_period(self, caplog):
+        sent = []
+        coalescer = _coalescer(sent, watched=False)
+        coalescer.stats_log_seconds = 0.05
+        await coalescer.publish("o1", {"n": 1})
+        await asyncio.sleep(0.1)
+        with caplog.at_level("INFO", logger="apps.tracking.broadcast"):
+            await coalescer.publish("o1", {"n": 2})
+        assert "'received': 1" in caplog.text and "'unwatched': 1" in caplog.text
+        assert coalescer.stats["received"] == 1
+
+    async def test_watcher_lookup_failure_fails_open(self):
+        sent = []
+
+        async def sender(group, message):
+            sent.append(message)
+
+        def broken(order_id):
+            raise ConnectionError
+
+        coalescer = BroadcastCoalescer(sender=sender, watchers=broken)
+        await coalescer.publish("o1", {"n": 1})
+        assert sent == [{"n": 1}]
@@ -0,0 +1,65 @@
+"""
+Tests for the live ETA engine.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+import pytest
+
+from apps.tracking.eta import advance_speed, estimate
+
+NOW = datetime(2026, 10, 18, 8, 0, tzinfo=dt_timezone.utc)
+# Dakar → Thiès
+ORDER = {
+    "id": "o1",
+    "status": "IN_TRANSIT",
+    "pickup_lat": 14.6928, "pickup_lng": -17.4467,
+    "delivery_lat": 14.7877, "delivery_lng": -16.9246,
+}
+
+
+class TestEstimate:
+    def test_delivery_phase_uses_remaining_distance(self):
+        eta = estimate(ORDER, 14.6928, -17.4467, 60.0, NOW)
+        assert eta["to_pickup_minutes"] is None
+        # ~57 km great-circle × 1.3 road factor at 60 km/h
+        assert eta["to_delivery_km"] == pytest.approx(74.4, abs=1)
+        assert eta["to_delivery_minutes"] == pytest.approx(74, abs=1)
+
+    def test_pickup_phase_adds_dwell_and_full_leg(self, settings):
+        order = {**ORDER, "status": "PICKUP_PENDING"}
+        eta = estimate(order, 14.6928, -17.4467, 60.0, NOW)
+        assert eta["to_pickup_minutes"] == 0
+        dwell = settings.TRACKING_ETA["PICKUP_DWELL_MINUTES"]
+        assert eta["to_delivery_minutes"] == pytest.approx(74 + dwell, abs=1)
+
+    def test_stationary_truck_uses_minimum_speed(self, settings):
+        eta = estimate(ORDER, 14.6928, -17.4467, 0.0, NOW)
+        min_speed = settings.TRACKING_ETA["MIN_SPEED_KMH"]
+        assert eta["to_delivery_minutes"] == pytest.approx(74.4 / min_speed * 60, rel=0.02)
+
+    def test_inactive_status_has_no_eta(self):
+        assert estimate({**ORDER, "status": "POSTED"}, 14.69, -17.44, 50.0, NOW) is None
+
+
+class TestAdvanceSpeed:
+    def test_first_sample_is_taken_as_is(self):
+        prev = {"lat": 14.69, "lng": -17.44, "ts": NOW.isoformat()}
+        # ~0.55 km in 60 s ≈ 33 km/h
+        speed = advance_speed(None, prev, 14.69, -17.4349, NOW + timedelta(seconds=60))
+        assert speed == pytest.approx(33, abs=1)
+
+    def test_ewma_moves_towards_observed_speed(self):
+        prev = {"lat": 14.69, "lng": -17.44, "ts": NOW.isoformat()}
+        speed = advance_speed(80.0, prev, 14.69, -17.44, NOW + timedelta(seconds=60))
+        assert 70 < speed < 80
+
+
+@pytest.mark.django_db
+class TestOrderDetailEta:
+    def test_eta_is_exposed_for_active_orders(self, shipper_client, accepted_order):
+        cached = {"to_delivery_minutes": 42, "delivery_eta": NOW.isoformat()}
+        with patch("apps.tracking.eta.get_eta", return_value=cached):
+            resp = shipper_client.get(f"/api/v1/orders/{accepted_order.id}/")
+        assert resp.status_code == 200
+        assert resp.json()["eta"] == cached
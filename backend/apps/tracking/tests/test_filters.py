@@ -0,0 +1,81 @@
+"""
+Tests for the GPS ingest noise filter.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from apps.tracking import filters
+from apps.tracking.filters import PingFilter
+from apps.tracking.ingest import PingRecord
+
+CONFIG = {
+    "ENABLED": True,
+    "MIN_DISTANCE_M": 15,
+    "MAX_SILENCE_SECONDS": 120,
+    "MAX_SPEED_KMH": 180,
+    "MAX_ACCURACY_M": 150,
+    "MAX_CONSECUTIVE_JUMPS": 3,
+}
+T0 = datetime(2026, 10, 18, 8, 0, tzinfo=dt_timezone.utc)
+DRIVER = uuid.uuid4()
+
+
+def _fix(seconds, lat=14.6928, lng=-17.4467, accuracy_m=5.0, order_id=None):
+    return PingRecord(
+        driver_id=DRIVER, order_id=order_id, lat=lat, lng=lng, accuracy_m=accuracy_m,
+        speed_kmh=None, bearing=None, timestamp=T0 + timedelta(seconds=seconds),
+    )
+
+
+class TestPingFilter:
+    def test_parked_truck_keeps_one_fix_per_silence_interval(self):
+        ping_filter = PingFilter(CONFIG)
+        # Six hours at the port, a fix every 5 s jittering by a few metres
+        fixes = [_fix(i * 5, lat=14.6928 + (i % 3) * 0.00003) for i in range(6 * 720)]
+        kept = ping_filter.filter(fixes)
+        assert len(kept) == 6 * 30  # the first fix, then one heartbeat every 120 s
+        assert kept[0] == fixes[0]
+
+    def test_moving_truck_is_kept(self):
+        ping_filter = PingFilter(CONFIG)
+        # ~55 m every 5 s ≈ 40 km/h
+        fixes = [_fix(i * 5, lng=-17.4467 + i * 0.0005) for i in range(20)]
+        assert ping_filter.filter(fixes) == fixes
+
+    def test_noise_radius_grows_with_reported_accuracy(self):
+        ping_filter = PingFilter(CONFIG)
+        assert ping_filter.accept(_fix(0, accuracy_m=60))
+        # ~44 m away, within the 60 m accuracy circle
+        assert ping_filter.check(_fix(5, lat=14.6932, accuracy_m=60)) == filters.STATIONARY
+
+    def test_impossible_jump_is_rejected_until_it_persists(self):
+        ping_filter = PingFilter(CONFIG)
+        assert ping_filter.accept(_fix(0))
+        # Saint-Louis, ~180 km away, 10 s later
+        assert not ping_filter.accept(_fix(10, lat=16.0178, lng=-16.4896))
+        assert not ping_filter.accept(_fix(15, lat=16.0178, lng=-16.4896))
+        assert ping_filter.accept(_fix(20, lat=16.0178, lng=-16.4896))
+
+    def test_inaccurate_and_stale_fixes_are_dropped(self):
+        ping_filter = PingFilter(CONFIG)
+        assert ping_filter.accept(_fix(10))
+        assert ping_filter.check(_fix(20, accuracy_m=500)) == filters.INACCURATE
+        assert ping_filter.check(_fix(5, lng=-17.44)) == filters.STALE
+
+    def test_order_change_is_always_kept(self):
+        ping_filter = PingFilter(CONFIG)
+        assert ping_filter.accept(_fix(0))
+        assert ping_filter.accept(_fix(1, order_id=uuid.uuid4()))
+
+    def test_disabled_filter_keeps_everything(self):
+        ping_filter = PingFilter({**CONFIG, "ENABLED": False})
+        fixes = [_fix(i) for i in range(5)]
+        assert ping_filter.filter(fixes) == fixes
+
+    def test_report_logs_the_stream_counts(self, caplog):
+        ping_filter = PingFilter(CONFIG)
+        ping_filter.filter([_fix(0), _fix(5), _fix(10, accuracy_m=500)])
+        with caplog.at_level("INFO", logger="apps.tracking.filters"):
+            ping_filter.report(DRIVER)
+        assert ping_filter.counts == {filters.ACCEPTED: 1, filters.STATIONARY: 1, filters.INACCURATE: 1}
+        assert f"Ping filter for driver {DRIVER}" in caplog.text
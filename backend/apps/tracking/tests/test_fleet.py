@@ -0,0 +1,60 @@
+"""
+Tests for fleet map tiling.
+"""
+import pytest
+
+from apps.tracking import fleet
+
+# Dakar port; roughly Dakar metro; roughly all of Senegal
+DAKAR = (14.6928, -17.4467)
+DAKAR_BBOX = (-17.55, 14.60, -17.20, 14.85)
+SENEGAL_BBOX = (-17.6, 12.3, -11.3, 16.7)
+
+
+class TestTiles:
+    def test_driver_publishes_to_one_tile_per_zoom(self, settings):
+        settings.TRACKING_FLEET_MAP = {**settings.TRACKING_FLEET_MAP, "TILE_ZOOMS": [6, 9, 12]}
+        assert fleet.driver_groups(*DAKAR) == {
+            "fleet_tile_6_28_29", "fleet_tile_9_231_234", "fleet_tile_12_1849_1878",
+        }
+
+    def test_city_viewport_uses_finest_zoom(self, settings):
+        settings.TRACKING_FLEET_MAP = {
+            **settings.TRACKING_FLEET_MAP, "TILE_ZOOMS": [6, 9, 12], "MAX_TILES": 64,
+        }
+        tileset = fleet.tiles_for_bbox(*DAKAR_BBOX)
+        assert tileset.zoom == 12
+        assert len(tileset.tiles) == 20
+        assert "fleet_tile_12_1849_1878" in tileset.groups
+
+    def test_country_viewport_falls_back_to_coarser_zoom(self, settings):
+        settings.TRACKING_FLEET_MAP = {
+            **settings.TRACKING_FLEET_MAP, "TILE_ZOOMS": [6, 9, 12], "MAX_TILES": 64,
+        }
+        tileset = fleet.tiles_for_bbox(*SENEGAL_BBOX)
+        assert tileset.zoom == 6
+        assert tileset.names() == ["6/28/28", "6/28/29", "6/29/28", "6/29/29"]
+
+    def test_oversized_or_inverted_boxes_are_rejected(self, settings):
+        settings.TRACKING_FLEET_MAP = {**settings.TRACKING_FLEET_MAP, "TILE_ZOOMS": [9], "MAX_TILES": 4}
+        with pytest.raises(ValueError):
+            fleet.tiles_for_bbox(*SENEGAL_BBOX)
+        with pytest.raises(ValueError):
+            fleet.tiles_for_bbox(-17.2, 14.6, -17.5, 14.8)
+
+    def test_parse_tiles(self, settings):
+        settings.TRACKING_FLEET_MAP = {
+            **settings.TRACKING_FLEET_MAP, "TILE_ZOOMS": [6, 9, 12], "MAX_TILES": 64,
+        }
+        assert fleet.parse_tiles(["9/231/234", "9/231/235"]).groups == {
+            "fleet_tile_9_231_234", "fleet_tile_9_231_235",
+        }
+        with pytest.raises(ValueError):
+            fleet.parse_tiles(["9/231/234", "12/1849/1878"])
+        with pytest.raises(ValueError):
+            fleet.parse_tiles(["nonsense"])
+
+    def test_tile_bounds_contain_the_point(self):
+        west, south, east, north = fleet.tile_bounds(12, 1849, 1878)
+        assert west <= DAKAR[1] <= east
+        assert south <= DAKAR[0] <= north
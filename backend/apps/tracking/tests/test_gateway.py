@@ -0,0 +1,158 @@
+"""
+Tests for the driver ingest gateway.
+"""
+import json
+import uuid
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.utils import timezone
+
+from apps.accounts.serializers import CustomTokenObtainPairSerializer
+from apps.tracking import gateway, protocol, stream
+
+
+def _access(user) -> str:
+    return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+
+def _fixes(n, **kwargs):
+    start = timezone.now() - timedelta(seconds=5 * n)
+    return [
+        protocol.Fix(lat=14.69, lng=-17.44 + i * 0.0005, accuracy_m=kwargs.get("accuracy_m", 5.0),
+                     speed_kmh=40.0, bearing=90.0, timestamp=start + timedelta(seconds=5 * i))
+        for i in range(n)
+    ]
+
+
+def _redis():
+    redis = MagicMock()
+    redis.zadd = AsyncMock()
+    redis.pipeline.return_value.execute = AsyncMock()
+    return redis
+
+
+@pytest.mark.django_db
+class TestVerifyToken:
+    def test_driver_access_token(self, driver):
+        claims = gateway.verify_token(_access(driver))
+        assert claims == gateway.DriverClaims(driver.id, driver.full_name)
+
+    def test_token_from_registration(self, api_client):
+        resp = api_client.post("/api/v1/auth/register/", {
+            "phone_number": "+221771111111", "first_name": "New", "last_name": "Driver", "role": "DRIVER",
+            "password": "securepass1", "password_confirm": "securepass1",
+        })
+        assert resp.status_code == 201
+        claims = gateway.verify_token(resp.json()["access"])
+        assert claims is not None
+        assert str(claims.driver_id) == resp.json()["user"]["id"]
+        assert claims.name == "New Driver"
+
+    def test_other_roles_and_refresh_tokens_are_rejected(self, driver, shipper):
+        assert gateway.verify_token(_access(shipper)) is None
+        assert gateway.verify_token(str(CustomTokenObtainPairSerializer.get_token(driver))) is None
+        assert gateway.verify_token("not-a-jwt") is None
+
+
+class TestDriverConnection:
+    @pytest.fixture
+    def connection(self):
+        claims = gateway.DriverClaims(uuid.uuid4(), "Moussa")
+        return gateway.DriverConnection(claims, _redis())
+
+    async def test_batch_is_queued_in_one_pipeline_and_acked(self, connection):
+        ack = await connection.handle_batch(protocol.encode_batch(7, _fixes(3)))
+
+        assert protocol.decode_ack(ack) == (protocol.STATUS_OK, 9)
+        pipe = connection.redis.pipeline.return_value
+        assert pipe.xadd.call_count == 3
+        key, fields = pipe.xadd.call_args.args
+        assert stream.decode(fields).driver_id == connection.claims.driver_id
+        pipe.zadd.assert_called_once()
+        pipe.execute.assert_awaited_once()
+
+    async def test_filtered_fixes_only_refresh_presence(self, connection):
+        await connection.handle_batch(protocol.encode_batch(1, _fixes(2, accuracy_m=5000.0)))
+        pipe = connection.redis.pipeline.return_value
+        pipe.xadd.assert_not_called()
+        pipe.zadd.assert_called_once()
+
+    async def test_redis_failure_is_not_saved(self, connection):
+        connection.redis.pipeline.return_value.execute.side_effect = ConnectionError
+        ack = await connection.handle_batch(protocol.encode_batch(4, _fixes(1)))
+        assert protocol.decode_ack(ack) == (protocol.STATUS_NOT_SAVED, 4)
+
+    async def test_malformed_frame(self, connection):
+        ack = await connection.handle_batch(b"\x01\x01")
+        assert protocol.decode_ack(ack)[0] == protocol.STATUS_MALFORMED
+
+    async def test_order_fix_goes_to_the_broadcaster(self, connection):
+        order_id = uuid.uuid4()
+        broadcaster = MagicMock(publish=AsyncMock())
+        with patch("apps.tracking.broadcast.get_broadcaster", return_value=broadcaster):
+            await connection.handle_batch(protocol.encode_batch(1, _fixes(2), order_id=order_id))
+        sent_order, message = broadcaster.publish.call_args.args
+        assert sent_order == order_id
+        assert message["type"] == "location_update"
+        assert message["driver_name"] == "Moussa"
+        # Same payload as the in-process consumer sends
+        assert set(message) == {
+            "type", "driver_id", "driver_name", "lat", "lng", "speed", "bearing", "timestamp",
+        }
+
+
+@pytest.mark.django_db
+class TestApplication:
+    async def _run(self, scope, messages):
+        sent = []
+        incoming = iter(messages)
+
+        async def receive():
+            return next(incoming)
+
+        async def send(message):
+            sent.append(message)
+
+        await gateway.application(scope, receive, send)
+        return sent
+
+    @pytest.fixture
+    def token(self, driver):
+        # Minted here, in the test's transaction: outstanding tokens reference the user row
+        return _access(driver)
+
+    async def test_missing_token_is_refused(self):
+        scope = {
+            "type": "websocket",
+            "path": gateway.PATH,
+            "query_string": b"",
+            "subprotocols": [protocol.SUBPROTOCOL],
+        }
+        sent = await self._run(scope, [{"type": "websocket.connect"}])
+        assert sent == [{"type": "websocket.close", "code": gateway.CLOSE_UNAUTHORIZED}]
+
+    async def test_session_acks_batches_and_expires_presence(self, driver, token):
+        scope = {
+            "type": "websocket",
+            "path": gateway.PATH,
+            "query_string": f"token={token}".encode(),
+            "subprotocols": [protocol.SUBPROTOCOL],
+        }
+        redis = _redis()
+        with patch("apps.tracking.gateway.get_async_redis", return_value=redis), \
+                patch("apps.tracking.gateway._carrier_id", AsyncMock(return_value=None)), \
+                patch("channels.layers.get_channel_layer", return_value=None):
+            sent = await self._run(scope, [
+                {"type": "websocket.connect"},
+                {"type": "websocket.receive", "bytes": protocol.encode_batch(1, _fixes(2))},
+                {"type": "websocket.receive", "text": json.dumps({"type": "heartbeat"})},
+                {"type": "websocket.disconnect", "code": 1000},
+            ])
+
+        assert sent[0] == {"type": "websocket.accept", "subprotocol": protocol.SUBPROTOCOL}
+        assert protocol.decode_ack(sent[1]["bytes"]) == (protocol.STATUS_OK, 2)
+        assert json.loads(sent[2]["text"]) == {"status": "ok"}
+        # Presence dropped to 0 on disconnect so the sweeper takes the driver offline
+        assert redis.zadd.await_args.args[1] == {str(driver.id): 0}
@@ -0,0 +1,91 @@
+"""
+Tests for pickup and delivery geofences.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+
+import pytest
+
+from apps.tracking.geofence import (
+    ARRIVED, DELIVERY, DEPARTED, PICKUP, Transition, Zone, evaluate, record_events, zones_for_order,
+)
+from apps.tracking.models import GeofenceEvent
+
+T0 = datetime(2026, 10, 18, 8, 0, tzinfo=dt_timezone.utc)
+CONF = {"PICKUP_RADIUS_M": 300, "DELIVERY_RADIUS_M": 300, "EXIT_FACTOR": 1.5}
+# Dakar port → Thiès
+PICKUP_POINT = (14.6928, -17.4467)
+DELIVERY_POINT = (14.7877, -16.9246)
+
+
+def fix(lat, lng, minutes):
+    return SimpleNamespace(lat=lat, lng=lng, timestamp=T0 + timedelta(minutes=minutes))
+
+
+class TestZones:
+    def test_bounding_box_covers_exit_radius(self):
+        zone = Zone.around("o1", PICKUP, 14.6928, -17.4467, 300, 1.5)
+        # 450 m north is on the box edge, 500 m is outside
+        assert zone.distance_m(14.6928 + 440 / 111_320, -17.4467) is not None
+        assert zone.distance_m(14.6928 + 500 / 111_320, -17.4467) is None
+
+    def test_orders_without_coordinates_get_no_zone(self):
+        zones = zones_for_order("o1", (None, None), DELIVERY_POINT, CONF)
+        assert [z.kind for z in zones] == [DELIVERY]
+
+
+class TestEvaluate:
+    def setup_method(self):
+        self.zones = zones_for_order("o1", PICKUP_POINT, DELIVERY_POINT, CONF)
+
+    def test_arrival_then_departure_with_dwell(self):
+        inside = {}
+        assert evaluate(self.zones, inside, fix(14.70, -17.43, 0), 1.5) == []
+
+        arrived = evaluate(self.zones, inside, fix(14.6930, -17.4465, 5), 1.5)
+        assert [(t.zone.kind, t.event) for t in arrived] == [(PICKUP, ARRIVED)]
+        assert "o1:PICKUP" in inside
+
+        departed = evaluate(self.zones, inside, fix(14.70, -17.43, 45), 1.5)
+        assert [(t.zone.kind, t.event) for t in departed] == [(PICKUP, DEPARTED)]
+        assert departed[0].dwell_seconds == 40 * 60
+        assert inside == {}
+
+    def test_jitter_at_the_edge_does_not_flap(self):
+        inside = {}
+        evaluate(self.zones, inside, fix(14.6928, -17.4467, 0), 1.5)
+        # ~390 m away: outside the radius but within the exit hysteresis
+        assert evaluate(self.zones, inside, fix(14.6928 + 390 / 111_320, -17.4467, 1), 1.5) == []
+        assert "o1:PICKUP" in inside
+
+
+@pytest.mark.django_db
+class TestGeofenceEvents:
+    def test_record_events_stores_dwell(self, accepted_order, driver):
+        zone = zones_for_order(accepted_order.id, PICKUP_POINT, DELIVERY_POINT, CONF)[0]
+        record_events([
+            (str(driver.id), Transition(zone, ARRIVED, 14.6930, -17.4465, T0)),
+            (str(driver.id), Transition(zone, DEPARTED, 14.70, -17.43, T0 + timedelta(minutes=40), 2400)),
+        ])
+        events = list(GeofenceEvent.objects.filter(order=accepted_order))
+        assert [(e.zone, e.event, e.dwell_seconds) for e in events] == [
+            (PICKUP, ARRIVED, None),
+            (PICKUP, DEPARTED, 2400),
+        ]
+
+    def test_shipper_lists_events(self, shipper_client, accepted_order, driver):
+        zone = zones_for_order(accepted_order.id, PICKUP_POINT, DELIVERY_POINT, CONF)[0]
+        record_events([(str(driver.id), Transition(zone, ARRIVED, 14.6930, -17.4465, T0))])
+        resp = shipper_client.get(f"/api/v1/tracking/orders/{accepted_order.id}/geofence-events/")
+        assert resp.status_code == 200
+        assert resp.data["results"][0]["event"] == ARRIVED
+
+    def test_outsiders_are_forbidden(self, api_client, accepted_order):
+        from apps.accounts.models import User
+        other = User.objects.create_user(
+            phone_number="+221775550009", password="pass", first_name="Other", last_name="Shipper",
+            role="SHIPPER",
+        )
+        api_client.force_authenticate(user=other)
+        resp = api_client.get(f"/api/v1/tracking/orders/{accepted_order.id}/geofence-events/")
+        assert resp.status_code == 403
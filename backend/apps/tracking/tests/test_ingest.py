@@ -0,0 +1,104 @@
+"""
+Tests for the batched GPS ingestion buffer.
+"""
+import asyncio
+import uuid
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from apps.tracking.ingest import PingBuffer, PingRecord, write_ping_batch
+from apps.tracking.models import GPSPing
+
+
+def _record(driver_id, order_id=None, lat=14.6928, lng=-17.4467, **kwargs):
+    return PingRecord(
+        driver_id=driver_id,
+        order_id=order_id,
+        lat=lat,
+        lng=lng,
+        accuracy_m=kwargs.get("accuracy_m"),
+        speed_kmh=kwargs.get("speed_kmh"),
+        bearing=kwargs.get("bearing"),
+        timestamp=kwargs.get("timestamp") or timezone.now(),
+    )
+
+
+@pytest.mark.django_db
+class TestWritePingBatch:
+    def test_inserts_all_pings(self, driver, posted_order):
+        records = [_record(driver.id, posted_order.id, lat=14.69 + i * 0.001) for i in range(5)]
+        assert write_ping_batch(records) == 5
+        assert GPSPing.objects.filter(driver=driver, order=posted_order).count() == 5
+
+    def test_updates_profile_to_latest_fix_without_live_store(self, driver, settings):
+        settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+        now = timezone.now()
+        write_ping_batch([
+            _record(driver.id, lat=14.80, timestamp=now),
+            _record(driver.id, lat=14.70, timestamp=now - timezone.timedelta(seconds=5)),
+        ])
+        profile = driver.driver_profile
+        profile.refresh_from_db()
+        assert float(profile.current_lat) == pytest.approx(14.80)
+        assert profile.last_location_update == now
+
+    def test_caches_latest_position_per_order(self, driver, posted_order):
+        now = timezone.now()
+        with patch("apps.tracking.live.update_order_positions") as cache:
+            write_ping_batch([
+                _record(driver.id, posted_order.id, lat=14.80, timestamp=now),
+                _record(driver.id, lat=14.70),
+            ])
+        (records,), _ = cache.call_args
+        assert [r.lat for r in records] == [14.80]
+
+    def test_unknown_order_is_dropped_not_fatal(self, driver):
+        write_ping_batch([_record(driver.id, order_id=uuid.uuid4())])
+        ping = GPSPing.objects.get(driver=driver)
+        assert ping.order is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPingBuffer:
+    async def test_flushes_when_batch_is_full(self):
+        batches = []
+        buffer = PingBuffer(
+            batch_size=3, flush_interval_ms=60_000, writer=lambda b: batches.append(b) or len(b),
+        )
+        driver_id = uuid.uuid4()
+        for _ in range(3):
+            await buffer.add(_record(driver_id))
+        await asyncio.sleep(0.05)
+        assert len(batches) == 1
+        assert len(batches[0]) == 3
+        assert len(buffer) == 0
+
+    async def test_flushes_after_interval(self):
+        batches = []
+        buffer = PingBuffer(
+            batch_size=100, flush_interval_ms=10, writer=lambda b: batches.append(b) or len(b),
+        )
+        await buffer.add(_record(uuid.uuid4()))
+        assert batches == []
+        await asyncio.sleep(0.1)
+        assert len(batches) == 1
+
+    async def test_wait_returns_after_commit(self):
+        batches = []
+        buffer = PingBuffer(
+            batch_size=100, flush_interval_ms=10, writer=lambda b: batches.append(b) or len(b),
+        )
+        await buffer.add(_record(uuid.uuid4()), wait=True)
+        assert len(batches) == 1
+        assert buffer.stats["written"] == 1
+
+    async def test_wait_raises_when_batch_fails(self):
+        def failing_writer(batch):
+            raise RuntimeError("db down")
+
+        buffer = PingBuffer(batch_size=1, flush_interval_ms=10, writer=failing_writer)
+        with pytest.raises(RuntimeError):
+            await buffer.add(_record(uuid.uuid4()), wait=True)
+        assert buffer.stats["failed"] == 1
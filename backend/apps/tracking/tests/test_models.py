@@ -62,6 +62,28 @@ class TestGPSPing:
             )
         assert GPSPing.objects.filter(order=posted_order).count() == 5
 
+    def test_fixed_point_round_trip(self, driver):
+        ping = GPSPing.objects.create(
+            driver=driver, lat=14.6928123, lng=-17.4467456,
+            accuracy_m=4.6, speed_kmh=61.37, bearing=-10.0,
+        )
+        ping.refresh_from_db()
+        assert ping.lat_e6 == 14692812
+        assert ping.lng_e6 == -17446746
+        assert ping.lat == pytest.approx(14.692812)
+        assert ping.speed_kmh == pytest.approx(61.4)
+        assert ping.bearing == pytest.approx(350.0)
+
+    def test_serializer_keeps_decimal_format(self, driver):
+        from apps.tracking.serializers import GPSPingSerializer
+        ping = GPSPing.objects.create(driver=driver, lat="14.6928", lng="-17.4467", speed_kmh=60)
+        data = GPSPingSerializer(ping).data
+        assert data["lat"] == "14.692800"
+        assert data["lng"] == "-17.446700"
+        assert data["speed_kmh"] == "60.00"
+        assert data["bearing"] is None
+        assert data["id"] == ping.pk and isinstance(data["id"], int)
+
 
 @pytest.mark.django_db
 class TestOrderRoute:
@@ -0,0 +1,56 @@
+"""
+Tests for the weekly GPS ping partition lifecycle.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.db import connection
+
+from apps.tracking import partitions
+from apps.tracking.models import GPSPing
+
+
+def _rows_in(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+class TestPartitionFor:
+    def test_weeks_start_on_monday(self):
+        partition = partitions.partition_for(date(2026, 10, 18))  # a Sunday
+        assert partition.start == date(2026, 10, 12)
+        assert partition.end == date(2026, 10, 19)
+        assert partition.name == "tracking_gpsping_p20261012"
+
+
+@pytest.mark.django_db
+class TestPartitionLifecycle:
+    def test_ensure_creates_upcoming_weeks(self):
+        today = date(2030, 1, 1)
+        created = partitions.ensure_partitions(weeks_ahead=2, today=today)
+        assert created == [
+            "tracking_gpsping_p20291231",
+            "tracking_gpsping_p20300107",
+            "tracking_gpsping_p20300114",
+        ]
+        assert partitions.ensure_partitions(weeks_ahead=2, today=today) == []
+
+    def test_rows_in_default_partition_are_moved(self, driver):
+        ts = datetime(2031, 3, 4, 12, 0, tzinfo=dt_timezone.utc)
+        GPSPing.objects.create(driver=driver, lat=14.69, lng=-17.44, timestamp=ts)
+        assert _rows_in(partitions.DEFAULT_PARTITION) == 1
+
+        partitions.ensure_partitions(weeks_ahead=0, today=ts.date())
+        assert _rows_in(partitions.DEFAULT_PARTITION) == 0
+        assert _rows_in("tracking_gpsping_p20310303") == 1
+        assert GPSPing.objects.filter(driver=driver).count() == 1
+
+    def test_expire_drops_weeks_past_retention(self):
+        old = date.today() - timedelta(days=400)
+        created = partitions.ensure_partitions(weeks_ahead=1, today=old)
+        expired = partitions.expire_partitions(retention_days=180, drop=True)
+        assert set(created) <= set(expired)
+        remaining = {p.name for p in partitions.list_partitions()}
+        assert remaining.isdisjoint(expired)
+        assert partitions.partition_for(date.today()).name in remaining
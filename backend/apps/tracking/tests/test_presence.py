@@ -0,0 +1,49 @@
+"""
+Tests for driver presence and the offline sweeper.
+"""
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.tracking import presence
+
+
+class TestFilterOnline:
+    def test_keeps_recently_seen_drivers(self, settings):
+        now = time.time()
+        timeout = settings.TRACKING_PRESENCE["TIMEOUT_SECONDS"]
+        redis = MagicMock()
+        redis.zmscore.return_value = [now - 5, None, now - timeout - 5]
+        with patch("apps.tracking.presence.get_redis", return_value=redis):
+            assert presence.filter_online(["a", "b", "c"], now=now) == ["a"]
+
+    def test_fails_open_when_redis_is_down(self):
+        redis = MagicMock()
+        redis.zmscore.side_effect = ConnectionError
+        with patch("apps.tracking.presence.get_redis", return_value=redis):
+            assert presence.filter_online(["a", "b"]) == ["a", "b"]
+
+
+@pytest.mark.django_db
+class TestSweep:
+    def test_marks_silent_drivers_offline(self, settings, driver):
+        settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+        driver.driver_profile.is_available = True
+        driver.driver_profile.save(update_fields=["is_available"])
+        redis = MagicMock()
+        redis.zrangebyscore.side_effect = [[str(driver.id).encode()], []]
+
+        with patch("apps.tracking.presence.get_redis", return_value=redis):
+            assert presence.sweep() == 1
+
+        driver.driver_profile.refresh_from_db()
+        assert driver.driver_profile.is_available is False
+        redis.zrem.assert_called_once_with(presence._key(), str(driver.id))
+
+    def test_nothing_to_sweep(self, driver):
+        redis = MagicMock()
+        redis.zrangebyscore.return_value = []
+        with patch("apps.tracking.presence.get_redis", return_value=redis):
+            assert presence.sweep() == 0
+        redis.zrem.assert_not_called()
@@ -0,0 +1,77 @@
+"""
+Tests for the mess.gps.v1 binary location protocol.
+"""
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+
+from apps.tracking import protocol
+from apps.tracking.protocol import Fix, ProtocolError, decode_batch, encode_batch
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def _fixes(n, start=NOW - timedelta(minutes=1)):
+    return [
+        Fix(lat=14.6928 + i * 0.0001, lng=-17.4467, accuracy_m=5.0, speed_kmh=42.5, bearing=90.0,
+            timestamp=start + timedelta(seconds=5 * i))
+        for i in range(n)
+    ]
+
+
+class TestFixBatch:
+    def test_round_trip(self):
+        order_id = uuid.uuid4()
+        fixes = _fixes(12)
+        frame = encode_batch(100, fixes, order_id)
+        assert len(frame) == protocol.HEADER.size + 12 * protocol.FIX.size
+
+        batch = decode_batch(frame, now=NOW)
+        assert batch.order_id == order_id
+        assert batch.last_seq == 111
+        assert batch.fixes[0].lat == pytest.approx(14.6928)
+        assert batch.fixes[-1].timestamp == fixes[-1].timestamp
+        assert batch.fixes[0].speed_kmh == 42.5
+
+    def test_unknown_fields_and_no_order(self):
+        fix = Fix(lat=14.69, lng=-17.44, accuracy_m=None, speed_kmh=None, bearing=None, timestamp=NOW)
+        batch = decode_batch(encode_batch(1, [fix]), now=NOW)
+        assert batch.order_id is None
+        assert batch.fixes[0].accuracy_m is None
+        assert batch.fixes[0].speed_kmh is None
+        assert batch.fixes[0].bearing is None
+
+    def test_future_fixes_are_clamped_and_stale_ones_dropped(self):
+        fixes = _fixes(1, start=NOW - timedelta(days=2)) + _fixes(1, start=NOW + timedelta(minutes=5))
+        batch = decode_batch(encode_batch(1, fixes), now=NOW)
+        assert [f.timestamp for f in batch.fixes] == [NOW]
+        # The dropped fix is still acknowledged
+        assert batch.last_seq == 2
+
+    def test_truncated_frame_is_rejected(self):
+        frame = encode_batch(1, _fixes(3))
+        with pytest.raises(ProtocolError):
+            decode_batch(frame[:-1], now=NOW)
+
+    def test_unknown_version_is_rejected(self):
+        frame = bytearray(encode_batch(1, _fixes(1)))
+        frame[0] = 9
+        with pytest.raises(ProtocolError) as exc:
+            decode_batch(bytes(frame), now=NOW)
+        assert exc.value.status == protocol.STATUS_UNSUPPORTED
+
+    def test_ack(self):
+        assert protocol.decode_ack(protocol.encode_ack(41)) == (protocol.STATUS_OK, 41)
+        assert len(protocol.encode_ack(41)) == struct.calcsize("<BBHI")
+
+
+class TestSplitFrames:
+    def test_splits_back_to_back_frames(self):
+        first, second = encode_batch(1, _fixes(3)), encode_batch(4, _fixes(2))
+        assert protocol.split_frames(first + second) == [first, second]
+
+    def test_truncated_frame(self):
+        with pytest.raises(ProtocolError):
+            protocol.split_frames(encode_batch(1, _fixes(3))[:-1])
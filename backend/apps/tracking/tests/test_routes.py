@@ -0,0 +1,89 @@
+"""
+Tests for the incremental actual-route builder.
+"""
+import uuid
+
+import pytest
+from django.utils import timezone
+
+from apps.tracking.ingest import PingRecord
+from apps.tracking.models import OrderRoute
+from apps.tracking.routes import extend_routes, simplify
+
+BASE = "/api/v1/tracking"
+
+
+def _straight_then_turn(n=60):
+    """Eastward run, then a 90° turn north; ~55 m between fixes."""
+    points = [[-17.44 + i * 0.0005, 14.69] for i in range(n // 2)]
+    last_lng = points[-1][0]
+    points += [[last_lng, 14.69 + (i + 1) * 0.0005] for i in range(n // 2)]
+    return points
+
+
+def _records(order_id, points, start=None):
+    start = start or timezone.now()
+    return [
+        PingRecord(
+            driver_id=uuid.uuid4(), order_id=order_id, lat=lat, lng=lng,
+            accuracy_m=None, speed_kmh=None, bearing=None,
+            timestamp=start + timezone.timedelta(seconds=5 * i),
+        )
+        for i, (lng, lat) in enumerate(points)
+    ]
+
+
+class TestSimplify:
+    def test_straight_line_keeps_endpoints(self):
+        points = [[-17.44 + i * 0.001, 14.69] for i in range(50)]
+        assert simplify(points, 5) == [0, 49]
+
+    def test_keeps_the_corner(self):
+        points = _straight_then_turn()
+        assert simplify(points, 5) == [0, 29, 59]
+
+
+@pytest.mark.django_db
+class TestExtendRoutes:
+    def test_builds_route_incrementally(self, accepted_order):
+        records = _records(accepted_order.id, _straight_then_turn())
+        for i in range(0, len(records), 7):
+            extend_routes(records[i:i + 7])
+
+        route = OrderRoute.objects.get(order=accepted_order)
+        assert route.actual_point_count == 60
+        assert route.last_point_at == records[-1].timestamp
+        # 59 segments of ~54-55 m each
+        assert float(route.actual_distance_km) == pytest.approx(3.23, abs=0.02)
+        coords = route.actual_route_levels["25"]["points"] + route.actual_route_levels["25"]["tail"][-1:]
+        assert len(coords) == 3
+        assert coords[-1] == pytest.approx([records[-1].lng, records[-1].lat])
+
+    def test_replayed_fixes_are_ignored(self, accepted_order):
+        records = _records(accepted_order.id, _straight_then_turn(10))
+        extend_routes(records)
+        extend_routes(records[:5])
+        route = OrderRoute.objects.get(order=accepted_order)
+        assert route.actual_point_count == 10
+
+    def test_route_view_returns_simplified_line(self, shipper_client, accepted_order):
+        extend_routes(_records(accepted_order.id, _straight_then_turn()))
+        resp = shipper_client.get(f"{BASE}/orders/{accepted_order.id}/route/", {"tolerance_m": 25})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["actual_point_count"] == 60
+        assert data["actual_route_geojson"]["type"] == "LineString"
+        assert len(data["actual_route_geojson"]["coordinates"]) == 3
+
+    def test_route_view_zoom_picks_coarser_level_when_zoomed_out(self, shipper_client, accepted_order):
+        extend_routes(_records(accepted_order.id, _straight_then_turn()))
+        url = f"{BASE}/orders/{accepted_order.id}/route/"
+        close = shipper_client.get(url, {"zoom": 18}).json()["actual_route_geojson"]["coordinates"]
+        # At zoom 5 one pixel is ~4.7 km: the 2 km level collapses the corner
+        far = shipper_client.get(url, {"zoom": 5}).json()["actual_route_geojson"]["coordinates"]
+        assert len(close) == 3
+        assert len(far) == 2
+
+    def test_route_view_404_without_route(self, shipper_client, accepted_order):
+        resp = shipper_client.get(f"{BASE}/orders/{accepted_order.id}/route/")
+        assert resp.status_code == 404
@@ -0,0 +1,101 @@
+"""
+Tests for the Redis Stream hand-off between ingest and the ping writers.
+"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.tracking import stream
+from apps.tracking.ingest import PingRecord, write_ping_batch
+from apps.tracking.models import GPSPing
+
+TS = datetime(2026, 10, 18, 8, 0, 0, 123456, tzinfo=dt_timezone.utc)
+
+
+def _record(driver_id, order_id=None, **kwargs):
+    return PingRecord(
+        driver_id=driver_id, order_id=order_id, lat=kwargs.get("lat", 14.6928), lng=-17.4467,
+        accuracy_m=kwargs.get("accuracy_m"), speed_kmh=42.5, bearing=None,
+        timestamp=kwargs.get("timestamp", TS),
+    )
+
+
+def _entries(records, start=1):
+    """xreadgroup-shaped entries with bytes fields, as redis-py returns them."""
+    return [
+        (f"{start + i}-0".encode(), {k.encode(): str(v).encode() for k, v in stream.encode(r).items()})
+        for i, r in enumerate(records)
+    ]
+
+
+class TestEncoding:
+    def test_round_trip_keeps_microseconds(self):
+        record = _record(uuid.uuid4(), uuid.uuid4(), accuracy_m=8.0)
+        assert stream.decode(_entries([record])[0][1]) == record
+
+    def test_malformed_entry(self):
+        with pytest.raises((KeyError, ValueError)):
+            stream.decode({b"d": b"not-a-uuid"})
+
+
+class TestAppendOrWrite:
+    def test_falls_back_to_direct_write(self):
+        records = [_record(uuid.uuid4())]
+        with patch("apps.tracking.stream.append", side_effect=ConnectionError), \
+                patch("apps.tracking.stream.write_ping_batch", return_value=1) as write:
+            assert stream.append_or_write(records) == 1
+        write.assert_called_once_with(records)
+
+
+@pytest.mark.django_db
+class TestStreamWriter:
+    @pytest.fixture
+    def redis(self):
+        redis = MagicMock()
+        redis.xautoclaim.return_value = ["0-0", [], []]
+        with patch("apps.tracking.stream.get_redis", return_value=redis):
+            yield redis
+
+    def test_writes_and_acks_a_batch(self, redis, driver):
+        entries = _entries([_record(driver.id, lat=14.69 + i * 0.01) for i in range(3)])
+        redis.xreadgroup.side_effect = [[], [[b"mess:tracking:pings", entries]]]
+
+        writer = stream.StreamWriter(consumer="w1")
+        assert writer.run_once() == 3
+
+        assert GPSPing.objects.filter(driver=driver).count() == 3
+        redis.xack.assert_called_once_with(stream._key(), stream.GROUP, b"1-0", b"2-0", b"3-0")
+
+    def test_failed_write_is_left_pending_and_replayed(self, redis, driver):
+        entries = _entries([_record(driver.id)])
+        redis.xreadgroup.side_effect = [[], [[b"k", entries]], [[b"k", entries]]]
+        writer = stream.StreamWriter(consumer="w1", writer=MagicMock(side_effect=RuntimeError("db down")))
+
+        with pytest.raises(RuntimeError):
+            writer.run_once()
+        redis.xack.assert_not_called()
+
+        # The next round re-reads this consumer's pending entries ("0"), not new ones
+        writer._writer = write_ping_batch
+        assert writer.run_once() == 1
+        assert redis.xreadgroup.call_args.args[2] == {stream._key(): "0"}
+        assert GPSPing.objects.filter(driver=driver).count() == 1
+
+    def test_replay_skips_pings_already_stored(self, redis, driver):
+        record = _record(driver.id)
+        write_ping_batch([record])
+        redis.xreadgroup.side_effect = [[[b"k", _entries([record])]]]
+
+        writer = stream.StreamWriter(consumer="w1")
+        assert writer.run_once() == 1
+        assert GPSPing.objects.filter(driver=driver).count() == 1
+        redis.xack.assert_called_once()
+
+    def test_trimmed_and_malformed_entries_are_acked(self, redis):
+        redis.xreadgroup.side_effect = [[], [[b"k", [(b"1-0", None), (b"2-0", {b"d": b"x"})]]]]
+        writer = stream.StreamWriter(consumer="w1")
+        assert writer.run_once() == 2
+        assert writer.stats["skipped"] == 2
+        redis.xack.assert_called_once_with(stream._key(), stream.GROUP, b"1-0", b"2-0")
@@ -0,0 +1,117 @@
+"""
+Tests for the offline ping upload endpoint.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.tracking import protocol
+from apps.tracking.ingest import PingRecord, write_ping_batch
+from apps.tracking.models import GPSPing, OrderRoute
+
+URL = "/api/v1/tracking/pings/upload/"
+
+
+def _fix(i, start, **extra):
+    """~55 m east of the previous fix every 5 s, so the noise filter keeps it."""
+    return {
+        "lat": 14.69,
+        "lng": -17.44 + i * 0.0005,
+        "timestamp": (start + timedelta(seconds=5 * i)).isoformat(),
+        **extra,
+    }
+
+
+@pytest.fixture
+def no_live_store(settings):
+    settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("no_live_store")
+class TestPingUpload:
+    def test_out_of_order_fixes_are_stored_once(self, driver_client, driver):
+        start = timezone.now() - timedelta(hours=2)
+        fixes = [_fix(i, start) for i in range(10)]
+        payload = {"fixes": list(reversed(fixes)) + fixes[:3]}
+
+        resp = driver_client.post(URL, payload, format="json")
+        assert resp.status_code == 200
+        assert resp.data["received"] == 13
+        assert resp.data["inserted"] == 10
+        assert resp.data["dropped"] == {"duplicate": 3}
+        assert GPSPing.objects.filter(driver=driver).count() == 10
+
+        # Uploading the same backlog again stores nothing new
+        resp = driver_client.post(URL, payload, format="json")
+        assert resp.data["inserted"] == 0
+        assert GPSPing.objects.filter(driver=driver).count() == 10
+
+    def test_invalid_and_expired_fixes_are_counted(self, driver_client, settings):
+        now = timezone.now()
+        too_old = now - timedelta(hours=settings.TRACKING_UPLOAD["MAX_AGE_HOURS"] + 1)
+        payload = {"fixes": [
+            _fix(0, now - timedelta(minutes=5)),
+            {"lat": 99, "lng": 0, "timestamp": now.isoformat()},
+            {"lat": 14.69},
+            _fix(0, too_old),
+        ]}
+        resp = driver_client.post(URL, payload, format="json")
+        assert resp.data["inserted"] == 1
+        assert resp.data["dropped"] == {"invalid": 2, "too_old": 1}
+
+    def test_backlog_rebuilds_a_route_that_moved_on(self, driver_client, driver, accepted_order):
+        now = timezone.now()
+        live = [
+            PingRecord(driver.id, accepted_order.id, 14.69, -17.43 + i * 0.0005, None, None, None,
+                       now - timedelta(seconds=50 - 5 * i))
+            for i in range(10)
+        ]
+        write_ping_batch(live)
+        route = OrderRoute.objects.get(order=accepted_order)
+        assert route.actual_point_count == 10
+
+        backlog = [_fix(i, now - timedelta(hours=1)) for i in range(20)]
+        resp = driver_client.post(URL, {"order_id": str(accepted_order.id), "fixes": backlog}, format="json")
+        assert resp.data["inserted"] == 20
+
+        route.refresh_from_db()
+        assert route.actual_point_count == 30
+        assert route.last_point_at == live[-1].timestamp
+        # 19 backlog segments, one to the live track, then 9 live ones, ~54 m each
+        assert float(route.actual_distance_km) == pytest.approx(1.56, abs=0.03)
+
+    def test_backlog_does_not_move_the_driver_back(self, driver_client, driver):
+        profile = driver.driver_profile
+        profile.last_location_update = timezone.now()
+        profile.save(update_fields=["last_location_update"])
+
+        driver_client.post(URL, {"fixes": [_fix(i, timezone.now() - timedelta(hours=1)) for i in range(3)]},
+                           format="json")
+        profile.refresh_from_db()
+        assert profile.current_lat is None
+
+    def test_binary_frames(self, driver_client, driver):
+        start = timezone.now() - timedelta(minutes=30)
+        fixes = [
+            protocol.Fix(lat=14.69, lng=-17.44 + i * 0.0005, accuracy_m=5.0, speed_kmh=40.0, bearing=90.0,
+                         timestamp=start + timedelta(seconds=5 * i))
+            for i in range(12)
+        ]
+        body = protocol.encode_batch(1, fixes[:7]) + protocol.encode_batch(8, fixes[7:])
+        resp = driver_client.generic("POST", URL, body, content_type=protocol.MEDIA_TYPE)
+        assert resp.status_code == 200
+        assert resp.data["inserted"] == 12
+        assert GPSPing.objects.filter(driver=driver).count() == 12
+
+    def test_truncated_binary_body_is_rejected(self, driver_client):
+        fixes = [protocol.Fix(14.69, -17.44, None, None, None, timezone.now())]
+        resp = driver_client.generic(
+            "POST", URL, protocol.encode_batch(1, fixes)[:-3], content_type=protocol.MEDIA_TYPE,
+        )
+        assert resp.status_code == 400
+
+    def test_shippers_cannot_upload(self, shipper_client):
+        resp = shipper_client.post(URL, {"fixes": []}, format="json")
+        assert resp.status_code == 403
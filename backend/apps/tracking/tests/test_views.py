@@ -0,0 +1,200 @@
+"""
+Integration tests for the tracking REST endpoints.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from apps.tracking.live import LivePosition
+
+BASE = "/api/v1/tracking"
+
+
+@pytest.fixture
+def located_driver(driver):
+    profile = driver.driver_profile
+    profile.is_available = True
+    profile.current_lat = Decimal("14.692800")
+    profile.current_lng = Decimal("-17.446700")
+    profile.last_location_update = timezone.now()
+    profile.save()
+    return driver
+
+
+@pytest.mark.django_db
+class TestAvailableDrivers:
+    def test_reads_from_live_store(self, shipper_client, located_driver):
+        position = LivePosition(
+            driver_id=str(located_driver.id), lat=14.7, lng=-17.44,
+            timestamp=timezone.now(), speed=42.0, bearing=90.0, distance_km=1.2,
+        )
+        with patch("apps.tracking.live.search_available", return_value=[position]) as search:
+            resp = shipper_client.get(
+                f"{BASE}/available-drivers/", {"lat": 14.69, "lng": -17.44, "radius_km": 10},
+            )
+        assert resp.status_code == 200
+        search.assert_called_once()
+        data = resp.json()
+        assert data[0]["driver_id"] == str(located_driver.id)
+        assert data[0]["distance_km"] == 1.2
+        assert data[0]["speed"] == 42.0
+
+    def test_falls_back_to_profiles_when_store_is_down(self, shipper_client, located_driver):
+        with patch("apps.tracking.live.search_available", side_effect=ConnectionError):
+            resp = shipper_client.get(
+                f"{BASE}/available-drivers/", {"lat": 14.69, "lng": -17.44, "radius_km": 10},
+            )
+        assert resp.status_code == 200
+        assert [d["driver_id"] for d in resp.json()] == [str(located_driver.id)]
+
+    def test_profile_fallback_filters_by_radius(self, shipper_client, located_driver, settings):
+        settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+        # Saint-Louis is ~180 km from Dakar
+        resp = shipper_client.get(
+            f"{BASE}/available-drivers/", {"lat": 16.0178, "lng": -16.4896, "radius_km": 50},
+        )
+        assert resp.json() == []
+
+    def test_profile_fallback_returns_k_nearest(self, shipper_client, located_driver, settings):
+        from apps.accounts.models import DriverProfile, User
+        settings.TRACKING_LIVE_LOCATIONS = {**settings.TRACKING_LIVE_LOCATIONS, "ENABLED": False}
+        far = User.objects.create_user(
+            phone_number="+221775550001", password="pass", first_name="Far", last_name="Driver",
+            role="DRIVER",
+        )
+        DriverProfile.objects.create(
+            user=far, license_number="SN-DK-002", is_available=True,
+            current_lat=Decimal("14.787700"), current_lng=Decimal("-16.924600"),  # Thiès
+        )
+        resp = shipper_client.get(
+            f"{BASE}/available-drivers/", {"lat": 14.70, "lng": -17.44, "radius_km": 200, "limit": 1},
+        )
+        data = resp.json()
+        assert len(data) == 1
+        assert data[0]["driver_id"] == str(located_driver.id)
+
+        resp = shipper_client.get(
+            f"{BASE}/available-drivers/", {"lat": 14.70, "lng": -17.44, "radius_km": 200, "limit": 10},
+        )
+        distances = [d["distance_km"] for d in resp.json()]
+        assert len(distances) == 2
+        assert distances == sorted(distances)
+
+
+@pytest.mark.django_db
+class TestPingWindows:
+    def test_driver_pings_default_to_recent_window(self, driver_client, driver):
+        from apps.tracking.models import GPSPing
+        now = timezone.now()
+        GPSPing.objects.create(driver=driver, lat=14.69, lng=-17.44, timestamp=now)
+        GPSPing.objects.create(
+            driver=driver, lat=14.69, lng=-17.44, timestamp=now - timezone.timedelta(days=30),
+        )
+        resp = driver_client.get(f"{BASE}/drivers/{driver.id}/pings/")
+        assert resp.status_code == 200
+        assert len(resp.json()["results"]) == 1
+
+        since = (now - timezone.timedelta(days=60)).isoformat()
+        resp = driver_client.get(f"{BASE}/drivers/{driver.id}/pings/", {"since": since})
+        assert len(resp.json()["results"]) == 2
+
+    def test_invalid_since_is_rejected(self, driver_client, driver):
+        resp = driver_client.get(f"{BASE}/drivers/{driver.id}/pings/", {"since": "yesterday"})
+        assert resp.status_code == 400
+
+    def test_resolution_keeps_newest_ping_per_bucket(self, driver_client, driver, accepted_order):
+        from apps.orders.models import FreightOrder
+        from apps.tracking.models import GPSPing
+        start = timezone.now().replace(second=0, microsecond=0) - timezone.timedelta(minutes=10)
+        FreightOrder.objects.filter(pk=accepted_order.pk).update(
+            created_at=start - timezone.timedelta(hours=1),
+        )
+        GPSPing.objects.bulk_create([
+            GPSPing(driver=driver, order=accepted_order, lat=14.69, lng=-17.44 + i * 0.0005,
+                    timestamp=start + timezone.timedelta(seconds=5 * i))
+            for i in range(60)
+        ])
+        resp = driver_client.get(f"{BASE}/orders/{accepted_order.id}/pings/", {"resolution": "30s"})
+        results = resp.json()["results"]
+        assert len(results) == 10
+        # Newest ping of the last bucket
+        assert float(results[0]["lng"]) == pytest.approx(-17.44 + 59 * 0.0005)
+
+        resp = driver_client.get(f"{BASE}/orders/{accepted_order.id}/pings/", {"resolution": "7s"})
+        assert resp.status_code == 400
+
+    def test_order_pings_bounded_by_order_lifetime(self, driver_client, driver, accepted_order):
+        from apps.tracking.models import GPSPing
+        GPSPing.objects.create(driver=driver, order=accepted_order, lat=14.69, lng=-17.44)
+        resp = driver_client.get(f"{BASE}/orders/{accepted_order.id}/pings/")
+        assert resp.status_code == 200
+        assert len(resp.json()["results"]) == 1
+
+
+@pytest.mark.django_db
+class TestOrderPingsExport:
+    @pytest.fixture
+    def track(self, driver, accepted_order):
+        from apps.orders.models import FreightOrder
+        from apps.tracking.models import GPSPing
+        start = timezone.now() - timezone.timedelta(minutes=10)
+        # The order existed before its track was recorded
+        FreightOrder.objects.filter(pk=accepted_order.pk).update(
+            created_at=start - timezone.timedelta(hours=1),
+        )
+        GPSPing.objects.bulk_create([
+            GPSPing(
+                driver=driver, order=accepted_order, lat=14.69 + i * 0.0005, lng=-17.44,
+                speed_kmh=40, timestamp=start + timezone.timedelta(seconds=5 * i),
+            )
+            for i in range(60)
+        ])
+        return accepted_order
+
+    def _get(self, client, order, **params):
+        resp = client.get(f"{BASE}/orders/{order.id}/pings/export/", params)
+        body = b"".join(resp.streaming_content).decode() if resp.status_code == 200 else None
+        return resp, body
+
+    def test_ndjson_is_oldest_first(self, shipper_client, track):
+        import json
+        resp, body = self._get(shipper_client, track)
+        assert resp["Content-Type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in body.splitlines()]
+        assert len(rows) == 60
+        assert rows[0]["lat"] == pytest.approx(14.69)
+        assert rows[0]["timestamp"] < rows[-1]["timestamp"]
+
+    def test_geojson_is_a_feature_collection(self, shipper_client, track):
+        import json
+        resp, body = self._get(shipper_client, track, fmt="geojson")
+        data = json.loads(body)
+        assert data["type"] == "FeatureCollection"
+        assert len(data["features"]) == 60
+        assert data["features"][0]["geometry"]["coordinates"] == pytest.approx([-17.44, 14.69])
+
+    def test_csv_with_time_downsampling(self, shipper_client, track):
+        resp, body = self._get(shipper_client, track, fmt="csv", interval_s=30)
+        lines = body.strip().splitlines()
+        assert lines[0] == "timestamp,lat,lng,accuracy_m,speed_kmh,bearing"
+        assert len(lines) == 1 + 10  # 5 s pings, one kept per 30 s
+
+    def test_every_nth(self, driver_client, track):
+        resp, body = self._get(driver_client, track, every=6)
+        assert len(body.splitlines()) == 10
+
+    def test_outsiders_are_forbidden(self, api_client, track):
+        from apps.accounts.models import User
+        other = User.objects.create_user(
+            phone_number="+221775550009", password="pass", first_name="Other", last_name="Shipper",
+            role="SHIPPER",
+        )
+        api_client.force_authenticate(user=other)
+        resp, _ = self._get(api_client, track)
+        assert resp.status_code == 403
+
+    def test_unknown_format_is_rejected(self, shipper_client, track):
+        resp, _ = self._get(shipper_client, track, fmt="kml")
+        assert resp.status_code == 400
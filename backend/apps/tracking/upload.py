@@ -0,0 +1,235 @@
+"""
+MESS Platform — Offline Ping Upload
+Bulk ingest of the fixes a driver app buffered while out of coverage.
+
+POST /api/v1/tracking/pings/upload/ takes either JSON
+
+    {"order_id": "<uuid, optional default>",
+     "fixes": [{"lat", "lng", "timestamp", "accuracy", "speed", "bearing", "order_id"}, ...]}
+
+(timestamp as ISO 8601 or Unix epoch milliseconds), or a body of back-to-back
+mess.gps.v1 FIX_BATCH frames (Content-Type: application/vnd.mess.gps.v1, see
+protocol.py). Fixes may arrive in any order. They are validated, deduplicated
+on (driver, timestamp) against each other and the stored track, run through
+the same noise filter as the live stream, written with one COPY, and the
+affected order routes and distances are backfilled. Only a backlog newer than
+the driver's last known position moves the driver on the live map and feeds
+ETAs and geofences; an older one is history only.
+"""
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from . import protocol
+from .ingest import PingRecord
+
+logger = logging.getLogger(__name__)
+
+INVALID = "invalid"
+TOO_OLD = "too_old"
+DUPLICATE = "duplicate"
+FILTERED = "filtered"
+
+
+class UploadError(ValueError):
+    """The upload as a whole is unusable (malformed body, too many fixes)."""
+
+
+class UploadResult(NamedTuple):
+    received: int
+    inserted: int
+    dropped: dict  # reason → count
+
+    def as_dict(self) -> dict:
+        return {"received": self.received, "inserted": self.inserted, "dropped": self.dropped}
+
+
+def _max_age() -> timedelta:
+    return timedelta(hours=settings.TRACKING_UPLOAD["MAX_AGE_HOURS"])
+
+
+def _check_size(count: int) -> None:
+    limit = settings.TRACKING_UPLOAD["MAX_FIXES"]
+    if count > limit:
+        raise UploadError(f"At most {limit} fixes per upload.")
+
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError("timestamp must be ISO 8601 or Unix epoch milliseconds.")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def parse_json(payload, driver_id, now: datetime) -> tuple[list[PingRecord], Counter]:
+    """Records from a JSON upload; unreadable or too old fixes are counted and skipped."""
+    if not isinstance(payload, dict) or not isinstance(payload.get("fixes"), list):
+        raise UploadError('Expected {"fixes": [...]}.')
+    fixes = payload["fixes"]
+    _check_size(len(fixes))
+    try:
+        default_order = uuid.UUID(str(payload["order_id"])) if payload.get("order_id") else None
+    except ValueError:
+        raise UploadError("order_id must be a UUID.")
+
+    oldest = now - _max_age()
+    records, dropped = [], Counter()
+    for fix in fixes:
+        try:
+            lat, lng = float(fix["lat"]), float(fix["lng"])
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                raise ValueError("Coordinates out of range.")
+            order_id = uuid.UUID(str(fix["order_id"])) if fix.get("order_id") else default_order
+            timestamp = min(_parse_timestamp(fix["timestamp"]), now)
+            record = PingRecord(
+                driver_id=driver_id,
+                order_id=order_id,
+                lat=lat,
+                lng=lng,
+                accuracy_m=_optional_float(fix.get("accuracy")),
+                speed_kmh=_optional_float(fix.get("speed")),
+                bearing=_optional_float(fix.get("bearing")),
+                timestamp=timestamp,
+            )
+        except (KeyError, ValueError, TypeError, OverflowError, OSError):
+            dropped[INVALID] += 1
+            continue
+        if timestamp < oldest:
+            dropped[TOO_OLD] += 1
+            continue
+        records.append(record)
+    return records, dropped
+
+
+def parse_binary(body: bytes, driver_id, now: datetime) -> tuple[list[PingRecord], Counter]:
+    """Records from back-to-back FIX_BATCH frames; a malformed frame rejects the upload."""
+    try:
+        batches = [
+            protocol.decode_batch(frame, now=now, max_age=_max_age()) for frame in protocol.split_frames(body)
+        ]
+    except protocol.ProtocolError as exc:
+        raise UploadError(str(exc))
+    if not batches:
+        raise UploadError("Empty upload.")
+    _check_size(sum(b.count for b in batches))
+
+    records, dropped = [], Counter()
+    for batch in batches:
+        dropped[TOO_OLD] += batch.count - len(batch.fixes)
+        records.extend(
+            PingRecord(
+                driver_id=driver_id,
+                order_id=batch.order_id,
+                lat=fix.lat,
+                lng=fix.lng,
+                accuracy_m=fix.accuracy_m,
+                speed_kmh=fix.speed_kmh,
+                bearing=fix.bearing,
+                timestamp=fix.timestamp,
+            )
+            for fix in batch.fixes
+        )
+    return records, +dropped
+
+
+def _own_orders(driver_id, order_ids: set) -> set:
+    from apps.orders.models import OrderAssignment
+
+    if not order_ids:
+        return set()
+    return set(
+        OrderAssignment.objects.filter(driver_id=driver_id, order_id__in=order_ids)
+        .values_list("order_id", flat=True)
+    )
+
+
+def _stored_timestamps(driver_id, records: list[PingRecord]) -> set:
+    from .models import GPSPing
+
+    return set(
+        GPSPing.objects.filter(
+            driver_id=driver_id,
+            timestamp__gte=records[0].timestamp,
+            timestamp__lte=records[-1].timestamp,
+        ).values_list("timestamp", flat=True)
+    )
+
+
+def _last_known_at(driver_id) -> Optional[datetime]:
+    """Timestamp of the driver's current position (live store, else profile)."""
+    from apps.accounts.models import DriverProfile
+    from . import live
+
+    if live.is_enabled():
+        try:
+            position = live.get_positions([driver_id]).get(str(driver_id))
+            if position is not None and position.timestamp is not None:
+                return position.timestamp
+        except Exception as exc:
+            logger.warning(f"Live location store unavailable for upload of driver {driver_id}: {exc}")
+    return (
+        DriverProfile.objects.filter(user_id=driver_id)
+        .values_list("last_location_update", flat=True)
+        .first()
+    )
+
+
+def ingest_backlog(driver_id, records: list[PingRecord], dropped: Optional[Counter] = None) -> UploadResult:
+    """Deduplicate, filter and store one driver's uploaded fixes; see the module docstring."""
+    from . import routes
+    from .filters import PingFilter
+    from .ingest import insert_pings, publish_latest
+
+    received = len(records) + sum((dropped or {}).values())
+    dropped = Counter(dropped or {})
+
+    unique = {}
+    for r in sorted(records, key=lambda r: r.timestamp):
+        unique.setdefault(r.timestamp, r)
+    dropped[DUPLICATE] += len(records) - len(unique)
+    records = list(unique.values())
+
+    if records:
+        stored = _stored_timestamps(driver_id, records)
+        dropped[DUPLICATE] += sum(1 for r in records if r.timestamp in stored)
+        records = [r for r in records if r.timestamp not in stored]
+
+    # Fixes may only be linked to the driver's own orders
+    own = _own_orders(driver_id, {r.order_id for r in records if r.order_id})
+    records = [r if r.order_id in own or r.order_id is None else r._replace(order_id=None) for r in records]
+
+    ping_filter = PingFilter()
+    kept = []
+    for r in records:
+        if ping_filter.accept(r):
+            kept.append(r)
+        else:
+            dropped[FILTERED] += 1
+    if not kept:
+        return UploadResult(received, 0, dict(+dropped))
+
+    last_known = _last_known_at(driver_id)
+    known_orders = insert_pings(kept)
+    on_orders = [r for r in kept if r.order_id in known_orders]
+    if on_orders:
+        try:
+            routes.backfill_routes(on_orders)
+        except Exception:
+            logger.exception(f"Failed to backfill routes for driver {driver_id}'s upload")
+    fresh = [r for r in kept if last_known is None or r.timestamp > last_known]
+    if fresh:
+        publish_latest(fresh, known_orders)
+
+    logger.info(f"Driver {driver_id} uploaded {received} fixes, {len(kept)} stored.")
+    return UploadResult(received, len(kept), dict(+dropped))
@@ -1,10 +1,29 @@
 """Tracking URLs — /api/v1/tracking/"""
 from django.urls import path
-from .views import AvailableDriversView, DriverRecentPingsView, OrderPingsView, OrderRouteView
+from .views import (
+    AvailableDriversView,
+    DriverRecentPingsView,
+    OrderGeofenceEventsView,
+    OrderPingsExportView,
+    OrderPingsView,
+    OrderRouteView,
+    PingUploadView,
+)
 
 urlpatterns = [
     path("available-drivers/", AvailableDriversView.as_view(), name="tracking-available-drivers"),
     path("drivers/<uuid:driver_id>/pings/", DriverRecentPingsView.as_view(), name="tracking-driver-pings"),
+    path("pings/upload/", PingUploadView.as_view(), name="tracking-ping-upload"),
     path("orders/<uuid:order_pk>/pings/", OrderPingsView.as_view(), name="tracking-order-pings"),
+    path(
+        "orders/<uuid:order_pk>/pings/export/",
+        OrderPingsExportView.as_view(),
+        name="tracking-order-pings-export",
+    ),
+    path(
+        "orders/<uuid:order_pk>/geofence-events/",
+        OrderGeofenceEventsView.as_view(),
+        name="tracking-order-geofence-events",
+    ),
     path("orders/<uuid:order_pk>/route/", OrderRouteView.as_view(), name="tracking-order-route"),
 ]
@@ -1,66 +1,315 @@
 """Tracking REST Views (complement to WebSocket consumers)"""
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, permissions
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import BaseParser, JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core.pagination import GPSCursorPagination
-from core.permissions import IsAdmin
-from .models import GPSPing, OrderRoute
-from .serializers import GPSPingSerializer, OrderRouteSerializer
+from core.permissions import IsDriver
+from . import protocol
+from .models import GeofenceEvent, GPSPing, OrderRoute
+from .serializers import GeofenceEventSerializer, GPSPingSerializer, OrderRouteSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def get_participant_order(user, order_pk):
+    """The order, if `user` is its shipper, its assigned driver or an admin; 404/403 otherwise."""
+    from apps.accounts.constants import UserRole
+    from apps.orders.models import FreightOrder
+
+    order = get_object_or_404(FreightOrder.objects.select_related("assignment"), pk=order_pk)
+    assignment = getattr(order, "assignment", None)
+    if not (
+        user.role == UserRole.ADMIN
+        or order.shipper_id == user.id
+        or (assignment is not None and assignment.driver_id == user.id)
+    ):
+        raise PermissionDenied("You do not have access to this order's track.")
+    return order
+
+
+class PingWindowMixin:
+    """
+    Bounds ping queries to a time window (?since=&until=, ISO 8601) and an
+    optional ?resolution= level of detail.
+    GPSPing is partitioned by week on timestamp, so a bounded range lets
+    Postgres scan only the partitions that overlap it.
+    """
+
+    def _parse_time(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({param: "Invalid ISO 8601 datetime."})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return parsed
+
+    def filter_window(self, qs, default_since=None):
+        since = self._parse_time("since") or default_since
+        until = self._parse_time("until")
+        if since:
+            qs = qs.filter(timestamp__gte=since)
+        if until:
+            qs = qs.filter(timestamp__lt=until)
+        return self.filter_resolution(qs)
+
+    def filter_resolution(self, qs):
+        """?resolution=30s|5m|... keeps only the newest ping per time bucket."""
+        from .lod import downsample_pings, resolution_seconds
 
+        value = self.request.query_params.get("resolution")
+        if not value:
+            return qs
+        seconds = resolution_seconds(value)
+        if seconds is None:
+            choices = ", ".join(settings.TRACKING_PING_RESOLUTIONS)
+            raise ValidationError({"resolution": f"Must be one of: {choices}."})
+        return downsample_pings(qs, seconds)
 
-class DriverRecentPingsView(generics.ListAPIView):
-    """Get recent GPS pings for a driver (admin only or driver themselves)."""
+
+class DriverRecentPingsView(PingWindowMixin, generics.ListAPIView):
+    """
+    Get recent GPS pings for a driver (admin only or driver themselves).
+    Defaults to the last `recent_days` days; pass ?since= to look further back.
+    """
     serializer_class = GPSPingSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = GPSCursorPagination
+    recent_days = 7
 
     def get_queryset(self):
         driver_id = self.kwargs.get("driver_id") or self.request.user.id
         qs = GPSPing.objects.filter(driver_id=driver_id)
-        return qs
+        return self.filter_window(qs, default_since=timezone.now() - timedelta(days=self.recent_days))
 
 
-class OrderPingsView(generics.ListAPIView):
-    """All GPS pings recorded during an order."""
+class OrderPingsView(PingWindowMixin, generics.ListAPIView):
+    """
+    All GPS pings recorded during an order.
+    No ping can predate the order, so its creation time bounds the scan.
+    """
     serializer_class = GPSPingSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = GPSCursorPagination
 
     def get_queryset(self):
+        from apps.orders.models import FreightOrder
+
         order_id = self.kwargs["order_pk"]
-        return GPSPing.objects.filter(order_id=order_id)
+        created_at = FreightOrder.objects.filter(pk=order_id).values_list("created_at", flat=True).first()
+        if created_at is None:
+            return GPSPing.objects.none()
+        return self.filter_window(GPSPing.objects.filter(order_id=order_id), default_since=created_at)
+
+
+class OrderPingsExportView(PingWindowMixin, APIView):
+    """
+    GET /tracking/orders/<id>/pings/export/?fmt=ndjson|geojson|csv
+        &since=&until=&resolution=&interval_s=30&every=5
+    Streams the order's whole track in one response, oldest first, with
+    constant memory (server-side cursor, chunked output). interval_s keeps at
+    most one ping per N seconds; every keeps each N-th ping.
+    Restricted to the order's shipper, its assigned driver and admins.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, order_pk):
+        from django.core.handlers.asgi import ASGIRequest
+
+        from . import export
+
+        order = get_participant_order(request.user, order_pk)
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in export.ENCODERS:
+            raise ValidationError({"fmt": f"Must be one of: {', '.join(export.ENCODERS)}."})
+        params = request.query_params
+        try:
+            interval_s = float(params["interval_s"]) if "interval_s" in params else None
+            every = int(params["every"]) if "every" in params else None
+        except ValueError:
+            raise ValidationError("interval_s and every must be numbers.")
+        if (interval_s is not None and interval_s <= 0) or (every is not None and every < 1):
+            raise ValidationError("interval_s and every must be positive.")
+
+        qs = self.filter_window(GPSPing.objects.filter(order_id=order.id), default_since=order.created_at)
+        rows = export.export_rows(qs)
+        encoder = export.ENCODERS[fmt]()
+        sampler = export.Sampler(interval_s=interval_s, every=every)
+        if isinstance(request._request, ASGIRequest):
+            content = export.astream(rows, encoder, sampler)
+        else:
+            content = export.stream(rows, encoder, sampler)
+
+        response = StreamingHttpResponse(content, content_type=encoder.content_type)
+        filename = f"{order.reference}-track.{encoder.extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class OrderGeofenceEventsView(generics.ListAPIView):
+    """
+    GET /tracking/orders/<id>/geofence-events/
+    Arrivals at and departures from the order's pickup and delivery points,
+    oldest first, with the time spent there on departures.
+    """
+    serializer_class = GeofenceEventSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        order = get_participant_order(self.request.user, self.kwargs["order_pk"])
+        return GeofenceEvent.objects.filter(order=order)
 
 
 class OrderRouteView(generics.RetrieveAPIView):
-    """Get the route for a specific order."""
+    """
+    Get the route for a specific order.
+    The driven path is returned pre-simplified; ?tolerance_m= picks the level
+    (the coarsest configured tolerance not above the requested one), or
+    ?zoom= picks the level matching one pixel at that web-map zoom.
+    """
     serializer_class = OrderRouteSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return OrderRoute.objects.get(order_id=self.kwargs["order_pk"])
+        return get_object_or_404(OrderRoute, order_id=self.kwargs["order_pk"])
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        for param in ("tolerance_m", "zoom"):
+            value = self.request.query_params.get(param)
+            if value is not None:
+                try:
+                    context[param] = float(value)
+                except ValueError:
+                    raise ValidationError({param: "Must be a number."})
+        return context
+
+
+class GPSBatchParser(BaseParser):
+    """Raw body of mess.gps.v1 FIX_BATCH frames (see protocol.py)."""
+    media_type = protocol.MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read() if stream is not None else b""
+
+
+class PingUploadView(APIView):
+    """
+    POST /tracking/pings/upload/
+    Bulk upload of the fixes a driver's app buffered offline, as JSON or
+    binary FIX_BATCH frames (see apps.tracking.upload). Returns what was
+    received, stored and dropped, by reason.
+    """
+    permission_classes = [IsDriver]
+    parser_classes = [JSONParser, GPSBatchParser]
+
+    def post(self, request):
+        from . import upload
+
+        now = timezone.now()
+        try:
+            if isinstance(request.data, bytes):
+                records, dropped = upload.parse_binary(request.data, request.user.id, now)
+            else:
+                records, dropped = upload.parse_json(request.data, request.user.id, now)
+        except upload.UploadError as exc:
+            raise ValidationError({"detail": str(exc)})
+        return Response(upload.ingest_backlog(request.user.id, records, dropped).as_dict())
 
 
 class AvailableDriversView(APIView):
     """
-    GET /tracking/available-drivers/?lat=14.7&lng=-17.4&radius_km=50
-    Returns available drivers in DriverLocation format (same as WS broadcast).
+    GET /tracking/available-drivers/?lat=14.7&lng=-17.4&radius_km=50&limit=50&vehicle_type=<id>
+    Returns available drivers in DriverLocation format (same as WS broadcast),
+    nearest first when a position is given, at most `limit` of them.
+    Positions come from the live location store (Redis GEO); the profile
+    table is only used when the store is disabled or unreachable.
     """
     permission_classes = [permissions.IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+    # First search box for the profile fallback; doubled until `limit` drivers are found
+    initial_search_km = 5.0
 
     def get(self, request):
-        from apps.accounts.models import DriverProfile
-        from core.utils import haversine_distance
+        from . import live
 
         lat = request.query_params.get("lat")
         lng = request.query_params.get("lng")
         radius_km = float(request.query_params.get("radius_km", 50))
+        vehicle_type = request.query_params.get("vehicle_type")
+        try:
+            limit = min(int(request.query_params.get("limit", self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        limit = max(limit, 1)
+
+        if live.is_enabled():
+            try:
+                if lat and lng:
+                    positions = live.search_available(float(lat), float(lng), radius_km, vehicle_type, limit)
+                else:
+                    positions = live.list_available(vehicle_type)[:limit]
+            except Exception as exc:
+                logger.warning(f"Live location store unavailable, falling back to profiles: {exc}")
+            else:
+                return Response(self._serialize_live(positions))
+
+        return Response(self._from_profiles(lat, lng, radius_km, vehicle_type, limit))
+
+    def _serialize_live(self, positions):
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        names = {
+            str(u["id"]): f"{u['first_name']} {u['last_name']}".strip()
+            for u in User.objects.filter(
+                id__in=[p.driver_id for p in positions], is_active=True,
+            ).values("id", "first_name", "last_name")
+        }
+        results = []
+        for p in positions:
+            if p.driver_id not in names:
+                continue
+            entry = {
+                "driver_id": p.driver_id,
+                "driver_name": names[p.driver_id],
+                "lat": p.lat,
+                "lng": p.lng,
+                "speed": p.speed,
+                "bearing": p.bearing,
+                "timestamp": p.timestamp.isoformat() if p.timestamp else None,
+                "is_available": True,
+            }
+            if p.distance_km is not None:
+                entry["distance_km"] = p.distance_km
+            results.append(entry)
+        return results
+
+    def _from_profiles(self, lat, lng, radius_km, vehicle_type, limit):
+        from apps.accounts.models import DriverProfile
 
         drivers = DriverProfile.objects.filter(
             is_available=True,
             current_lat__isnull=False,
             current_lng__isnull=False,
         ).select_related("user")
+        if vehicle_type:
+            drivers = drivers.filter(
+                user__vehicles__vehicle_type_id=vehicle_type, user__vehicles__is_active=True,
+            ).distinct()
 
         def _serialize(profile, distance_km=None):
             entry = {
@@ -78,13 +327,42 @@ class AvailableDriversView(APIView):
             return entry
 
         if lat and lng:
-            lat_f, lng_f = float(lat), float(lng)
-            nearby = []
-            for d in drivers:
-                dist = haversine_distance(lat_f, lng_f, float(d.current_lat), float(d.current_lng))
-                if dist <= radius_km:
-                    nearby.append((d, round(dist, 2)))
-            nearby.sort(key=lambda x: x[1])
-            return Response([_serialize(d, dist) for d, dist in nearby])
-
-        return Response([_serialize(d) for d in drivers])
+            nearby = self._nearest_profiles(drivers, float(lat), float(lng), radius_km, limit)
+            return [_serialize(d, dist) for d, dist in nearby]
+
+        return [_serialize(d) for d in drivers[:limit]]
+
+    def _nearest_profiles(self, drivers, lat, lng, radius_km, limit):
+        """
+        k-nearest search over the (is_available, current_lat, current_lng) index.
+
+        Scans a bounding box that starts small and doubles until it holds
+        `limit` drivers within its inscribed circle (or reaches radius_km), so
+        the cost tracks the number of nearby drivers rather than the fleet size.
+        Any driver outside the circle searched is farther than every driver
+        inside it, so the first `limit` by exact distance are the true nearest.
+        """
+        from core.utils import bounding_box, haversine_many
+
+        search_km = min(self.initial_search_km, radius_km)
+        while True:
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, search_km)
+            candidates = list(drivers.filter(
+                current_lat__range=(min_lat, max_lat),
+                current_lng__range=(min_lng, max_lng),
+            ))
+            distances = haversine_many(
+                lat, lng,
+                [float(d.current_lat) for d in candidates],
+                [float(d.current_lng) for d in candidates],
+            )
+            nearby = [
+                (d, round(float(dist), 2))
+                for d, dist in zip(candidates, distances) if dist <= search_km
+            ]
+            if len(nearby) >= limit or search_km >= radius_km:
+                break
+            search_km = min(search_km * 2, radius_km)
+
+        nearby.sort(key=lambda x: x[1])
+        return nearby[:limit]
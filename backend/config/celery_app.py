@@ -28,6 +28,21 @@ app.conf.beat_schedule = {
         "task": "apps.payments.tasks.expire_pending_payments",
         "schedule": crontab(minute="*/15"),  # every 15 min
     },
+    # Copy live driver positions from Redis to DriverProfile
+    "snapshot-driver-locations": {
+        "task": "apps.tracking.tasks.snapshot_driver_locations",
+        "schedule": crontab(minute="*"),  # every minute
+    },
+    # Mark drivers whose presence heartbeat expired offline
+    "sweep-driver-presence": {
+        "task": "apps.tracking.tasks.sweep_driver_presence",
+        "schedule": 30.0,  # every 30 s
+    },
+    # Create next weeks' GPS ping partitions, expire those past retention
+    "maintain-gpsping-partitions": {
+        "task": "apps.tracking.tasks.maintain_gpsping_partitions",
+        "schedule": crontab(minute=30, hour=2),  # 02:30 daily
+    },
     # Send daily summary to admin
     "daily-admin-summary": {
         "task": "apps.notifications.tasks.send_admin_daily_summary",
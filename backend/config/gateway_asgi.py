@@ -0,0 +1,20 @@
+"""
+MESS Platform — Driver Ingest Gateway ASGI Configuration
+Serves only the driver location stream (ws/tracking/driver/) with
+apps.tracking.gateway, without Channels routing, sessions or per-connection
+user lookups. Run as its own process and route the driver path to it:
+
+    uvicorn config.gateway_asgi:application --host 0.0.0.0 --port 8001
+
+Pings are handed to the Redis Stream, so run tracking_stream_writer processes.
+"""
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+# Loads settings and the app registry; the gateway itself never queries the database
+django.setup(set_prefix=False)
+
+from apps.tracking.gateway import application  # noqa
@@ -28,6 +28,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 THIRD_PARTY_APPS = [
@@ -285,6 +286,162 @@ SPECTACULAR_SETTINGS = {
 MAPS_PROVIDER = config("MAPS_PROVIDER", default="osm")
 MAPBOX_TOKEN = config("MAPBOX_TOKEN", default="")
 
+# ── GPS tracking ingestion ────────────────────────────────────────
+# Driver pings are buffered per worker and written in batches.
+# DURABILITY: "ack_then_flush" (ack immediately) or "flush_before_ack"
+# (ack once the batch holding the ping is committed).
+# MODE: "inline" (the WebSocket workers write to Postgres) or "stream"
+# (they append to a Redis Stream drained by `manage.py tracking_stream_writer`).
+TRACKING_INGEST = {
+    "BATCH_SIZE": config("TRACKING_INGEST_BATCH_SIZE", default=200, cast=int),
+    "FLUSH_INTERVAL_MS": config("TRACKING_INGEST_FLUSH_INTERVAL_MS", default=500, cast=int),
+    "DURABILITY": config("TRACKING_INGEST_DURABILITY", default="ack_then_flush"),
+    "MODE": config("TRACKING_INGEST_MODE", default="inline"),
+}
+
+# Redis Stream between the WebSocket workers and the ping writers (MODE "stream").
+# MAXLEN bounds its memory: entries beyond it are trimmed even if unwritten.
+TRACKING_STREAM = {
+    "MAXLEN": config("TRACKING_STREAM_MAXLEN", default=500_000, cast=int),
+    "BATCH_SIZE": config("TRACKING_STREAM_BATCH_SIZE", default=2000, cast=int),
+    "BLOCK_MS": 1000,
+    # Entries a crashed writer left unacknowledged this long are taken over
+    "CLAIM_IDLE_MS": config("TRACKING_STREAM_CLAIM_IDLE_MS", default=60_000, cast=int),
+}
+
+# Live driver positions in Redis GEO sets; Postgres gets periodic snapshots.
+TRACKING_LIVE_LOCATIONS = {
+    "ENABLED": config("TRACKING_LIVE_LOCATIONS_ENABLED", default=True, cast=bool),
+    "SNAPSHOT_BATCH_SIZE": 1000,
+}
+
+# Drivers not seen (ping, heartbeat) for TIMEOUT_SECONDS are swept offline (apps/tracking/presence.py)
+TRACKING_PRESENCE = {
+    "TIMEOUT_SECONDS": config("TRACKING_PRESENCE_TIMEOUT_SECONDS", default=120, cast=int),
+    "SWEEP_BATCH_SIZE": 1000,
+}
+
+# Noise filter applied to each driver's stream before persistence (apps/tracking/filters.py)
+TRACKING_PING_FILTER = {
+    "ENABLED": config("TRACKING_PING_FILTER_ENABLED", default=True, cast=bool),
+    "MIN_DISTANCE_M": config("TRACKING_PING_FILTER_MIN_DISTANCE_M", default=15, cast=int),
+    "MAX_SILENCE_SECONDS": config("TRACKING_PING_FILTER_MAX_SILENCE_SECONDS", default=120, cast=int),
+    "MAX_SPEED_KMH": config("TRACKING_PING_FILTER_MAX_SPEED_KMH", default=180, cast=int),
+    "MAX_ACCURACY_M": config("TRACKING_PING_FILTER_MAX_ACCURACY_M", default=150, cast=int),
+    "MAX_CONSECUTIVE_JUMPS": 3,
+}
+
+# Fan-out to order_tracking_<id> groups: newest fix only, at most MAX_RATE_HZ per order
+TRACKING_BROADCAST = {
+    "MAX_RATE_HZ": config("TRACKING_BROADCAST_MAX_RATE_HZ", default=1.0, cast=float),
+    "WATCHER_CACHE_SECONDS": 2,
+    "STATS_LOG_SECONDS": 60,
+}
+
+# Actual routes are built as pings arrive, pre-simplified at each tolerance (metres)
+TRACKING_ROUTES = {
+    "TOLERANCES_M": [5, 25, 100, 500, 2000],
+    "DEFAULT_TOLERANCE_M": 25,
+    # Raw fixes kept per level before the endpoint is pinned on a straight run
+    "MAX_TAIL_POINTS": 200,
+    # Pings read per query when a route is rebuilt after a late (offline) upload
+    "REBUILD_CHUNK_SIZE": 5000,
+}
+
+# Bulk upload of fixes the driver app buffered offline (POST /tracking/pings/upload/)
+TRACKING_UPLOAD = {
+    "MAX_FIXES": config("TRACKING_UPLOAD_MAX_FIXES", default=20000, cast=int),
+    "MAX_AGE_HOURS": config("TRACKING_UPLOAD_MAX_AGE_HOURS", default=72, cast=int),
+    # Rows per INSERT where pings cannot be COPYed (non-PostgreSQL databases)
+    "INSERT_BATCH_SIZE": 2000,
+}
+
+# Live ETA for orders being driven (apps/tracking/eta.py)
+TRACKING_ETA = {
+    "DEFAULT_SPEED_KMH": 45,
+    "MIN_SPEED_KMH": 10,
+    "SPEED_WINDOW_SECONDS": 900,
+    "PICKUP_DWELL_MINUTES": 30,
+    "TTL_SECONDS": 6 * 60 * 60,
+    "BROADCAST_INTERVAL_SECONDS": 30,
+}
+
+# Admin/carrier fleet map: drivers publish to web-map tiles at each zoom (apps/tracking/fleet.py)
+TRACKING_FLEET_MAP = {
+    "TILE_ZOOMS": [6, 9, 12],
+    # Viewports are served at the finest zoom covering them in at most this many tiles
+    "MAX_TILES": 64,
+    "MIN_INTERVAL_SECONDS": config("TRACKING_FLEET_MAP_MIN_INTERVAL_SECONDS", default=5, cast=int),
+    "SNAPSHOT_LIMIT": 500,
+}
+
+# Pickup/delivery zones checked on every ping batch (apps/tracking/geofence.py)
+TRACKING_GEOFENCE = {
+    "ENABLED": config("TRACKING_GEOFENCE_ENABLED", default=True, cast=bool),
+    "PICKUP_RADIUS_M": config("TRACKING_GEOFENCE_PICKUP_RADIUS_M", default=300, cast=int),
+    "DELIVERY_RADIUS_M": config("TRACKING_GEOFENCE_DELIVERY_RADIUS_M", default=300, cast=int),
+    # A driver has left once beyond radius × EXIT_FACTOR
+    "EXIT_FACTOR": 1.5,
+    "CACHE_SECONDS": 15 * 60,
+    "NOTIFY": config("TRACKING_GEOFENCE_NOTIFY", default=True, cast=bool),
+}
+
+# ?resolution= buckets for the ping endpoints (newest ping per bucket)
+TRACKING_PING_RESOLUTIONS = {"1s": 1, "30s": 30, "5m": 300, "1h": 3600}
+
+# tracking_gpsping is range-partitioned by week; see apps/tracking/partitions.py
+TRACKING_PING_PARTITIONS = {
+    "WEEKS_AHEAD": config("TRACKING_PING_PARTITIONS_WEEKS_AHEAD", default=4, cast=int),
+    "RETENTION_DAYS": config("TRACKING_PING_RETENTION_DAYS", default=180, cast=int),
+    "DROP_EXPIRED": config("TRACKING_PING_DROP_EXPIRED", default=True, cast=bool),
+}
+
+# ── Order matching ────────────────────────────────────────────────
+# Drivers ranked for a posted order (apps/orders/matching.py). Each component
+# scores 0–1; WEIGHTS are normalised to sum to 1.
+ORDER_MATCHING = {
+    "RADIUS_KM": config("ORDER_MATCHING_RADIUS_KM", default=100, cast=int),
+    # Drivers notified of a new order / returned by default
+    "TOP_K": config("ORDER_MATCHING_TOP_K", default=50, cast=int),
+    # Nearest available drivers scored per order
+    "CANDIDATE_LIMIT": 10_000,
+    "WEIGHTS": {
+        "distance": 0.35,
+        "payload_fit": 0.15,
+        "vehicle_type": 0.25,
+        "rating": 0.15,
+        "acceptance": 0.10,
+    },
+    # Drivers without a vehicle or with an unknown capacity
+    "UNKNOWN_PAYLOAD_FIT": 0.5,
+    # Ratings and acceptance rates are pulled towards these priors, as if
+    # PRIOR_WEIGHT ratings / offers had been seen
+    "RATING_PRIOR": 4.0,
+    "ACCEPTANCE_PRIOR": 0.3,
+    "PRIOR_WEIGHT": 5,
+    "ACCEPTANCE_WINDOW_DAYS": 30,
+}
+
+# Auto-dispatch (apps/orders/dispatch.py): "broadcast" notifies the TOP_K matches
+# of a posted order at once; "auto" offers it to WAVE_SIZE drivers at a time,
+# each wave open for OFFER_TTL_SECONDS. Needs the dispatch_scheduler process.
+ORDER_DISPATCH = {
+    "MODE": config("ORDER_DISPATCH_MODE", default="broadcast"),
+    "WAVE_SIZE": config("ORDER_DISPATCH_WAVE_SIZE", default=3, cast=int),
+    "OFFER_TTL_SECONDS": config("ORDER_DISPATCH_OFFER_TTL_SECONDS", default=60, cast=int),
+    # After this many waves the order is broadcast and open to every driver
+    "MAX_WAVES": config("ORDER_DISPATCH_MAX_WAVES", default=5, cast=int),
+    # Scheduler: idle sleep between checks of the timer set, and timers per check
+    "POLL_SECONDS": 0.5,
+    "BATCH_SIZE": 100,
+}
+
+# Accept stampedes (apps/orders/claims.py): the first driver's Redis claim on an
+# order turns the others away with a 409 for this long
+ORDER_ACCEPT = {
+    "CLAIM_TTL_SECONDS": config("ORDER_ACCEPT_CLAIM_TTL_SECONDS", default=30, cast=int),
+}
+
 # ── Payment providers ─────────────────────────────────────────────
 WAVE_API_KEY = config("WAVE_API_KEY", default="")
 WAVE_MERCHANT_ID = config("WAVE_MERCHANT_ID", default="")
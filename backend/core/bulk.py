@@ -0,0 +1,148 @@
+"""
+MESS Platform — COPY Bulk Writer
+Appends rows to a table over PostgreSQL's COPY protocol, for append-only,
+high-volume tables (GPS pings, notifications, messages) where even batched
+multi-row INSERTs spend most of their time binding parameters.
+
+Rows are model instances or plain tuples (with the field names they follow).
+Each value goes through its Django field's get_db_prep_save() — fixed-point
+coordinates, UUIDs, aware datetimes, JSON — and is streamed to the server in
+COPY text format, without building the whole payload in memory. Works with
+psycopg2 (copy_expert) and psycopg 3 (cursor.copy); on other databases it
+falls back to bulk_create.
+
+    copy_insert(GPSPing, pings)
+    copy_insert(Notification, rows, fields=["id", "user_id", "title", ...])
+
+Unlike bulk_create, no database-generated primary keys (AutoField) are set
+on the instances, and signals are not sent.
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional, Sequence
+
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+CHUNK_BYTES = 64 * 1024
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text(value) -> str:
+    """One value in COPY text format (NULL is \\N)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, time)):
+        text = value.isoformat()
+    elif isinstance(value, timedelta):
+        text = f"{value.total_seconds()} seconds"
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    else:
+        text = str(value)
+    return text.translate(_ESCAPES)
+
+
+def _insert_fields(model, fields: Optional[Sequence[str]]) -> list:
+    meta = model._meta
+    if fields is not None:
+        return [meta.get_field(name) for name in fields]
+    # Every concrete column except a database-generated (auto) primary key
+    return [f for f in meta.concrete_fields if f is not meta.auto_field]
+
+
+def _prep(field, value, connection):
+    if value is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.dumps(value, cls=field.encoder)
+    return field.get_db_prep_save(value, connection)
+
+
+def _lines(model, rows: Iterable, fields: list, connection, counter: list):
+    for row in rows:
+        if isinstance(row, model):
+            values = [f.pre_save(row, True) for f in fields]
+        else:
+            values = row
+        counter[0] += 1
+        yield "\t".join(copy_text(_prep(f, v, connection)) for f, v in zip(fields, values)) + "\n"
+
+
+def _chunks(lines) -> Iterable[str]:
+    buffered, size = [], 0
+    for line in lines:
+        buffered.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffered)
+            buffered, size = [], 0
+    if buffered:
+        yield "".join(buffered)
+
+
+class _ChunkReader:
+    """File-like view of a chunk generator, for psycopg2's copy_expert()."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._pending) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+        if size < 0:
+            data, self._pending = self._pending, ""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+def _fallback(model, rows: list, fields: list, using: str, batch_size: Optional[int]) -> int:
+    objs = [
+        row if isinstance(row, model) else model(**{f.attname: v for f, v in zip(fields, row)})
+        for row in rows
+    ]
+    model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
+
+def copy_insert(
+    model,
+    rows: Iterable,
+    fields: Optional[Sequence[str]] = None,
+    using: str = DEFAULT_DB_ALIAS,
+    fallback_batch_size: Optional[int] = 1000,
+) -> int:
+    """
+    COPY `rows` into `model`'s table and return how many were written.
+
+    rows: instances of `model`, or tuples of values in `fields` order.
+    fields: field names or attnames ("driver" or "driver_id") to write;
+        required for tuples, defaults to every concrete column except an
+        auto-increment primary key.
+    """
+    insert_fields = _insert_fields(model, fields)
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return _fallback(model, list(rows), insert_fields, using, fallback_batch_size)
+
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN".format(
+        quote(model._meta.db_table), ", ".join(quote(f.column) for f in insert_fields)
+    )
+    counter = [0]
+    chunks = _chunks(_lines(model, rows, insert_fields, connection, counter))
+    with connection.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, _ChunkReader(chunks), size=CHUNK_BYTES)
+        else:
+            with cursor.copy(sql) as copy:
+                for chunk in chunks:
+                    copy.write(chunk)
+    return counter[0]
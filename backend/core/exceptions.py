@@ -99,6 +99,12 @@ class BusinessLogicError(APIException):
         super().__init__(detail=detail, code=code or self.default_code)
 
 
+class ConflictError(APIException):
+    """A concurrent request got there first (e.g. another driver accepted the order)."""
+    status_code = status.HTTP_409_CONFLICT
+    default_code = "CONFLICT"
+
+
 class PaymentError(APIException):
     status_code = status.HTTP_402_PAYMENT_REQUIRED
     default_code = "PAYMENT_ERROR"
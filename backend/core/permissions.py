@@ -55,6 +55,16 @@ class IsShipperOrBroker(BasePermission):
         )
 
 
+class IsAdminOrBroker(BasePermission):
+    """Platform administrators and brokers — those who dispatch orders to drivers."""
+    def has_permission(self, request, view):
+        return bool(
+            request.user
+            and request.user.is_authenticated
+            and request.user.role in (UserRole.ADMIN, UserRole.BROKER)
+        )
+
+
 class IsOwnerOrAdmin(BasePermission):
     """Object-level: owner of the object or admin."""
     def has_object_permission(self, request, view, obj):
@@ -7,10 +7,16 @@ external routing API, using:
   2. A Senegal road-network correction factor
   3. Cargo-type base rates calibrated to the Dakar market
   4. Weight surcharges for heavy loads
+
+estimate_freight_price() prices one lane with Decimal arithmetic and is what
+quotes are built from. estimate_freight_prices() applies the same rules to
+whole arrays of lanes in one NumPy pass, for ranking, search and analytics.
 """
 from decimal import Decimal
 from typing import NamedTuple
 
+import numpy as np
+
 # Average ratio of actual road distance to great-circle distance
 # across Senegal's primary/secondary road network.
 ROAD_FACTOR = Decimal("1.30")
@@ -102,3 +108,85 @@ def estimate_freight_price(
         min_price_xof=min_price,
         max_price_xof=max_price,
     )
+
+
+class PriceEstimateBatch(NamedTuple):
+    """Array counterpart of PriceEstimate — one float64 entry per lane."""
+    straight_distance_km: np.ndarray
+    road_distance_km: np.ndarray
+    base_price_xof: np.ndarray
+    min_price_xof: np.ndarray
+    max_price_xof: np.ndarray
+
+
+def _rates_for(cargo_types) -> np.ndarray:
+    types = np.asarray(cargo_types)
+    if types.ndim == 0:
+        return np.int64(RATE_PER_KM.get(str(types), DEFAULT_RATE))
+    unique, inverse = np.unique(types, return_inverse=True)
+    rates = np.array([int(RATE_PER_KM.get(str(t), DEFAULT_RATE)) for t in unique], dtype=np.int64)
+    return rates[inverse]
+
+
+def _div_half_even(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """Integer division rounding half to even — Decimal.quantize's default."""
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def _percent(value) -> int:
+    """Decimal("1.30") → 130"""
+    return int(value * 100)
+
+
+def estimate_freight_prices(
+    cargo_types,
+    weights_kg,
+    pickup_lats,
+    pickup_lngs,
+    delivery_lats,
+    delivery_lngs,
+) -> PriceEstimateBatch:
+    """
+    Price N lanes in one vectorized pass.
+
+    Every argument is an array-like of length N, or a scalar broadcast to all
+    lanes (e.g. one cargo type for the whole batch). After the distance is
+    rounded to the cent, the rules run on int64 cents with half-even rounding,
+    so prices match estimate_freight_price exactly.
+    """
+    from core.utils import EARTH_RADIUS_KM
+
+    p_lat = np.radians(np.asarray(pickup_lats, dtype=np.float64))
+    p_lng = np.radians(np.asarray(pickup_lngs, dtype=np.float64))
+    d_lat = np.radians(np.asarray(delivery_lats, dtype=np.float64))
+    d_lng = np.radians(np.asarray(delivery_lngs, dtype=np.float64))
+    a = (
+        np.sin((d_lat - p_lat) / 2) ** 2
+        + np.cos(p_lat) * np.cos(d_lat) * np.sin((d_lng - p_lng) / 2) ** 2
+    )
+    straight_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    # Hundredths of a km from here on
+    straight_c = np.round(straight_km * 100).astype(np.int64)
+    road_c = _div_half_even(straight_c * _percent(ROAD_FACTOR), 100)
+
+    base = _div_half_even(road_c * _rates_for(cargo_types), 100) + int(LOADING_FEE)
+
+    # Weight surcharge: +10 % for every 5 tonnes above 10 T
+    weights = np.asarray(weights_kg, dtype=np.float64)
+    bands = np.where(weights > 10_000, (weights - 10_000) // 5_000, 0).astype(np.int64)
+    base = _div_half_even(base * (10 + bands), 10)
+
+    base = np.maximum(base, int(MIN_PRICE))
+
+    straight_c, road_c, base = np.broadcast_arrays(straight_c, road_c, base)
+    return PriceEstimateBatch(
+        straight_distance_km=straight_c / 100,
+        road_distance_km=road_c / 100,
+        base_price_xof=base.astype(np.float64),
+        min_price_xof=_div_half_even(base * _percent(PRICE_RANGE_LOW), 100).astype(np.float64),
+        max_price_xof=_div_half_even(base * _percent(PRICE_RANGE_HIGH), 100).astype(np.float64),
+    )
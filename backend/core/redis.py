@@ -0,0 +1,18 @@
+"""
+MESS Platform — Raw Redis Access
+For data structures the Django cache API does not expose
+(GEO sets, sorted sets, streams). Shares the cache's connection pool.
+"""
+from django.conf import settings
+
+
+def get_redis():
+    """Return the raw redis-py client behind the default cache."""
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def redis_key(*parts) -> str:
+    """Build a namespaced key, e.g. redis_key("tracking", "geo") → "mess:tracking:geo"."""
+    prefix = settings.CACHES["default"].get("KEY_PREFIX", "mess")
+    return ":".join([prefix, *(str(p) for p in parts)])
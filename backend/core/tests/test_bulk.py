@@ -0,0 +1,68 @@
+"""
+Tests for core.bulk — COPY bulk writer.
+"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+
+from core.bulk import copy_insert, copy_text
+
+TS = datetime(2026, 10, 18, 8, 0, 0, 250000, tzinfo=dt_timezone.utc)
+
+
+class TestCopyText:
+    def test_null_and_booleans(self):
+        assert copy_text(None) == "\\N"
+        assert copy_text(True) == "t"
+        assert copy_text(False) == "f"
+
+    def test_escapes_separators(self):
+        assert copy_text("a\tb\nc\\d\r") == "a\\tb\\nc\\\\d\\r"
+
+    def test_scalars(self):
+        assert copy_text(TS) == "2026-10-18T08:00:00.250000+00:00"
+        assert copy_text(Decimal("14.692800")) == "14.692800"
+        assert copy_text(42) == "42"
+
+
+@pytest.mark.django_db
+class TestCopyInsert:
+    def test_model_instances(self, driver, posted_order):
+        from apps.tracking.models import GPSPing
+
+        pings = [
+            GPSPing(driver_id=driver.id, order_id=posted_order.id if i % 2 else None,
+                    lat=14.6928 + i * 0.001, lng=-17.4467, speed_kmh=42.5, timestamp=TS)
+            for i in range(25)
+        ]
+        assert copy_insert(GPSPing, pings) == 25
+
+        stored = GPSPing.objects.filter(driver=driver)
+        assert stored.count() == 25
+        assert stored.filter(order=posted_order).count() == 12
+        assert stored.filter(lat_e6=14_692_800, speed_x10=425, timestamp=TS).count() == 1
+
+    def test_tuples_with_json_and_text_escapes(self, shipper):
+        from apps.notifications.models import Notification
+
+        rows = [
+            (uuid.uuid4(), shipper.id, "SYSTEM", "Tab\there", "Line one\nline two \\o/",
+             {"order_id": "x", "n": 1}, False, TS, TS),
+        ]
+        fields = [
+            "id", "user_id", "notification_type", "title", "body", "data", "is_read",
+            "created_at", "updated_at",
+        ]
+        assert copy_insert(Notification, rows, fields=fields) == 1
+
+        notification = Notification.objects.get(user=shipper)
+        assert notification.title == "Tab\there"
+        assert notification.body == "Line one\nline two \\o/"
+        assert notification.data == {"order_id": "x", "n": 1}
+        assert notification.read_at is None
+
+    def test_nothing_to_write(self):
+        from apps.tracking.models import GPSPing
+        assert copy_insert(GPSPing, []) == 0
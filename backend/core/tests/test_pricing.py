@@ -5,14 +5,17 @@ No DB required.
 import pytest
 from decimal import Decimal
 
+import numpy as np
+
 from core.pricing import (
     LOADING_FEE,
     MIN_PRICE,
     RATE_PER_KM,
     ROAD_FACTOR,
     estimate_freight_price,
+    estimate_freight_prices,
 )
-from core.utils import haversine_distance
+from core.utils import haversine_distance, haversine_many, haversine_matrix
 
 
 # ── haversine_distance ──────────────────────────────────────────────────────
@@ -160,3 +163,71 @@ class TestEstimateFreightPrice:
             assert est.base_price_xof >= MIN_PRICE, f"{ct} failed the floor check"
             assert est.min_price_xof > 0
             assert est.max_price_xof > est.min_price_xof
+
+
+# ── bounding_box ────────────────────────────────────────────────────────────
+
+class TestBoundingBox:
+    def test_box_encloses_circle(self):
+        from core.utils import bounding_box
+        lat, lng, radius = 14.6928, -17.4467, 50
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        assert haversine_distance(lat, lng, max_lat, lng) == pytest.approx(radius, rel=1e-6)
+        assert haversine_distance(lat, lng, lat, max_lng) >= radius * 0.999
+        assert min_lat < lat < max_lat
+        assert min_lng < lng < max_lng
+
+    def test_huge_radius_spans_all_longitudes(self):
+        from core.utils import bounding_box
+        _, _, min_lng, max_lng = bounding_box(89.9, 0, 500)
+        assert (min_lng, max_lng) == (-180.0, 180.0)
+
+
+# ── Vectorized kernels ──────────────────────────────────────────────────────
+
+class TestHaversineVectorized:
+    LATS = [14.7877, 16.0178, 14.6928, 13.7707]
+    LNGS = [-16.9246, -16.4896, -17.4467, -13.6673]
+
+    def test_many_matches_scalar(self):
+        dists = haversine_many(14.6928, -17.4467, self.LATS, self.LNGS)
+        for d, lat, lng in zip(dists, self.LATS, self.LNGS):
+            assert d == pytest.approx(haversine_distance(14.6928, -17.4467, lat, lng), rel=1e-9)
+
+    def test_matrix_shape_and_values(self):
+        m = haversine_matrix(self.LATS[:2], self.LNGS[:2], self.LATS, self.LNGS)
+        assert m.shape == (2, 4)
+        assert m[1, 0] == pytest.approx(
+            haversine_distance(self.LATS[1], self.LNGS[1], self.LATS[0], self.LNGS[0]), rel=1e-9
+        )
+        assert m[0, 0] == pytest.approx(0.0, abs=1e-9)
+
+
+class TestEstimateFreightPricesBatch:
+    def test_matches_scalar_estimator(self):
+        rng = np.random.default_rng(42)
+        n = 2000
+        cargo = rng.choice(list(RATE_PER_KM) + ["UNKNOWN"], n)
+        weights = rng.uniform(100, 40_000, n)
+        p_lat, d_lat = rng.uniform(12.5, 16.5, n), rng.uniform(12.5, 16.5, n)
+        p_lng, d_lng = rng.uniform(-17.5, -11.5, n), rng.uniform(-17.5, -11.5, n)
+
+        batch = estimate_freight_prices(cargo, weights, p_lat, p_lng, d_lat, d_lng)
+
+        for i in range(n):
+            est = estimate_freight_price(cargo[i], weights[i], p_lat[i], p_lng[i], d_lat[i], d_lng[i])
+            assert batch.straight_distance_km[i] == float(est.straight_distance_km)
+            assert batch.road_distance_km[i] == float(est.road_distance_km)
+            assert batch.base_price_xof[i] == float(est.base_price_xof)
+            assert batch.min_price_xof[i] == float(est.min_price_xof)
+            assert batch.max_price_xof[i] == float(est.max_price_xof)
+
+    def test_scalars_broadcast(self):
+        batch = estimate_freight_prices("GENERAL", [1_000, 30_000], 14.6928, -17.4467, 14.7877, -16.9246)
+        assert batch.base_price_xof.shape == (2,)
+        assert batch.base_price_xof[1] > batch.base_price_xof[0]
+        assert batch.straight_distance_km[0] == batch.straight_distance_km[1]
+
+    def test_minimum_price_floor(self):
+        batch = estimate_freight_prices("GENERAL", 100, [14.6928], [-17.4467], [14.6930], [-17.4469])
+        assert batch.base_price_xof[0] == float(MIN_PRICE)
@@ -7,8 +7,11 @@ import math
 import re
 from typing import Optional
 
+import numpy as np
 import shortuuid
 
+EARTH_RADIUS_KM = 6371
+
 
 def generate_order_reference() -> str:
     """Generate a short human-readable order reference like MESS-K7X2P."""
@@ -26,7 +29,7 @@ def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     Calculate great-circle distance between two GPS coordinates in km.
     Used as a fast fallback when no routing engine is available.
     """
-    R = 6371  # Earth radius km
+    R = EARTH_RADIUS_KM
     dlat = math.radians(lat2 - lat1)
     dlng = math.radians(lng2 - lng1)
     a = (
@@ -37,6 +40,55 @@ def haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     return R * c
 
 
+def haversine_many(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """
+    Great-circle distances in km from one point to N points.
+    lats/lngs are array-likes of equal length; returns a float64 array.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    """
+    N×M matrix of great-circle distances in km between two sets of points
+    (e.g. drivers × pickups).
+    """
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    lng1 = np.radians(np.asarray(lngs1, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    lng2 = np.radians(np.asarray(lngs2, dtype=np.float64))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) of a box enclosing the circle
+    of radius_km around (lat, lng). Used as an indexable prefilter before the
+    exact haversine check.
+    """
+    R = EARTH_RADIUS_KM
+    angular = radius_km / R
+    dlat = math.degrees(angular)
+    cos_lat = math.cos(math.radians(lat))
+    # Near the poles (or for huge radii) the circle spans every longitude
+    if cos_lat < 1e-9 or math.sin(angular) >= cos_lat:
+        dlng = 180.0
+    else:
+        dlng = math.degrees(math.asin(math.sin(angular) / cos_lat))
+    return (
+        max(-90.0, lat - dlat),
+        min(90.0, lat + dlat),
+        max(-180.0, lng - dlng),
+        min(180.0, lng + dlng),
+    )
+
+
 def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> bool:
     """Verify HMAC-SHA256 webhook signatures from payment providers."""
     expected = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()